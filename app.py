@@ -1,4 +1,9 @@
 import streamlit as st
+from utils.admission import SESSION_ID, current_session_id
+from utils.cancellation import enter_page
+from utils.deadline import clear_run_deadline
+from utils.lite_mode import is_lite
+from utils.openai_client import get_openai_client
 
 st.set_page_config(
     page_title="수상한 AI 연구실",
@@ -7,6 +12,11 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+# 이번 실행에서 나가는 OpenAI 호출을 이 세션의 대기열 티켓으로 표시
+SESSION_ID.set(current_session_id())
+# 실행 마감시간은 버튼을 누른 실행에서만 유효 (각 페이지가 start_run_deadline으로 설정)
+clear_run_deadline()
+
 # --- st.navigation으로 카테고리별 페이지 관리 ---
 pg = st.navigation(
     {
@@ -28,4 +38,17 @@ pg = st.navigation(
     }
 )
 
+# 다른 페이지로 이동했으면 이전 페이지에서 돌던 생성 작업을 취소 (스트림 종료, 대기 중인 그림 포기)
+enter_page(pg.url_path)
+
+# 과부하 시 라이트 모드 안내 (그림 생략, 짧은 이야기)
+if is_lite():
+    st.sidebar.info("⚡ 지금은 방문자가 많아 간단 모드로 운영 중이에요. 그림은 쉬어가고 이야기는 짧아져요.")
+
 pg.run()
+
+# 프로세스당 한 번만 실행됨: API 연결을 미리 열어둠
+# (openai 임포트가 무거워서 첫 화면을 다 그린 뒤에, 사용자가 입력하는 동안 준비)
+# 페이지가 남긴 실행 마감 시간은 지우고 만듦: 클라이언트는 이번 실행보다 오래 살아남음
+clear_run_deadline()
+get_openai_client()
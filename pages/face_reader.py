@@ -1,9 +1,16 @@
-import base64
 import streamlit as st
-from utils.ui_components import (apply_common_styles, show_disclaimer, safe_parse_json,
-    show_error, show_other_features_legacy, show_share_section,
-    track_experience, show_loading_messages)
-from utils.openai_client import generate_chat_with_image, generate_image
+from utils.ui_components import (apply_common_styles, show_disclaimer,
+    show_other_features_legacy, show_share_section,
+    track_experience, follow_job, show_image_pending, show_lite_placeholder)
+from utils.openai_client import generate_image, generate_json_pipelined
+from utils.image_hash import PHOTO_CACHE, dhash
+from utils.image_prep import prepare_for_vision
+from utils.cancellation import cancel_page_jobs
+from utils.inflight import inflight_key
+from utils.jobs import JobFailed, forget_job, job_running, start_job
+from utils.deadline import start_run_deadline
+from utils.lite_mode import is_lite
+from utils.schemas import FaceReading, parse_result
 from utils.share_card import generate_face_card
 
 apply_common_styles()
@@ -23,6 +30,7 @@ FACE_SYSTEM_PROMPT = """당신은 한국 전통 관상학을 현대적으로 재
 
 응답은 반드시 JSON 형식으로:
 {
+  "character_description": "DALL-E용 캐릭터 일러스트 설명 (영문, 관상 특징 반영)",
   "face_parts": {
     "forehead": {"feature": "특징", "meaning": "관상학적 의미", "emoji": "적절한 이모지"},
     "eyes": {"feature": "특징", "meaning": "의미", "emoji": "이모지"},
@@ -37,8 +45,7 @@ FACE_SYSTEM_PROMPT = """당신은 한국 전통 관상학을 현대적으로 재
     {"job": "직업명", "reason": "이유"},
     {"job": "직업명", "reason": "이유"}
   ],
-  "scores": {"wealth": 85, "love": 78, "health": 90, "social": 82},
-  "character_description": "DALL-E용 캐릭터 일러스트 설명 (영문, 관상 특징 반영)"
+  "scores": {"wealth": 85, "love": 78, "health": 90, "social": 82}
 }"""
 
 CHARACTER_IMAGE_BASE = (
@@ -48,6 +55,53 @@ CHARACTER_IMAGE_BASE = (
     "portrait format, beautiful detailed face, "
 )
 
+# --- 백그라운드 작업 ---
+def _read_face(job, image_bytes, photo_hash):
+    """관상 JSON을 생성하고 캐릭터 일러스트까지 그림 (작업 스레드에서 실행, 단계마다 job.update)"""
+    lite = is_lite()
+    # 관상은 이목구비 디테일이 중요해서 high detail로 전송
+    b64, mime_type, detail = prepare_for_vision(image_bytes, detail="high")
+
+    # 캐릭터 설명이 스트리밍되는 즉시 일러스트 생성을 시작
+    raw, image_jobs = generate_json_pipelined(
+        FACE_SYSTEM_PROMPT,
+        "이 사진의 관상을 분석해주세요.",
+        {"character_description": lambda d: generate_image(CHARACTER_IMAGE_BASE + d, page="face")},
+        base64_image=b64,
+        mime_type=mime_type,
+        detail=detail,
+        page="face",
+        schema=FaceReading,
+    )
+    result = parse_result(FaceReading, raw)
+    if result is None:
+        raise JobFailed("관상 분석에 실패했어요. 다른 사진으로 시도해보세요!")
+    job.update("🎨 당신만의 캐릭터를 그리고 있어요...", result=result)
+
+    try:
+        image_job = image_jobs.get("character_description")
+        if image_job is not None:
+            image = image_job.result()
+        else:
+            char_desc = result.get("character_description", "beautiful Korean person portrait")
+            image = generate_image(CHARACTER_IMAGE_BASE + char_desc, page="face")
+    except Exception:
+        image = None
+    # 그림이 실패했거나 라이트 모드로 그림 없이 만든 결과는 같은 사진에 계속 재사용되지 않도록 저장하지 않음
+    if image is not None and not (lite or is_lite()):
+        PHOTO_CACHE.put("face", photo_hash, {"result": result, "image": image})
+    job.update(image=image)
+
+
+def _apply_face(partial):
+    """작업 결과를 세션 스테이트에 반영 (단계마다 다시 불려도 됨)"""
+    if "result" in partial and partial["result"] != st.session_state.face_result:
+        st.session_state.face_result = partial["result"]
+        st.session_state.face_char_image = None
+    if "image" in partial:
+        st.session_state.face_char_image = partial["image"]
+
+
 # --- 세션 스테이트 ---
 if "face_result" not in st.session_state:
     st.session_state.face_result = None
@@ -102,46 +156,36 @@ st.markdown("</div>", unsafe_allow_html=True)
 
 st.markdown("")
 if st.button("👁️ 관상 보기", use_container_width=True, type="primary"):
+    start_run_deadline("face")
     if not photo:
         st.warning("사진을 먼저 올려주세요!")
     else:
-        try:
-            image_bytes = photo.getvalue()
-            b64 = base64.b64encode(image_bytes).decode()
-
-            show_loading_messages([
-                "🔍 얼굴의 기운을 읽는 중...",
-                "📖 관상학 데이터 분석 중...",
-                "✨ 운명을 해석하는 중...",
-            ], delay=1.5)
-
-            with st.spinner("🔍 얼굴의 기운을 읽고 있어요..."):
-                raw = generate_chat_with_image(
-                    FACE_SYSTEM_PROMPT,
-                    "이 사진의 관상을 분석해주세요.",
-                    b64,
-                    json_mode=True,
-                )
-                result = safe_parse_json(raw)
-
-            if result is None:
-                show_error("관상 분석에 실패했어요. 다른 사진으로 시도해보세요!")
-            else:
-                st.session_state.face_result = result
-
-                with st.spinner("🎨 당신만의 캐릭터를 그리고 있어요..."):
-                    try:
-                        char_desc = result.get("character_description", "beautiful Korean person portrait")
-                        prompt = CHARACTER_IMAGE_BASE + char_desc
-                        st.session_state.face_char_image = generate_image(prompt)
-                    except Exception:
-                        st.session_state.face_char_image = None
-
-                track_experience("face")
-                st.balloons()
+        image_bytes = photo.getvalue()
+        photo_hash = dhash(image_bytes)
+        # 최근에 분석한 사진과 거의 같으면(재압축/살짝 자른 사진) 이전 분석을 재사용
+        cached = PHOTO_CACHE.get("face", photo_hash)
+        if cached is not None:
+            forget_job("face")
+            st.session_state.face_result = cached["result"]
+            st.session_state.face_char_image = cached["image"]
+            track_experience("face")
+            st.balloons()
+        else:
+            # 분석은 백그라운드 작업으로: 진행 중에 다른 걸 눌러도 끊기지 않고, 재접속해도 이어받음
+            start_job("face", _read_face, image_bytes, photo_hash, key=inflight_key("face", "read", image_bytes))
 
-        except Exception as e:
-            show_error(f"관상 분석 중 문제가 생겼어요: {e}")
+if follow_job(
+    "face",
+    _apply_face,
+    [
+        "🔍 얼굴의 기운을 읽는 중...",
+        "📖 관상학 데이터 분석 중...",
+        "✨ 운명을 해석하는 중...",
+    ],
+    "관상 분석 중 문제가 생겼어요",
+):
+    track_experience("face")
+    st.balloons()
 
 # --- 결과 표시 ---
 if st.session_state.face_result:
@@ -165,6 +209,10 @@ if st.session_state.face_result:
             st.markdown("<div class='image-frame glow-pulse'>", unsafe_allow_html=True)
             st.image(st.session_state.face_char_image, caption="AI 캐릭터 일러스트", use_container_width=True)
             st.markdown("</div>", unsafe_allow_html=True)
+    elif job_running("face"):
+        show_image_pending("🎨", "당신만의 캐릭터를 그리고 있어요...")
+    elif is_lite():
+        show_lite_placeholder("☕", "캐릭터 일러스트는 관상가가 차 한 잔 마신 뒤에 그려드릴게요")
 
     # 관상 점수
     st.markdown("")
@@ -239,12 +287,16 @@ if st.session_state.face_result:
 
     # 공유 카드 이미지 다운로드
     card_bytes = generate_face_card(result)
+    # 다운로드만 하고 페이지는 다시 그리지 않음 (부위별 분석 expander는 브라우저에서만 열고 닫혀 재실행이 없음)
     st.download_button("📥 결과 카드 이미지 다운로드", data=card_bytes,
-        file_name="face_result.png", mime="image/png", use_container_width=True)
+        file_name="face_result.png", mime="image/png", use_container_width=True, on_click="ignore")
 
     # 다시 하기
     st.markdown("")
     if st.button("🔄 다른 사진으로 다시 보기"):
+        # 아직 진행 중인 생성(스트리밍, 그림)을 멈추고 연결을 반납
+        cancel_page_jobs()
+        forget_job("face")
         st.session_state.face_result = None
         st.session_state.face_char_image = None
         st.rerun()
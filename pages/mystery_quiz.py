@@ -1,10 +1,16 @@
 import streamlit as st
 from utils.ui_components import (
-    apply_common_styles, show_disclaimer, safe_parse_json,
-    show_error, show_other_features, show_share_section,
-    track_experience, show_loading_messages,
+    apply_common_styles, show_disclaimer,
+    show_other_features, show_share_section,
+    track_experience, follow_job, show_image_pending, show_lite_placeholder,
 )
-from utils.openai_client import generate_chat, generate_image
+from utils.openai_client import generate_image, generate_json_pipelined
+from utils.cancellation import cancel_page_jobs
+from utils.inflight import inflight_key
+from utils.jobs import JobFailed, forget_job, job_running, start_job
+from utils.deadline import start_run_deadline
+from utils.lite_mode import is_lite
+from utils.schemas import MysteryCase, parse_result
 from utils.share_card import generate_quiz_card
 
 apply_common_styles()
@@ -28,6 +34,7 @@ MYSTERY_SYSTEM_PROMPT = """당신은 미스터리 추리 퀴즈 출제자입니
     "case_title": "사건 제목",
     "difficulty": "초급/중급/고급",
     "scenario": "사건 배경 및 상황 설명 (300-500자)",
+    "scene_prompt": "DALL-E용 사건현장 일러스트 프롬프트 (영문, 미스터리 분위기)",
     "suspects": [
         {
             "name": "용의자1 이름",
@@ -60,8 +67,7 @@ MYSTERY_SYSTEM_PROMPT = """당신은 미스터리 추리 퀴즈 출제자입니
         {"title": "단서3 제목", "content": "단서3 내용"}
     ],
     "culprit": "범인 이름 (용의자 중 한 명)",
-    "explanation": "해설 — 왜 이 사람이 범인인지 (300-500자, 단서 연결)",
-    "scene_prompt": "DALL-E용 사건현장 일러스트 프롬프트 (영문, 미스터리 분위기)"
+    "explanation": "해설 — 왜 이 사람이 범인인지 (300-500자, 단서 연결)"
 }"""
 
 SCENE_IMAGE_BASE = (
@@ -78,6 +84,45 @@ DETECTIVE_RANKS = {
     (0, 30): "🔰 수습 탐정 (D등급)",
 }
 
+# --- background job ---
+def _make_case(job, user_prompt):
+    """Case JSON plus the scene illustration (runs in a job worker, reporting each stage)."""
+    # Scene illustration starts as soon as scene_prompt has streamed in
+    raw, image_jobs = generate_json_pipelined(
+        MYSTERY_SYSTEM_PROMPT, user_prompt,
+        {"scene_prompt": lambda p: generate_image(SCENE_IMAGE_BASE + p, page="quiz")},
+        page="quiz",
+        schema=MysteryCase,
+    )
+    case = parse_result(MysteryCase, raw)
+    if case is None:
+        raise JobFailed("사건 생성에 실패했어요. 다시 시도해주세요!")
+    job.update("🎨 사건현장을 그리고 있어요...", case=case)
+
+    try:
+        image_job = image_jobs.get("scene_prompt")
+        if image_job is not None:
+            image = image_job.result()
+        else:
+            image = generate_image(SCENE_IMAGE_BASE + case.get("scene_prompt", "mystery scene"), page="quiz")
+    except Exception:
+        image = None
+    job.update(image=image)
+
+
+def _apply_case(partial):
+    """Copy the job's outputs into the session state (safe to call again on every update)."""
+    if "case" in partial and partial["case"] != st.session_state.quiz_case:
+        st.session_state.quiz_case = partial["case"]
+        st.session_state.quiz_revealed_clues = set()
+        st.session_state.quiz_answered = False
+        st.session_state.quiz_selected = None
+        st.session_state.quiz_score = 0
+        st.session_state.quiz_scene_image = None
+    if "image" in partial:
+        st.session_state.quiz_scene_image = partial["image"]
+
+
 # --- session state ---
 if "quiz_case" not in st.session_state:
     st.session_state.quiz_case = None
@@ -103,6 +148,18 @@ st.markdown(
 )
 st.markdown("---")
 
+# --- case generation progress (before the difficulty cards, so they hide as soon as the case arrives) ---
+follow_job(
+    "quiz",
+    _apply_case,
+    [
+        "🕵️ 사건 파일을 준비하는 중...",
+        "📋 용의자 명단을 작성하는 중...",
+        "🔍 단서를 배치하는 중...",
+    ],
+    "사건 생성 중 문제가 발생했어요",
+)
+
 # --- difficulty selection ---
 if not st.session_state.quiz_case:
     st.markdown("<div class='input-section'>", unsafe_allow_html=True)
@@ -129,41 +186,43 @@ if not st.session_state.quiz_case:
                 unsafe_allow_html=True,
             )
             if st.button(f"{label} 시작", key=f"diff_{diff}", use_container_width=True):
+                start_run_deadline("quiz")
                 user_prompt = f"난이도: {diff}\n\n위 난이도에 맞는 미스터리 추리 퀴즈를 출제해주세요."
 
-                try:
-                    show_loading_messages([
-                        "🕵️ 사건 파일을 준비하는 중...",
-                        "📋 용의자 명단을 작성하는 중...",
-                        "🔍 단서를 배치하는 중...",
-                    ], delay=1.5)
-
-                    with st.spinner("🕵️ 미스터리 사건을 구성하고 있어요..."):
-                        raw = generate_chat(MYSTERY_SYSTEM_PROMPT, user_prompt, json_mode=True)
-                        case = safe_parse_json(raw)
+                # Runs as a background job: other clicks don't interrupt it and a reconnect picks it up again
+                start_job("quiz", _make_case, user_prompt, key=inflight_key("quiz", "case", diff))
+                # The progress box sits above the cards and has already rendered for this run
+                st.rerun()
 
-                    if case is None:
-                        show_error("사건 생성에 실패했어요. 다시 시도해주세요!")
-                    else:
-                        st.session_state.quiz_case = case
-                        st.session_state.quiz_revealed_clues = set()
-                        st.session_state.quiz_answered = False
-                        st.session_state.quiz_selected = None
-                        st.session_state.quiz_score = 0
+    st.markdown("</div>", unsafe_allow_html=True)
 
-                        with st.spinner("🎨 사건현장을 그리고 있어요..."):
-                            try:
-                                prompt = SCENE_IMAGE_BASE + case.get("scene_prompt", "mystery scene")
-                                st.session_state.quiz_scene_image = generate_image(prompt)
-                            except Exception:
-                                st.session_state.quiz_scene_image = None
+def _reveal_clue(i):
+    # Runs before the fragment reruns, so the clue is already open when it redraws
+    st.session_state.quiz_revealed_clues.add(i)
 
-                        st.rerun()
 
-                except Exception as e:
-                    show_error(f"사건 생성 중 문제가 발생했어요: {e}")
+@st.fragment
+def _clue_board(clues):
+    """Clue cards; revealing one reruns only this section, not the whole case file."""
+    for i, clue in enumerate(clues[:3]):
+        if i in st.session_state.quiz_revealed_clues:
+            st.markdown(
+                f"<div class='result-card slide-up'>"
+                f"<h3>🔍 단서 #{i+1}: {clue.get('title', '')}</h3>"
+                f"<p>{clue.get('content', '')}</p>"
+                f"</div>",
+                unsafe_allow_html=True,
+            )
+        else:
+            st.markdown(
+                f"<div class='card-back' style='padding:25px; min-height:auto;'>"
+                f"<div class='card-pattern' style='font-size:2em !important;'>🔒</div>"
+                f"<div class='card-text'>단서 #{i+1} — 클릭하여 확인</div>"
+                f"</div>",
+                unsafe_allow_html=True,
+            )
+            st.button(f"🔍 단서 #{i+1} 공개", key=f"clue_{i}", on_click=_reveal_clue, args=(i,))
 
-    st.markdown("</div>", unsafe_allow_html=True)
 
 # --- case display ---
 if st.session_state.quiz_case:
@@ -184,6 +243,10 @@ if st.session_state.quiz_case:
         st.markdown("<div class='image-frame'>", unsafe_allow_html=True)
         st.image(st.session_state.quiz_scene_image, caption="사건 현장", use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
+    elif job_running("quiz"):
+        show_image_pending("🎨", "사건현장을 그리고 있어요...")
+    elif is_lite():
+        show_lite_placeholder("🚧", "사건 현장은 폴리스 라인 뒤에 있어요. 단서만으로 추리해보세요!")
 
     # Scenario
     st.markdown(
@@ -220,26 +283,7 @@ if st.session_state.quiz_case:
     )
 
     clues = case.get("clues", [])
-    for i, clue in enumerate(clues[:3]):
-        if i in st.session_state.quiz_revealed_clues:
-            st.markdown(
-                f"<div class='result-card slide-up'>"
-                f"<h3>🔍 단서 #{i+1}: {clue.get('title', '')}</h3>"
-                f"<p>{clue.get('content', '')}</p>"
-                f"</div>",
-                unsafe_allow_html=True,
-            )
-        else:
-            st.markdown(
-                f"<div class='card-back' style='padding:25px; min-height:auto;'>"
-                f"<div class='card-pattern' style='font-size:2em !important;'>🔒</div>"
-                f"<div class='card-text'>단서 #{i+1} — 클릭하여 확인</div>"
-                f"</div>",
-                unsafe_allow_html=True,
-            )
-            if st.button(f"🔍 단서 #{i+1} 공개", key=f"clue_{i}"):
-                st.session_state.quiz_revealed_clues.add(i)
-                st.rerun()
+    _clue_board(clues)
 
     # Answer section
     if not st.session_state.quiz_answered:
@@ -363,11 +407,15 @@ if st.session_state.quiz_case:
             file_name="mystery_quiz.png",
             mime="image/png",
             use_container_width=True,
+            on_click="ignore",  # no rerun: it would re-render the card and replay the balloons
         )
 
     # Reset
     st.markdown("")
     if st.button("🔄 새로운 사건에 도전"):
+        # Stops a case still being written and makes the same difficulty produce a new one
+        cancel_page_jobs()
+        forget_job("quiz")
         st.session_state.quiz_case = None
         st.session_state.quiz_revealed_clues = set()
         st.session_state.quiz_answered = False
@@ -1,13 +1,17 @@
 import re
-import requests
 import streamlit as st
-from bs4 import BeautifulSoup
 from utils.ui_components import (
-    apply_common_styles, show_disclaimer, safe_parse_json, show_error,
+    apply_common_styles, show_disclaimer,
     show_other_features_legacy, show_share_section, track_experience,
-    show_loading_messages,
+    follow_job, show_image_pending, show_lite_placeholder,
 )
-from utils.openai_client import generate_chat, generate_chat_stream, generate_image
+from utils.openai_client import generate_image, generate_json_pipelined
+from utils.cancellation import cancel_page_jobs
+from utils.inflight import inflight_key
+from utils.jobs import JobFailed, forget_job, job_running, start_job
+from utils.deadline import start_run_deadline
+from utils.lite_mode import is_lite
+from utils.schemas import NewsWebtoon, parse_result
 from utils.share_card import generate_news_card
 
 apply_common_styles()
@@ -73,6 +77,46 @@ STYLE_PROMPTS = {
     ),
 }
 
+# --- 백그라운드 작업 ---
+def _make_webtoon(job, user_prompt, style):
+    """시나리오 JSON을 생성하고 4컷을 차례로 그림 (작업 스레드에서 실행, 컷마다 job.update)"""
+    style_prefix = STYLE_PROMPTS[style]
+    # 각 컷의 image_prompt가 완성되는 즉시 해당 컷 그리기 시작
+    raw, image_jobs = generate_json_pipelined(
+        WEBTOON_SYSTEM_PROMPT, user_prompt,
+        {"panels[].image_prompt": lambda p: generate_image(style_prefix + p, page="news")},
+        page="news",
+        schema=NewsWebtoon,
+    )
+    result = parse_result(NewsWebtoon, raw)
+    if result is None:
+        raise JobFailed("웹툰 시나리오 생성에 실패했어요. 다시 시도해주세요!")
+    panels = result.get("panels", [])
+    job.update(f"🎨 웹툰을 그리고 있어요... (0/{len(panels)})", result=result, images=[])
+
+    images = []
+    for i, panel in enumerate(panels):
+        try:
+            image_job = image_jobs.get(f"panels[{i}].image_prompt")
+            if image_job is not None:
+                img_url = image_job.result()
+            else:
+                img_url = generate_image(style_prefix + panel.get("image_prompt", "comic panel"), page="news")
+        except Exception:
+            img_url = None
+        images.append(img_url)
+        job.update(f"🎨 {i+1}/{len(panels)} 컷 완성!", images=list(images))
+
+
+def _apply_webtoon(partial):
+    """작업 결과를 세션 스테이트에 반영 (컷이 완성될 때마다 다시 불려도 됨)"""
+    if "result" in partial and partial["result"] != st.session_state.webtoon_result:
+        st.session_state.webtoon_result = partial["result"]
+        st.session_state.webtoon_images = []
+    if "images" in partial:
+        st.session_state.webtoon_images = list(partial["images"])
+
+
 # --- 세션 스테이트 ---
 if "webtoon_result" not in st.session_state:
     st.session_state.webtoon_result = None
@@ -81,6 +125,10 @@ if "webtoon_images" not in st.session_state:
 
 
 def extract_text_from_url(url: str) -> str | None:
+    # URL 입력을 쓸 때만 필요하므로 페이지를 열 때가 아니라 여기서 임포트
+    import requests
+    from bs4 import BeautifulSoup
+
     try:
         headers = {"User-Agent": "Mozilla/5.0"}
         resp = requests.get(url, headers=headers, timeout=10)
@@ -148,48 +196,27 @@ st.markdown("</div>", unsafe_allow_html=True)
 
 st.markdown("")
 if st.button("🎨 웹툰 만들기", use_container_width=True, type="primary"):
+    start_run_deadline("news")
     if not news_text or len(news_text.strip()) < 30:
         st.warning("뉴스 내용이 너무 짧아요. 좀 더 자세한 내용을 입력해주세요!")
     else:
         user_prompt = f"[웹툰 스타일]: {style}\n\n[뉴스 내용]:\n{news_text[:2000]}\n\n위 뉴스를 4컷 웹툰으로 만들어주세요."
 
-        try:
-            show_loading_messages([
-                "📰 뉴스를 분석하는 중...",
-                "🎨 웹툰 시나리오를 구상 중...",
-                "✏️ 스토리보드를 그리는 중...",
-            ], delay=1.5)
-
-            with st.spinner("📖 뉴스를 읽고 시나리오를 구상 중..."):
-                raw = generate_chat(WEBTOON_SYSTEM_PROMPT, user_prompt, json_mode=True)
-                result = safe_parse_json(raw)
-
-            if result is None:
-                show_error("웹툰 시나리오 생성에 실패했어요. 다시 시도해주세요!")
-            else:
-                st.session_state.webtoon_result = result
-                st.session_state.webtoon_images = []
-
-                panels = result.get("panels", [])
-                style_prefix = STYLE_PROMPTS[style]
-
-                progress_bar = st.progress(0, text="🎨 웹툰을 그리고 있어요...")
-                for i, panel in enumerate(panels):
-                    with st.spinner(f"🎨 {i+1}번째 컷 그리는 중... ({i+1}/{len(panels)})"):
-                        try:
-                            prompt = style_prefix + panel.get("image_prompt", "comic panel")
-                            img_url = generate_image(prompt)
-                            st.session_state.webtoon_images.append(img_url)
-                        except Exception:
-                            st.session_state.webtoon_images.append(None)
-                    progress_bar.progress((i + 1) / len(panels), text=f"🎨 {i+1}/{len(panels)} 컷 완성!")
-                progress_bar.empty()
-
-                track_experience("news")
-                st.balloons()
-
-        except Exception as e:
-            show_error(f"웹툰 생성 중 문제가 발생했어요: {e}")
+        # 생성은 백그라운드 작업으로: 진행 중에 다른 걸 눌러도 끊기지 않고, 재접속해도 이어받음
+        start_job("news", _make_webtoon, user_prompt, style, key=inflight_key("news", "webtoon", user_prompt))
+
+if follow_job(
+    "news",
+    _apply_webtoon,
+    [
+        "📰 뉴스를 분석하는 중...",
+        "🎨 웹툰 시나리오를 구상 중...",
+        "✏️ 스토리보드를 그리는 중...",
+    ],
+    "웹툰 생성 중 문제가 발생했어요",
+):
+    track_experience("news")
+    st.balloons()
 
 # --- 결과 표시 ---
 if st.session_state.webtoon_result:
@@ -233,6 +260,11 @@ if st.session_state.webtoon_result:
                         st.markdown("<div class='image-frame'>", unsafe_allow_html=True)
                         st.image(images[idx], use_container_width=True)
                         st.markdown("</div>", unsafe_allow_html=True)
+                    elif job_running("news"):
+                        show_image_pending("🎨", f"{idx+1}번째 컷 그리는 중...")
+                    elif is_lite():
+                        # 라이트 모드: 그림 대신 콘티(장면 설명)로 보여줌
+                        show_lite_placeholder("✏️", panel.get("description", ""))
                     else:
                         st.markdown(
                             f"<div style='background:linear-gradient(145deg, #3D2B1A, #2B1E14); "
@@ -274,6 +306,9 @@ if st.session_state.webtoon_result:
     # 다시 하기
     st.markdown("")
     if st.button("🔄 다른 뉴스로 웹툰 만들기"):
+        # 아직 진행 중인 생성(스트리밍, 그림)을 멈추고 연결을 반납
+        cancel_page_jobs()
+        forget_job("news")
         st.session_state.webtoon_result = None
         st.session_state.webtoon_images = []
         st.rerun()
@@ -1,12 +1,19 @@
 import datetime
 import streamlit as st
-import plotly.graph_objects as go
 from utils.ui_components import (
-    apply_common_styles, show_disclaimer, safe_parse_json,
-    show_error, show_other_features, show_share_section,
-    track_experience, show_loading_messages,
+    apply_common_styles, show_disclaimer,
+    show_other_features, show_share_section,
+    track_experience, follow_job, memo_opt_in,
+    show_image_pending, show_lite_placeholder, show_lite_notice,
 )
-from utils.openai_client import generate_chat, generate_chat_stream, generate_image
+from utils.openai_client import generate_chat_stream, generate_image, generate_json_pipelined
+from utils.result_cache import canonical_key, load_result, save_result, save_story
+from utils.cancellation import cancel_page_jobs
+from utils.inflight import inflight_key
+from utils.jobs import JobFailed, forget_job, job_has_budget, job_running, start_job
+from utils.deadline import start_run_deadline
+from utils.lite_mode import is_lite
+from utils.schemas import ParallelSelf, parse_result
 from utils.share_card import generate_parallel_card
 
 apply_common_styles()
@@ -30,6 +37,7 @@ PARALLEL_SYSTEM_PROMPT = """당신은 평행우주 연구소의 수석 연구원
     "occupation": "직업",
     "country": "거주 국가/도시",
     "annual_income": "연봉 (구체적 금액 + 통화)",
+    "portrait_prompt": "DALL-E용 평행우주 나의 초상화 프롬프트 (영문, 직업/스타일/배경 포함)",
     "personality": "성격 설명 (200-300자)",
     "daily_routine": "하루 일과 (300-400자, 시간대별)",
     "divergence_rate": 72,
@@ -41,8 +49,7 @@ PARALLEL_SYSTEM_PROMPT = """당신은 평행우주 연구소의 수석 연구원
         "사교성": 80
     },
     "fun_fact": "평행우주 나에 대한 재미있는 사실 (100-150자)",
-    "message_from_parallel": "평행우주의 내가 현재의 나에게 보내는 메시지 (150-200자)",
-    "portrait_prompt": "DALL-E용 평행우주 나의 초상화 프롬프트 (영문, 직업/스타일/배경 포함)"
+    "message_from_parallel": "평행우주의 내가 현재의 나에게 보내는 메시지 (150-200자)"
 }"""
 
 PORTRAIT_IMAGE_BASE = (
@@ -80,6 +87,47 @@ QUIZ_QUESTIONS = [
     },
 ]
 
+# --- background job ---
+def _explore_parallel(job, user_prompt, memo_key):
+    """Profile JSON, then the portrait; runs on a job thread and reports each stage."""
+    lite = is_lite()
+    # Portrait generation starts as soon as portrait_prompt has streamed in
+    raw, image_jobs = generate_json_pipelined(
+        PARALLEL_SYSTEM_PROMPT, user_prompt,
+        {"portrait_prompt": lambda p: generate_image(PORTRAIT_IMAGE_BASE + p, page="parallel")},
+        page="parallel",
+        schema=ParallelSelf,
+    )
+    result = parse_result(ParallelSelf, raw)
+    if result is None:
+        raise JobFailed("평행우주 탐색에 실패했어요. 다시 시도해주세요!")
+    job.update("🎨 평행우주의 당신을 그리고 있어요...", result=result)
+
+    try:
+        image_job = image_jobs.get("portrait_prompt")
+        if image_job is not None:
+            image = image_job.result()
+        else:
+            image = generate_image(PORTRAIT_IMAGE_BASE + result.get("portrait_prompt", "professional portrait"), page="parallel")
+    except Exception:
+        image = None
+    # A failed portrait or a lite-mode run would otherwise be served from the memo for its whole TTL
+    if memo_key and image is not None and not (lite or is_lite()):
+        save_result(memo_key, result, image)
+    job.update(image=image)
+
+
+def _apply_parallel(partial):
+    """Copy job outputs into the session state (safe to call again for every stage)."""
+    if "result" in partial and partial["result"] != st.session_state.parallel_result:
+        st.session_state.parallel_result = partial["result"]
+        st.session_state.parallel_image = None
+        st.session_state.parallel_story_streamed = False
+        st.session_state.parallel_story_text = None
+    if "image" in partial:
+        st.session_state.parallel_image = partial["image"]
+
+
 # --- session state ---
 if "parallel_result" not in st.session_state:
     st.session_state.parallel_result = None
@@ -87,6 +135,10 @@ if "parallel_image" not in st.session_state:
     st.session_state.parallel_image = None
 if "parallel_story_streamed" not in st.session_state:
     st.session_state.parallel_story_streamed = False
+if "parallel_story_text" not in st.session_state:
+    st.session_state.parallel_story_text = None
+if "parallel_memo_key" not in st.session_state:
+    st.session_state.parallel_memo_key = None
 
 # --- page header ---
 st.markdown(
@@ -139,7 +191,9 @@ for i, q in enumerate(QUIZ_QUESTIONS):
     answers.append(answer)
 
 st.markdown("")
+memo_enabled = memo_opt_in()
 if st.button("🌀 평행우주 탐색", use_container_width=True, type="primary"):
+    start_run_deadline("parallel")
     if not name or len(name.strip()) < 1:
         st.warning("이름을 입력해주세요!")
     elif None in answers:
@@ -155,36 +209,41 @@ if st.button("🌀 평행우주 탐색", use_container_width=True, type="primary
             f"[분기점 퀴즈 답변]:\n{quiz_text}\n\n"
             f"위 정보를 바탕으로 평행우주의 이 사람 프로필을 생성해주세요."
         )
+        memo_key = canonical_key(
+            "parallel_universe", name, birthdate,
+            [q["options"].index(a) for q, a in zip(QUIZ_QUESTIONS, answers)],
+        )
+        cached = load_result(memo_key) if memo_enabled else None
+        st.session_state.parallel_memo_key = memo_key if memo_enabled else None
+
+        if cached is not None:
+            # Same inputs as a previous visit: replay the stored result page
+            forget_job("parallel")
+            st.session_state.parallel_result = cached["result"]
+            st.session_state.parallel_image = cached["image"]
+            st.session_state.parallel_story_text = cached["story"]
+            st.session_state.parallel_story_streamed = cached["story"] is not None
+            track_experience("parallel")
+            st.balloons()
+        else:
+            # Generation runs as a background job: it survives widget reruns and reconnects
+            start_job(
+                "parallel", _explore_parallel, user_prompt, memo_key if memo_enabled else None,
+                key=inflight_key("parallel", "explore", user_prompt),
+            )
 
-        try:
-            show_loading_messages([
-                "🌀 차원의 틈을 여는 중...",
-                "🔭 평행우주를 탐색하는 중...",
-                "📡 다른 차원의 신호를 수신하는 중...",
-            ], delay=1.5)
-
-            with st.spinner("🌀 평행우주의 당신을 찾고 있어요..."):
-                raw = generate_chat(PARALLEL_SYSTEM_PROMPT, user_prompt, json_mode=True)
-                result = safe_parse_json(raw)
-
-            if result is None:
-                show_error("평행우주 탐색에 실패했어요. 다시 시도해주세요!")
-            else:
-                st.session_state.parallel_result = result
-                st.session_state.parallel_story_streamed = False
-
-                with st.spinner("🎨 평행우주의 당신을 그리고 있어요..."):
-                    try:
-                        prompt = PORTRAIT_IMAGE_BASE + result.get("portrait_prompt", "professional portrait")
-                        st.session_state.parallel_image = generate_image(prompt)
-                    except Exception:
-                        st.session_state.parallel_image = None
-
-                track_experience("parallel")
-                st.balloons()
-
-        except Exception as e:
-            show_error(f"평행우주 탐색 중 문제가 발생했어요: {e}")
+if follow_job(
+    "parallel",
+    _apply_parallel,
+    [
+        "🌀 차원의 틈을 여는 중...",
+        "🔭 평행우주를 탐색하는 중...",
+        "📡 다른 차원의 신호를 수신하는 중...",
+    ],
+    "평행우주 탐색 중 문제가 발생했어요",
+):
+    track_experience("parallel")
+    st.balloons()
 
 # --- result display ---
 if st.session_state.parallel_result:
@@ -204,6 +263,10 @@ if st.session_state.parallel_result:
             st.markdown("<div class='image-frame glow-pulse'>", unsafe_allow_html=True)
             st.image(st.session_state.parallel_image, caption="평행우주의 나", use_container_width=True)
             st.markdown("</div>", unsafe_allow_html=True)
+        elif job_running("parallel"):
+            show_image_pending("🎨", "평행우주의 당신을 그리고 있어요...", padding="60px")
+        elif is_lite():
+            show_lite_placeholder("🌌", "평행우주의 나는 아직 차원 너머에서 포즈를 잡는 중이에요", padding="60px")
         else:
             st.markdown(
                 "<div style='background:linear-gradient(145deg, #3D2B1A, #2B1E14); "
@@ -237,6 +300,9 @@ if st.session_state.parallel_result:
             values_closed = values + [values[0]]
             categories_closed = categories + [categories[0]]
 
+            # Imported here: only needed once a result renders
+            import plotly.graph_objects as go
+
             fig = go.Figure(
                 data=go.Scatterpolar(
                     r=values_closed,
@@ -262,19 +328,44 @@ if st.session_state.parallel_result:
             )
             st.plotly_chart(fig, use_container_width=True)
 
-    # Personality (streaming)
-    if not st.session_state.parallel_story_streamed:
+    # Personality (streaming) — skipped if the deadline of the run that started the job is nearly spent
+    if not st.session_state.parallel_story_streamed and job_has_budget("parallel", "stream"):
+        # Lite mode asks for a shorter text (routing lowers the token cap too)
+        lite = is_lite()
+        length = "200자" if lite else "500자"
         personality_prompt = (
-            f"다음 평행우주 프로필을 바탕으로 성격과 일상을 더 생생하게 500자 내외로 묘사해주세요:\n"
+            f"다음 평행우주 프로필을 바탕으로 성격과 일상을 더 생생하게 {length} 내외로 묘사해주세요:\n"
             f"성격: {result.get('personality', '')}\n일과: {result.get('daily_routine', '')}"
         )
         st.markdown("<div class='result-card slide-up'><h3>🧬 성격 & 일상</h3>", unsafe_allow_html=True)
-        st.write_stream(generate_chat_stream(
-            "당신은 평행우주 연구소의 연구원입니다. 재미있고 생생하게 묘사합니다.",
-            personality_prompt,
-        ))
+        try:
+            story_text = st.write_stream(generate_chat_stream(
+                "당신은 평행우주 연구소의 연구원입니다. 재미있고 생생하게 묘사합니다.",
+                personality_prompt,
+                page="parallel",
+            ))
+        except Exception:
+            # The stream is optional — on failure (deadline included) fall back to the base profile
+            story_text = None
+            st.markdown(
+                f"<p>{result.get('personality', '')}</p><p>{result.get('daily_routine', '')}</p>",
+                unsafe_allow_html=True,
+            )
         st.markdown("</div>", unsafe_allow_html=True)
+        if lite:
+            show_lite_notice()
         st.session_state.parallel_story_streamed = True
+        st.session_state.parallel_story_text = story_text
+        # Don't memo the short version; the next visit gets the full one
+        if story_text and st.session_state.parallel_memo_key and not lite:
+            save_story(st.session_state.parallel_memo_key, story_text, result)
+    elif st.session_state.parallel_story_text:
+        st.markdown(
+            f"<div class='result-card slide-up'><h3>🧬 성격 & 일상</h3>"
+            f"<p>{st.session_state.parallel_story_text}</p>"
+            f"</div>",
+            unsafe_allow_html=True,
+        )
     else:
         st.markdown(
             f"<div class='result-card slide-up'><h3>🧬 성격 & 일상</h3>"
@@ -324,9 +415,13 @@ if st.session_state.parallel_result:
     # Reset
     st.markdown("")
     if st.button("🔄 다른 분기점으로 다시 탐색"):
+        # Stop generations still running for the old result and free their connections
+        cancel_page_jobs()
+        forget_job("parallel")
         st.session_state.parallel_result = None
         st.session_state.parallel_image = None
         st.session_state.parallel_story_streamed = False
+        st.session_state.parallel_story_text = None
         st.rerun()
 
 show_other_features("parallel")
@@ -1,10 +1,17 @@
 import datetime
 import streamlit as st
-import plotly.graph_objects as go
-from utils.ui_components import (apply_common_styles, show_disclaimer, safe_parse_json,
-    show_error, show_other_features_legacy, show_share_section,
-    track_experience, show_loading_messages)
-from utils.openai_client import generate_chat, generate_chat_stream, generate_image
+from utils.ui_components import (apply_common_styles, show_disclaimer,
+    show_other_features_legacy, show_share_section,
+    track_experience, follow_job, memo_opt_in,
+    show_image_pending, show_lite_placeholder, show_lite_notice)
+from utils.openai_client import generate_chat, generate_chat_stream, generate_image, generate_json_pipelined
+from utils.result_cache import canonical_key, load_result, save_result, save_story
+from utils.cancellation import cancel_page_jobs
+from utils.inflight import inflight_key
+from utils.jobs import JobFailed, forget_job, job_has_budget, job_running, start_job
+from utils.deadline import start_run_deadline
+from utils.lite_mode import is_lite
+from utils.schemas import PastLife, parse_result
 from utils.share_card import generate_pastlife_card
 
 apply_common_styles()
@@ -29,6 +36,7 @@ PASTLIFE_SYSTEM_PROMPT = """당신은 전생을 읽어내는 신비로운 영매
   "location": "구체적 장소",
   "past_name": "전생 이름",
   "occupation": "전생 직업",
+  "portrait_prompt": "DALL-E용 전생 초상화 프롬프트 (영문, 시대/의상/배경 포함)",
   "story": "전생 스토리 (500-800자, 소설체)",
   "stats": {
     "strength": 75,
@@ -38,8 +46,7 @@ PASTLIFE_SYSTEM_PROMPT = """당신은 전생을 읽어내는 신비로운 영매
     "creativity": 90,
     "resilience": 80
   },
-  "connection_to_present": "현생과의 연결 포인트 (200-300자)",
-  "portrait_prompt": "DALL-E용 전생 초상화 프롬프트 (영문, 시대/의상/배경 포함)"
+  "connection_to_present": "현생과의 연결 포인트 (200-300자)"
 }"""
 
 PORTRAIT_IMAGE_BASE = (
@@ -95,6 +102,47 @@ QUIZ_QUESTIONS = [
     },
 ]
 
+# --- 백그라운드 작업 ---
+def _explore_past_life(job, user_prompt, memo_key):
+    """전생 JSON을 생성하고 초상화까지 그림 (작업 스레드에서 실행, 단계마다 job.update)"""
+    lite = is_lite()
+    # 초상화 프롬프트가 스트리밍되는 즉시 이미지 생성을 시작
+    raw, image_jobs = generate_json_pipelined(
+        PASTLIFE_SYSTEM_PROMPT, user_prompt,
+        {"portrait_prompt": lambda p: generate_image(PORTRAIT_IMAGE_BASE + p, page="past")},
+        page="past",
+        schema=PastLife,
+    )
+    result = parse_result(PastLife, raw)
+    if result is None:
+        raise JobFailed("전생 탐색에 실패했어요. 다시 시도해주세요!")
+    job.update("🎨 전생의 모습을 그리고 있어요...", result=result)
+
+    try:
+        image_job = image_jobs.get("portrait_prompt")
+        if image_job is not None:
+            image = image_job.result()
+        else:
+            image = generate_image(PORTRAIT_IMAGE_BASE + result.get("portrait_prompt", "historical portrait"), page="past")
+    except Exception:
+        image = None
+    # 그림이 실패했거나 라이트 모드로 줄인 결과는 7일간 재사용하지 않도록 저장하지 않음
+    if memo_key and image is not None and not (lite or is_lite()):
+        save_result(memo_key, result, image)
+    job.update(image=image)
+
+
+def _apply_past_life(partial):
+    """작업 결과를 세션 스테이트에 반영 (단계마다 다시 불려도 됨)"""
+    if "result" in partial and partial["result"] != st.session_state.pastlife_result:
+        st.session_state.pastlife_result = partial["result"]
+        st.session_state.pastlife_image = None
+        st.session_state.pastlife_story_streamed = False
+        st.session_state.pastlife_story_text = None
+    if "image" in partial:
+        st.session_state.pastlife_image = partial["image"]
+
+
 # --- 세션 스테이트 ---
 if "pastlife_result" not in st.session_state:
     st.session_state.pastlife_result = None
@@ -102,6 +150,10 @@ if "pastlife_image" not in st.session_state:
     st.session_state.pastlife_image = None
 if "pastlife_story_streamed" not in st.session_state:
     st.session_state.pastlife_story_streamed = False
+if "pastlife_story_text" not in st.session_state:
+    st.session_state.pastlife_story_text = None
+if "pastlife_memo_key" not in st.session_state:
+    st.session_state.pastlife_memo_key = None
 
 # --- 페이지 헤더 ---
 st.markdown(
@@ -153,7 +205,9 @@ for i, q in enumerate(QUIZ_QUESTIONS):
     answers.append(answer)
 
 st.markdown("")
+memo_enabled = memo_opt_in()
 if st.button("🌀 전생 찾기", use_container_width=True, type="primary"):
+    start_run_deadline("past")
     if not name or len(name.strip()) < 1:
         st.warning("이름을 알려주셔야 전생을 찾을 수 있어요!")
     elif None in answers:
@@ -169,36 +223,41 @@ if st.button("🌀 전생 찾기", use_container_width=True, type="primary"):
             f"[성격 퀴즈 답변]:\n{quiz_text}\n\n"
             f"위 정보를 바탕으로 이 사람의 전생을 찾아주세요."
         )
+        memo_key = canonical_key(
+            "past_life", name, birthdate,
+            [q["options"].index(a) for q, a in zip(QUIZ_QUESTIONS, answers)],
+        )
+        cached = load_result(memo_key) if memo_enabled else None
+        st.session_state.pastlife_memo_key = memo_key if memo_enabled else None
+
+        if cached is not None:
+            # 같은 입력으로 다시 왔으면 저장된 결과를 그대로 재생
+            forget_job("past")
+            st.session_state.pastlife_result = cached["result"]
+            st.session_state.pastlife_image = cached["image"]
+            st.session_state.pastlife_story_text = cached["story"]
+            st.session_state.pastlife_story_streamed = cached["story"] is not None
+            track_experience("past")
+            st.snow()
+        else:
+            # 생성은 백그라운드 작업으로: 진행 중에 다른 걸 눌러도 끊기지 않고, 재접속해도 이어받음
+            start_job(
+                "past", _explore_past_life, user_prompt, memo_key if memo_enabled else None,
+                key=inflight_key("past", "explore", user_prompt),
+            )
 
-        try:
-            show_loading_messages([
-                "🌀 시간의 강을 거슬러 올라가는 중...",
-                "📜 전생의 기억을 찾는 중...",
-                "✨ 운명의 실을 풀어내는 중...",
-            ], delay=1.5)
-
-            with st.spinner("🌀 시간의 강을 거슬러 올라가고 있어요..."):
-                raw = generate_chat(PASTLIFE_SYSTEM_PROMPT, user_prompt, json_mode=True)
-                result = safe_parse_json(raw)
-
-            if result is None:
-                show_error("전생 탐색에 실패했어요. 다시 시도해주세요!")
-            else:
-                st.session_state.pastlife_result = result
-                st.session_state.pastlife_story_streamed = False
-
-                with st.spinner("🎨 전생의 모습을 그리고 있어요..."):
-                    try:
-                        prompt = PORTRAIT_IMAGE_BASE + result.get("portrait_prompt", "historical portrait")
-                        st.session_state.pastlife_image = generate_image(prompt)
-                    except Exception:
-                        st.session_state.pastlife_image = None
-
-                track_experience("past")
-                st.snow()
-
-        except Exception as e:
-            show_error(f"전생 탐색 중 문제가 발생했어요: {e}")
+if follow_job(
+    "past",
+    _apply_past_life,
+    [
+        "🌀 시간의 강을 거슬러 올라가는 중...",
+        "📜 전생의 기억을 찾는 중...",
+        "✨ 운명의 실을 풀어내는 중...",
+    ],
+    "전생 탐색 중 문제가 발생했어요",
+):
+    track_experience("past")
+    st.snow()
 
 # --- 결과 표시 ---
 if st.session_state.pastlife_result:
@@ -218,6 +277,10 @@ if st.session_state.pastlife_result:
             st.markdown("<div class='image-frame glow-pulse'>", unsafe_allow_html=True)
             st.image(st.session_state.pastlife_image, caption="전생 초상화", use_container_width=True)
             st.markdown("</div>", unsafe_allow_html=True)
+        elif job_running("past"):
+            show_image_pending("🎨", "전생의 모습을 그리고 있어요...", padding="60px")
+        elif is_lite():
+            show_lite_placeholder("📜", "전생 초상화는 잠시 두루마리 속에 잠들어 있어요", padding="60px")
         else:
             st.markdown(
                 "<div style='background:linear-gradient(145deg, #3D2B1A, #2B1E14); "
@@ -253,6 +316,9 @@ if st.session_state.pastlife_result:
         values_closed = values + [values[0]]
         categories_closed = categories + [categories[0]]
 
+        # 결과를 그릴 때만 필요하므로 여기서 임포트
+        import plotly.graph_objects as go
+
         fig = go.Figure(
             data=go.Scatterpolar(
                 r=values_closed,
@@ -279,19 +345,39 @@ if st.session_state.pastlife_result:
         st.plotly_chart(fig, use_container_width=True)
 
     # 전생 스토리 (스트리밍)
-    if not st.session_state.pastlife_story_streamed:
-        story_prompt = f"다음 전생 스토리를 더 드라마틱하게 500-800자로 다시 들려주세요. 소설체로:\n{result.get('story', '')}"
+    # 전생을 찾기 시작한 실행의 남은 시간이 부족하면 스트리밍은 건너뛰고 기본 스토리를 표시
+    if not st.session_state.pastlife_story_streamed and job_has_budget("past", "stream"):
+        # 라이트 모드에서는 짧게 (토큰 상한도 라우팅에서 함께 낮아짐)
+        lite = is_lite()
+        length = "200-300자" if lite else "500-800자"
+        story_prompt = f"다음 전생 스토리를 더 드라마틱하게 {length}로 다시 들려주세요. 소설체로:\n{result.get('story', '')}"
         st.markdown("<div class='result-card slide-up'><h3>📖 전생 이야기</h3>", unsafe_allow_html=True)
-        st.write_stream(generate_chat_stream(
-            "당신은 시간의 방랑자입니다. 서사적이고 드라마틱한 톤으로 전생 이야기를 들려줍니다.",
-            story_prompt
-        ))
+        try:
+            story_text = st.write_stream(generate_chat_stream(
+                "당신은 시간의 방랑자입니다. 서사적이고 드라마틱한 톤으로 전생 이야기를 들려줍니다.",
+                story_prompt,
+                page="past",
+            ))
+        except Exception:
+            # 스트리밍은 선택 사항 — 실패하면 (마감 시간 초과 포함) 기본 스토리로 대체
+            story_text = None
+            st.markdown(
+                f"<p style='font-size:1.15em !important; line-height:2 !important;'>{result.get('story', '')}</p>",
+                unsafe_allow_html=True,
+            )
         st.markdown("</div>", unsafe_allow_html=True)
+        if lite:
+            show_lite_notice()
         st.session_state.pastlife_story_streamed = True
+        st.session_state.pastlife_story_text = story_text
+        # 줄인 버전은 메모에 남기지 않음 (다음 방문 때 전체 버전을 들려주기 위해)
+        if story_text and st.session_state.pastlife_memo_key and not lite:
+            save_story(st.session_state.pastlife_memo_key, story_text, result)
     else:
+        story = st.session_state.pastlife_story_text or result.get('story', '')
         st.markdown(
             f"<div class='result-card slide-up'><h3>📖 전생 이야기</h3>"
-            f"<p style='font-size:1.15em !important; line-height:2 !important;'>{result.get('story', '')}</p>"
+            f"<p style='font-size:1.15em !important; line-height:2 !important;'>{story}</p>"
             f"</div>", unsafe_allow_html=True)
 
     # 현생과의 연결
@@ -316,6 +402,7 @@ if st.session_state.pastlife_result:
                 value=datetime.date(2000, 1, 1))
 
         if st.button("💫 궁합 보기", key="btn_compat"):
+            start_run_deadline("past")
             if friend_name:
                 compat_prompt = (
                     f"[나]: {name}, {result.get('era', '')} {result.get('country', '')}의 {result.get('occupation', '')}\n"
@@ -325,7 +412,8 @@ if st.session_state.pastlife_result:
                 with st.spinner("💫 전생 궁합을 보고 있어요..."):
                     compat_result = generate_chat(
                         "당신은 전생을 읽는 영매입니다. 두 사람의 전생 인연을 재미있고 따뜻하게 분석합니다.",
-                        compat_prompt
+                        compat_prompt,
+                        page="past",
                     )
                 st.markdown(f"<div class='result-card'><h3>💫 전생 궁합 결과</h3><p>{compat_result}</p></div>", unsafe_allow_html=True)
             else:
@@ -347,9 +435,13 @@ if st.session_state.pastlife_result:
     # 다시 하기
     st.markdown("")
     if st.button("🔄 다른 답변으로 다시 찾기"):
+        # 아직 진행 중인 생성(스트리밍, 그림)을 멈추고 연결을 반납
+        cancel_page_jobs()
+        forget_job("past")
         st.session_state.pastlife_result = None
         st.session_state.pastlife_image = None
         st.session_state.pastlife_story_streamed = False
+        st.session_state.pastlife_story_text = None
         st.rerun()
 
 show_other_features_legacy("past")
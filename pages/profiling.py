@@ -1,12 +1,19 @@
 import streamlit as st
-import plotly.graph_objects as go
 from utils.ui_components import (
-    apply_common_styles, show_disclaimer, safe_parse_json,
-    show_error, show_other_features, show_share_section,
-    track_experience, show_loading_messages,
+    apply_common_styles, show_disclaimer,
+    show_other_features, show_share_section,
+    track_experience, follow_job,
+    show_image_pending, show_lite_placeholder, show_lite_notice,
 )
-from utils.openai_client import generate_chat, generate_chat_stream, generate_image
+from utils.openai_client import generate_chat_stream, generate_image, generate_json_pipelined
+from utils.cancellation import cancel_page_jobs
+from utils.inflight import inflight_key
+from utils.jobs import JobFailed, forget_job, job_has_budget, job_running, start_job
+from utils.deadline import start_run_deadline
+from utils.lite_mode import is_lite
+from utils.schemas import ProfilingReport, parse_result
 from utils.share_card import generate_profiling_card
+from utils.profiling_archetypes import PORTRAIT_IMAGE_BASE, lookup_profile
 
 apply_common_styles()
 
@@ -27,6 +34,7 @@ PROFILING_SYSTEM_PROMPT = """당신은 FBI 행동분석팀(BAU)의 수석 프로
 {
     "type_name": "유형명",
     "one_liner": "한 줄 프로파일 (이 사람을 한 문장으로)",
+    "portrait_prompt": "DALL-E용 이 유형의 캐릭터 일러스트 프롬프트 (영문, 성격과 분위기 반영)",
     "danger_level": "위험등급 (S~D)",
     "danger_reason": "위험등급 이유 (재미있게)",
     "abilities": {
@@ -41,16 +49,9 @@ PROFILING_SYSTEM_PROMPT = """당신은 FBI 행동분석팀(BAU)의 수석 프로
     "weakness": "치명적 약점 (귀여운 것으로)",
     "partner_type": "최적 파트너 유형",
     "secret_personality": "겉으로 드러나지 않는 숨겨진 성격 (200-300자)",
-    "recommended_role": "추천 역할 (영화/드라마에서 맡을 법한 역할)",
-    "portrait_prompt": "DALL-E용 이 유형의 캐릭터 일러스트 프롬프트 (영문, 성격과 분위기 반영)"
+    "recommended_role": "추천 역할 (영화/드라마에서 맡을 법한 역할)"
 }"""
 
-PORTRAIT_IMAGE_BASE = (
-    "character portrait illustration, dramatic moody lighting, "
-    "psychological thriller style, detailed digital art, "
-    "cinematic composition, mystery atmosphere, "
-)
-
 QUIZ_QUESTIONS = [
     {
         "question": "무인도에 딱 하나만 가져갈 수 있다면?",
@@ -108,6 +109,42 @@ QUIZ_QUESTIONS = [
     },
 ]
 
+# --- background job ---
+def _build_profile(job, user_prompt):
+    """Report JSON, then the portrait; runs on a job thread and reports each stage."""
+    # Portrait generation starts as soon as portrait_prompt has streamed in
+    raw, image_jobs = generate_json_pipelined(
+        PROFILING_SYSTEM_PROMPT, user_prompt,
+        {"portrait_prompt": lambda p: generate_image(PORTRAIT_IMAGE_BASE + p, page="profiling")},
+        page="profiling",
+        schema=ProfilingReport,
+    )
+    result = parse_result(ProfilingReport, raw)
+    if result is None:
+        raise JobFailed("프로파일링에 실패했어요. 다시 시도해주세요!")
+    job.update("🎨 프로파일 캐릭터를 그리고 있어요...", result=result)
+
+    try:
+        image_job = image_jobs.get("portrait_prompt")
+        if image_job is not None:
+            image = image_job.result()
+        else:
+            image = generate_image(PORTRAIT_IMAGE_BASE + result.get("portrait_prompt", "mystery character"), page="profiling")
+    except Exception:
+        image = None
+    job.update(image=image)
+
+
+def _apply_profile(partial):
+    """Copy job outputs into the session state (safe to call again for every stage)."""
+    if "result" in partial and partial["result"] != st.session_state.profiling_result:
+        st.session_state.profiling_result = partial["result"]
+        st.session_state.profiling_image = None
+        st.session_state.profiling_streamed = False
+    if "image" in partial:
+        st.session_state.profiling_image = partial["image"]
+
+
 # --- session state ---
 if "profiling_result" not in st.session_state:
     st.session_state.profiling_result = None
@@ -115,6 +152,8 @@ if "profiling_image" not in st.session_state:
     st.session_state.profiling_image = None
 if "profiling_streamed" not in st.session_state:
     st.session_state.profiling_streamed = False
+if "profiling_quiz_text" not in st.session_state:
+    st.session_state.profiling_quiz_text = ""
 
 # --- page header ---
 st.markdown(
@@ -152,6 +191,7 @@ for i, q in enumerate(QUIZ_QUESTIONS):
 
 st.markdown("")
 if st.button("🧠 프로파일링 시작", use_container_width=True, type="primary"):
+    start_run_deadline("profiling")
     if None in answers:
         st.warning("모든 질문에 답해주세요! 정확한 프로파일링에 필요해요 🙏")
     else:
@@ -164,35 +204,36 @@ if st.button("🧠 프로파일링 시작", use_container_width=True, type="prim
             f"위 답변을 분석하여 심리 프로파일 보고서를 작성해주세요."
         )
 
-        try:
-            show_loading_messages([
-                "🧠 행동 패턴을 분석하는 중...",
-                "📊 심리 프로파일을 구축하는 중...",
-                "🔍 숨겨진 성격을 해독하는 중...",
-            ], delay=1.5)
-
-            with st.spinner("🧠 심리 프로파일을 작성하고 있어요..."):
-                raw = generate_chat(PROFILING_SYSTEM_PROMPT, user_prompt, json_mode=True)
-                result = safe_parse_json(raw)
-
-            if result is None:
-                show_error("프로파일링에 실패했어요. 다시 시도해주세요!")
-            else:
-                st.session_state.profiling_result = result
-                st.session_state.profiling_streamed = False
-
-                with st.spinner("🎨 프로파일 캐릭터를 그리고 있어요..."):
-                    try:
-                        prompt = PORTRAIT_IMAGE_BASE + result.get("portrait_prompt", "mystery character")
-                        st.session_state.profiling_image = generate_image(prompt)
-                    except Exception:
-                        st.session_state.profiling_image = None
-
-                track_experience("profiling")
-                st.balloons()
-
-        except Exception as e:
-            show_error(f"프로파일링 중 문제가 발생했어요: {e}")
+        st.session_state.profiling_quiz_text = quiz_text
+
+        # 미리 만들어 둔 유형 테이블에 있으면 즉시 응답
+        profile = lookup_profile([q["options"].index(a) for q, a in zip(QUIZ_QUESTIONS, answers)])
+        if profile is not None:
+            forget_job("profiling")
+            st.session_state.profiling_image = profile.pop("portrait")
+            st.session_state.profiling_result = profile
+            st.session_state.profiling_streamed = False
+            track_experience("profiling")
+            st.balloons()
+        else:
+            # Generation runs as a background job: it survives widget reruns and reconnects
+            start_job(
+                "profiling", _build_profile, user_prompt,
+                key=inflight_key("profiling", "profile", user_prompt),
+            )
+
+if follow_job(
+    "profiling",
+    _apply_profile,
+    [
+        "🧠 행동 패턴을 분석하는 중...",
+        "📊 심리 프로파일을 구축하는 중...",
+        "🔍 숨겨진 성격을 해독하는 중...",
+    ],
+    "프로파일링 중 문제가 발생했어요",
+):
+    track_experience("profiling")
+    st.balloons()
 
 # --- result display ---
 if st.session_state.profiling_result:
@@ -212,6 +253,10 @@ if st.session_state.profiling_result:
             st.markdown("<div class='image-frame glow-pulse'>", unsafe_allow_html=True)
             st.image(st.session_state.profiling_image, caption="프로파일 캐릭터", use_container_width=True)
             st.markdown("</div>", unsafe_allow_html=True)
+        elif job_running("profiling"):
+            show_image_pending("🎨", "프로파일 캐릭터를 그리고 있어요...", padding="60px")
+        elif is_lite():
+            show_lite_placeholder("🗂️", "몽타주는 감식반이 아직 작업 중이에요 (기밀 유지 중)", padding="60px")
         else:
             st.markdown(
                 "<div style='background:linear-gradient(145deg, #3D2B1A, #2B1E14); "
@@ -271,6 +316,9 @@ if st.session_state.profiling_result:
         values_closed = values + [values[0]]
         categories_closed = categories + [categories[0]]
 
+        # Imported here: only needed once a result renders
+        import plotly.graph_objects as go
+
         fig = go.Figure(
             data=go.Scatterpolar(
                 r=values_closed,
@@ -323,18 +371,29 @@ if st.session_state.profiling_result:
             unsafe_allow_html=True,
         )
 
-    # Secret personality (streaming)
-    if not st.session_state.profiling_streamed:
+    # Secret personality (streaming) — skipped if the deadline of the run that started the job is nearly spent
+    if not st.session_state.profiling_streamed and job_has_budget("profiling", "stream"):
+        # Lite mode asks for a shorter text (routing lowers the token cap too)
+        lite = is_lite()
+        length = "150자" if lite else "400자"
         secret_prompt = (
-            f"다음 숨겨진 성격 분석을 FBI 프로파일러 톤으로 더 상세하게 400자 내외로 풀어주세요:\n"
-            f"{result.get('secret_personality', '')}"
+            f"다음 숨겨진 성격 분석을 FBI 프로파일러 톤으로 더 상세하게 {length} 내외로 풀어주세요:\n"
+            f"{result.get('secret_personality', '')}\n\n"
+            f"[피험자의 퀴즈 답변]:\n{st.session_state.profiling_quiz_text}"
         )
         st.markdown("<div class='result-card slide-up'><h3>🔍 숨겨진 성격 분석</h3>", unsafe_allow_html=True)
-        st.write_stream(generate_chat_stream(
-            "당신은 FBI 행동분석팀 프로파일러입니다. 전문적이면서도 흥미로운 톤으로 분석합니다.",
-            secret_prompt,
-        ))
+        try:
+            st.write_stream(generate_chat_stream(
+                "당신은 FBI 행동분석팀 프로파일러입니다. 전문적이면서도 흥미로운 톤으로 분석합니다.",
+                secret_prompt,
+                page="profiling",
+            ))
+        except Exception:
+            # 개인화 스트리밍은 선택 사항 — 실패하면 기본 분석으로 대체
+            st.markdown(f"<p>{result.get('secret_personality', '')}</p>", unsafe_allow_html=True)
         st.markdown("</div>", unsafe_allow_html=True)
+        if lite:
+            show_lite_notice()
         st.session_state.profiling_streamed = True
     else:
         st.markdown(
@@ -365,6 +424,9 @@ if st.session_state.profiling_result:
     # Reset
     st.markdown("")
     if st.button("🔄 다시 프로파일링하기"):
+        # Stop generations still running for the old result and free their connections
+        cancel_page_jobs()
+        forget_job("profiling")
         st.session_state.profiling_result = None
         st.session_state.profiling_image = None
         st.session_state.profiling_streamed = False
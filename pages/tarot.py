@@ -1,11 +1,23 @@
+import copy
+import datetime
 import streamlit as st
 from utils.ui_components import (
-    apply_common_styles, show_disclaimer, safe_parse_json,
-    show_error, show_other_features_legacy, show_share_section,
-    track_experience, show_loading_messages,
+    apply_common_styles, show_disclaimer,
+    show_other_features_legacy, show_share_section,
+    track_experience, follow_job, show_image_pending, show_lite_placeholder,
 )
-from utils.openai_client import generate_chat, generate_chat_stream, generate_image
+from utils.openai_client import generate_chat, generate_chat_stream, generate_image, submit_background
+from utils.cancellation import cancel_page_jobs
+from utils.inflight import inflight_key
+from utils.jobs import JobFailed, forget_job, job_running, start_job
+from utils.deadline import has_budget, start_run_deadline
+from utils.lite_mode import is_lite
+from utils.schemas import TarotReading, parse_result
+from utils.semantic_cache import get_tarot_cache
 from utils.share_card import generate_tarot_card
+from utils.image_assets import download_image, optimized_bytes
+from utils.tarot_art import TAROT_ART_SIZE, TAROT_IMAGE_BASE, lookup_tarot_art, orient
+from utils.tarot_deck import draw_cards, reading_seed
 
 apply_common_styles()
 
@@ -15,33 +27,110 @@ TAROT_SYSTEM_PROMPT = """당신은 30년 경력의 신비로운 타로 마스터
 말투: 친근하면서도 신비로운 톤. "~했어요", "~네요" 체를 사용합니다.
 성격: 따뜻하고 긍정적이지만 솔직한 조언도 해줍니다.
 
+카드는 이미 뽑혀 있습니다. 각 카드의 기본 의미를 바탕으로 질문자의 고민에 맞춰 해석만 해주세요.
+
 규칙:
-1. 실제 타로카드 78장 중에서 카드를 선택해주세요 (메이저 아르카나 우선)
-2. 각 카드의 정통 해석을 기반으로 하되, 질문자의 고민에 맞춰 해석하세요
+1. 카드 순서대로 카드별 해석을 작성하세요 (각 100-150자)
+2. 기본 의미를 그대로 반복하지 말고 고민에 맞게 풀어주세요
 3. 부정적인 카드가 나와도 희망적 메시지를 담아주세요
 4. 마지막에 "오늘의 럭키 아이템"을 하나 재미있게 추천해주세요
 
 응답은 반드시 JSON 형식으로:
 {
-  "cards": [
-    {
-      "name": "카드 영문 이름",
-      "name_kr": "카드 한글 이름",
-      "direction": "정방향 또는 역방향",
-      "position": "과거/현재/미래 (쓰리카드만)",
-      "interpretation": "카드 해석 (200-300자)",
-      "image_keyword": "DALL-E 프롬프트용 핵심 키워드 3개 (영문)"
-    }
-  ],
-  "overall_advice": "종합 조언 (300-500자)",
+  "interpretations": ["1번 카드 해석", "2번 카드 해석", "3번 카드 해석"],
+  "overall_advice": "종합 조언 (200-300자)",
   "lucky_item": "오늘의 럭키 아이템"
 }"""
 
-TAROT_IMAGE_BASE = (
-    "mystical tarot card illustration, ornate golden border, "
-    "warm sepia and amber color scheme, vintage parchment glow, "
-    "detailed fantasy art style, vertical card format, "
-)
+# --- 백그라운드 작업 ---
+def _live_card_art(job, i, card):
+    """미리 그려둔 아트가 없는 카드를 실시간으로 그림 (역방향은 라이브러리와 똑같이 180도 회전)"""
+    url = generate_image(TAROT_IMAGE_BASE + card["image_keyword"], page="tarot")
+    if card["direction"] != "역방향":
+        return url
+    rotated = orient(download_image(url), card["direction"])
+    return job.save_file(f"-card{i}.webp", optimized_bytes(rotated, TAROT_ART_SIZE))
+
+
+def _interpret(worry, category, spread, drawn):
+    """뽑힌 카드를 고민에 맞춰 해석 (카드마다 interpretation을 채운 리딩을 반환)"""
+    cards_text = "\n".join(
+        f"{i+1}. {c['position'] + ' · ' if c['position'] else ''}{c['name_kr']} ({c['name']}, {c['direction']}): {c['base_meaning']}"
+        for i, c in enumerate(drawn)
+    )
+    user_prompt = (
+        f"[스프레드]: {spread}\n[카테고리]: {category}\n[고민]: {worry}\n\n"
+        f"[뽑힌 카드]:\n{cards_text}\n\n위 카드로 고민에 맞춘 타로 해석을 해주세요."
+    )
+    parsed = parse_result(TarotReading, generate_chat(TAROT_SYSTEM_PROMPT, user_prompt, page="tarot", schema=TarotReading))
+    if parsed is None:
+        raise JobFailed("타로 카드 해석에 실패했어요. 다시 시도해주세요!")
+    interpretations = parsed["interpretations"]
+    for i, card in enumerate(drawn):
+        card["interpretation"] = interpretations[i] if i < len(interpretations) else card["base_meaning"]
+    return {
+        "cards": drawn,
+        "overall_advice": parsed["overall_advice"],
+        "lucky_item": parsed["lucky_item"],
+    }
+
+
+def _draw_reading(job, worry, category, spread, num_cards):
+    """카드를 뽑고 해석 JSON과 카드 아트까지 준비 (작업 스레드에서 실행, 단계마다 job.update)"""
+    tarot_cache = get_tarot_cache()
+    try:
+        # 비슷한 고민이 이미 리딩된 적 있으면 그때 뽑힌 카드를 재사용
+        # (캐시에는 카드·방향·기본 의미만 있음: 해석과 조언은 다른 사람의 고민이라 항상 새로 씀)
+        worry_vector = tarot_cache.embed(worry)
+        cached = tarot_cache.get((category, spread), worry_vector)
+    except Exception:
+        worry_vector, cached = None, None
+
+    if cached is not None:
+        drawn = copy.deepcopy(cached[0]["cards"])
+    else:
+        # 같은 날 같은 고민이면 같은 카드가 나오도록 시드 고정
+        seed = reading_seed(worry, category, spread, datetime.date.today().isoformat())
+        drawn = draw_cards(num_cards, category, seed=seed)
+        if worry_vector is not None:
+            tarot_cache.put((category, spread), worry_vector, {"cards": copy.deepcopy(drawn)})
+
+    # 카드는 이미 정해졌으니 해석을 기다리지 않고 카드 아트부터 준비
+    # (미리 그려둔 아트가 있으면 바로 사용, 없을 때만 실시간 생성)
+    # 라이트 모드에서는 실시간 생성 없이 미리 그려둔 아트만 사용
+    art_jobs = []
+    lite = is_lite()
+    for i, card in enumerate(drawn):
+        art = lookup_tarot_art(card["name"], card["direction"])
+        if art is None and not lite:
+            art = submit_background(_live_card_art, job, i, card)
+        art_jobs.append(art)
+
+    # 해석이 실패하면 작업의 취소 범위가 닫히면서 아직 대기 중인 카드 그림도 취소됨 (utils.jobs)
+    reading = _interpret(worry, category, spread, drawn)
+
+    # 해석이 나오면 카드부터 보여주고, 그림은 완성되는 대로 채움
+    job.update("🎨 카드 이미지를 그리고 있어요...", result=reading, worry=worry, images=[])
+    images = []
+    for i, art in enumerate(art_jobs):
+        try:
+            images.append(art if art is None or isinstance(art, str) else art.result())
+        except Exception:
+            images.append(None)
+        job.update(f"🎨 {i+1}/{len(art_jobs)} 카드 완성!", images=list(images))
+
+
+def _apply_reading(partial):
+    """작업 결과를 세션 스테이트에 반영 (카드 그림이 완성될 때마다 다시 불려도 됨)"""
+    if "result" in partial and partial["result"] != st.session_state.tarot_result:
+        st.session_state.tarot_worry = partial["worry"]
+        st.session_state.tarot_result = partial["result"]
+        st.session_state.tarot_images = []
+        st.session_state.revealed_cards = set()
+        st.session_state.tarot_advice_streamed = False
+    if "images" in partial:
+        st.session_state.tarot_images = list(partial["images"])
+
 
 # --- 세션 스테이트 초기화 ---
 if "tarot_result" not in st.session_state:
@@ -52,6 +141,8 @@ if "revealed_cards" not in st.session_state:
     st.session_state.revealed_cards = set()
 if "tarot_advice_streamed" not in st.session_state:
     st.session_state.tarot_advice_streamed = False
+if "tarot_worry" not in st.session_state:
+    st.session_state.tarot_worry = ""
 
 # --- 페이지 헤더 ---
 st.markdown(
@@ -86,60 +177,43 @@ num_cards = 1 if "원카드" in spread_type else 3
 
 st.markdown("")
 if st.button("🔮 카드 뽑기", use_container_width=True, type="primary"):
+    start_run_deadline("tarot")
     if not worry or len(worry.strip()) < 5:
         st.warning("고민을 조금 더 자세히 적어주시면 더 정확한 리딩이 가능해요!")
     else:
-        user_prompt = f"[스프레드]: {'원카드' if num_cards == 1 else '쓰리카드'}\n[카테고리]: {category}\n[고민]: {worry}\n\n위 내용을 바탕으로 타로 리딩을 해주세요. 카드는 {num_cards}장 뽑아주세요."
+        spread = "원카드" if num_cards == 1 else "쓰리카드"
+        # 리딩은 백그라운드 작업으로: 진행 중에 다른 걸 눌러도 끊기지 않고, 재접속해도 이어받음
+        start_job(
+            "tarot", _draw_reading, worry.strip(), category, spread, num_cards,
+            key=inflight_key("tarot", "reading", worry.strip(), category, spread, datetime.date.today().isoformat()),
+        )
 
-        try:
-            # 단계별 로딩 메시지
-            show_loading_messages([
-                "🔮 카드를 섞고 있어요...",
-                "✨ 별자리와 교신 중...",
-                "🌙 운명의 카드를 뽑는 중...",
-            ], delay=1.5)
-
-            with st.spinner("🔮 카드를 해석하고 있어요..."):
-                raw = generate_chat(TAROT_SYSTEM_PROMPT, user_prompt, json_mode=True)
-                result = safe_parse_json(raw)
-
-            if result is None:
-                show_error("타로 카드 해석에 실패했어요. 다시 시도해주세요!")
-            else:
-                st.session_state.tarot_result = result
-                st.session_state.tarot_images = []
-                st.session_state.revealed_cards = set()
-                st.session_state.tarot_advice_streamed = False
-
-                cards = result.get("cards", [])
-                progress_bar = st.progress(0, text="카드 이미지를 그리고 있어요...")
-                for i, card in enumerate(cards):
-                    try:
-                        prompt = TAROT_IMAGE_BASE + card.get("image_keyword", card.get("name", "tarot card"))
-                        img_url = generate_image(prompt, size="1024x1792")
-                        st.session_state.tarot_images.append(img_url)
-                    except Exception:
-                        st.session_state.tarot_images.append(None)
-                    progress_bar.progress((i + 1) / len(cards), text=f"🎨 {i+1}/{len(cards)} 카드 완성!")
-                progress_bar.empty()
-
-                st.balloons()
-                track_experience("tarot")
-
-        except Exception as e:
-            show_error(f"타로 리딩 중 문제가 발생했어요: {e}")
+if follow_job(
+    "tarot",
+    _apply_reading,
+    [
+        "🔮 카드를 섞고 있어요...",
+        "✨ 별자리와 교신 중...",
+        "🌙 운명의 카드를 뽑는 중...",
+    ],
+    "타로 리딩 중 문제가 발생했어요",
+):
+    st.balloons()
+    track_experience("tarot")
 
-# --- 결과 표시 ---
-if st.session_state.tarot_result:
-    result = st.session_state.tarot_result
-    cards = result.get("cards", [])
-    images = st.session_state.tarot_images
+def _reveal_card(i, total):
+    st.session_state.revealed_cards.add(i)
+    if len(st.session_state.revealed_cards) == total:
+        # 마지막 카드면 종합 조언까지 보이도록 페이지 전체를 다시 그림
+        st.session_state["_tarot_spread_done"] = True
 
-    st.markdown("---")
-    st.markdown(
-        "<h2 style='text-align:center;' class='slide-up'>✨ 당신의 카드 ✨</h2>",
-        unsafe_allow_html=True,
-    )
+
+@st.fragment
+def _card_spread(cards):
+    """카드 공개 영역: 카드를 뒤집을 때는 이 부분만 다시 실행 (페이지 전체 재실행 없이)"""
+    if st.session_state.pop("_tarot_spread_done", False):
+        st.rerun()
+    images = st.session_state.tarot_images
 
     # 카드 순차 공개
     card_cols = st.columns(len(cards))
@@ -154,15 +228,17 @@ if st.session_state.tarot_result:
                     "</div>",
                     unsafe_allow_html=True,
                 )
-                if st.button(f"✨ {i+1}번 카드 공개", key=f"reveal_{i}"):
-                    st.session_state.revealed_cards.add(i)
-                    st.rerun()
+                st.button(f"✨ {i+1}번 카드 공개", key=f"reveal_{i}", on_click=_reveal_card, args=(i, len(cards)))
             else:
                 # 공개된 카드: 이미지/해석 표시
                 if i < len(images) and images[i]:
                     st.markdown("<div class='image-frame glow-pulse'>", unsafe_allow_html=True)
                     st.image(images[i], use_container_width=True)
                     st.markdown("</div>", unsafe_allow_html=True)
+                elif job_running("tarot"):
+                    show_image_pending("🎨", f"{card.get('name_kr', '타로카드')} 그리는 중...")
+                elif is_lite():
+                    show_lite_placeholder("🃏", card.get("name_kr", "타로카드"))
                 else:
                     st.markdown(
                         f"<div style='background:linear-gradient(145deg, #3D2B1A, #2B1E14); "
@@ -192,13 +268,39 @@ if st.session_state.tarot_result:
             with st.expander(f"🃏 {header}{card.get('name_kr', '')} ({card.get('direction', '')})"):
                 st.markdown(f"<p style='font-size:1.15em; line-height:1.9;'>{card.get('interpretation', '')}</p>", unsafe_allow_html=True)
 
+
+# --- 결과 표시 ---
+if st.session_state.tarot_result:
+    result = st.session_state.tarot_result
+    cards = result.get("cards", [])
+
+    st.markdown("---")
+    st.markdown(
+        "<h2 style='text-align:center;' class='slide-up'>✨ 당신의 카드 ✨</h2>",
+        unsafe_allow_html=True,
+    )
+
+    _card_spread(cards)
+
     # 종합 조언 (모든 카드 공개 시)
-    if len(revealed) == len(cards):
+    if len(st.session_state.revealed_cards) == len(cards):
         # 스트리밍 종합 조언
         if not st.session_state.tarot_advice_streamed:
-            advice_prompt = f"다음 타로 리딩 결과에 대해 따뜻하고 신비로운 톤으로 300-500자 종합 조언을 해주세요:\n{result.get('overall_advice', '')}"
+            # 마지막 카드를 뒤집어서 시작된 실행: 버튼 클릭처럼 조언 스트림에도 이번 실행의 마감 시간을 둠
+            start_run_deadline("tarot")
+        if not st.session_state.tarot_advice_streamed and has_budget("stream"):
+            # 리딩의 종합 조언을 바탕으로 이번 고민에 직접 답하도록 다시 풀어씀
+            advice_prompt = (
+                f"[고민]: {st.session_state.tarot_worry}\n\n"
+                f"다음 타로 리딩 결과를 바탕으로, 위 고민에 직접 답하는 따뜻하고 신비로운 톤의 300-500자 종합 조언을 해주세요:\n"
+                f"{result.get('overall_advice', '')}"
+            )
             st.markdown("<div class='result-card slide-up'><h3>✨ 종합 조언</h3>", unsafe_allow_html=True)
-            st.write_stream(generate_chat_stream("당신은 따뜻한 타로 마스터 미스틱 루나입니다. 친근하면서도 신비로운 톤으로 말합니다.", advice_prompt))
+            try:
+                st.write_stream(generate_chat_stream("당신은 따뜻한 타로 마스터 미스틱 루나입니다. 친근하면서도 신비로운 톤으로 말합니다.", advice_prompt, page="tarot"))
+            except Exception:
+                # 개인화 스트리밍은 선택 사항 — 실패하면 (마감 시간 초과 포함) 리딩의 종합 조언으로 대체
+                st.markdown(f"<p>{result.get('overall_advice', '')}</p>", unsafe_allow_html=True)
             st.markdown("</div>", unsafe_allow_html=True)
             st.session_state.tarot_advice_streamed = True
         else:
@@ -233,11 +335,15 @@ if st.session_state.tarot_result:
             file_name="tarot_result.png",
             mime="image/png",
             use_container_width=True,
+            on_click="ignore",  # 다운로드만 하고 페이지는 다시 그리지 않음
         )
 
     # 다시 하기
     st.markdown("")
     if st.button("🔄 다른 고민으로 다시 뽑기"):
+        # 아직 진행 중인 생성(스트리밍, 그림)을 멈추고 연결을 반납
+        cancel_page_jobs()
+        forget_job("tarot")
         st.session_state.tarot_result = None
         st.session_state.tarot_images = []
         st.session_state.revealed_cards = set()
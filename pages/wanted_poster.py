@@ -1,12 +1,20 @@
-import base64
 import streamlit as st
 from utils.ui_components import (
-    apply_common_styles, show_disclaimer, safe_parse_json,
+    apply_common_styles, show_disclaimer,
     show_error, show_other_features, show_share_section,
-    track_experience, show_loading_messages,
+    track_experience, follow_job, show_image_pending, show_lite_placeholder,
 )
-from utils.openai_client import generate_chat, generate_chat_with_image, generate_image
+from utils.openai_client import generate_chat_with_image, generate_image, generate_json_pipelined
+from utils.image_hash import PHOTO_CACHE, dhash
+from utils.image_prep import prepare_for_vision
+from utils.cancellation import cancel_page_jobs
+from utils.inflight import inflight_key
+from utils.jobs import JobFailed, forget_job, job_running, start_job
+from utils.deadline import start_run_deadline
+from utils.lite_mode import is_lite
+from utils.schemas import WantedPoster, parse_result
 from utils.share_card import generate_wanted_card
+from utils.wanted_fx import render_wanted_poster
 
 apply_common_styles()
 
@@ -25,12 +33,12 @@ WANTED_SYSTEM_PROMPT = """당신은 인터폴 수배전단 작성 전문가입
 {
     "suspect_name": "용의자 별명 (재미있게)",
     "crime": "죄목 (웃긴 것)",
+    "portrait_prompt": "DALL-E용 수배전단 스타일 캐릭터 일러스트 프롬프트 (영문, wanted poster style)",
     "danger_level": "위험등급 (S~D + 이유)",
     "bounty": "현상금 (코믹 단위)",
     "traits": ["특이사항1", "특이사항2", "특이사항3", "특이사항4"],
     "description": "용의자 설명 (150-200자, 유머러스하게)",
-    "warning": "시민들에게 경고 한마디 (재미있게)",
-    "portrait_prompt": "DALL-E용 수배전단 스타일 캐릭터 일러스트 프롬프트 (영문, wanted poster style)"
+    "warning": "시민들에게 경고 한마디 (재미있게)"
 }"""
 
 VISION_ANALYSIS_PROMPT = """이 사진의 인물 외모 특징을 분석해주세요.
@@ -48,11 +56,88 @@ WANTED_IMAGE_BASE = (
     "warm sepia tones, detailed character portrait, "
 )
 
+
+def _photo_namespace(fast: bool) -> str:
+    """PHOTO_CACHE namespace per mode: a fast-mode entry has no illustration to reuse."""
+    return "wanted-fast" if fast else "wanted"
+
+
+# --- background job ---
+def _make_poster(job, image_bytes, photo_hash, text_description, use_fast_poster):
+    """Vision analysis, poster JSON and the poster image (runs in a job worker, reporting each stage)."""
+    lite = is_lite()
+    if image_bytes is not None:
+        job.update("👁️ 사진을 분석하는 중...")
+        # Overall impression is enough here, so low detail (512px) suffices
+        b64_image, mime_type, detail = prepare_for_vision(image_bytes, detail="low")
+        appearance = generate_chat_with_image(
+            VISION_ANALYSIS_PROMPT,
+            "이 사진의 인물 외모를 분석해주세요.",
+            b64_image,
+            mime_type=mime_type,
+            detail=detail,
+            page="wanted",
+        )
+        user_prompt = f"[외모 분석 결과]:\n{appearance}\n\n위 외모 특징을 바탕으로 재미있는 수배전단을 작성해주세요."
+        job.update(stage="")
+    else:
+        user_prompt = f"[용의자 외모 묘사]:\n{text_description}\n\n위 묘사를 바탕으로 재미있는 수배전단을 작성해주세요."
+
+    # Fast mode renders locally, so only pipeline the illustration when DALL-E is used
+    triggers = {} if use_fast_poster else {
+        "portrait_prompt": lambda p: generate_image(WANTED_IMAGE_BASE + p, page="wanted"),
+    }
+    raw, image_jobs = generate_json_pipelined(
+        WANTED_SYSTEM_PROMPT, user_prompt, triggers, page="wanted", schema=WantedPoster,
+    )
+    result = parse_result(WantedPoster, raw)
+    if result is None:
+        raise JobFailed("수배전단 작성에 실패했어요. 다시 시도해주세요!")
+
+    image = None
+    if use_fast_poster:
+        # Local Pillow rendering; the DALL-E illustration becomes an optional upgrade.
+        # It shows the uploaded photo, so it stays in memory and is never written with the job
+        job.keep_unsaved(fast_poster=render_wanted_poster(image_bytes, result))
+        job.update(result=result)
+    else:
+        job.update("🎨 수배전단 일러스트를 그리고 있어요...", result=result)
+        try:
+            image_job = image_jobs.get("portrait_prompt")
+            if image_job is not None:
+                image = image_job.result()
+            else:
+                image = generate_image(WANTED_IMAGE_BASE + result.get("portrait_prompt", "wanted poster character"), page="wanted")
+        except Exception:
+            image = None
+        job.update(image=image)
+
+    # Only cache what a later upload should get again: not a failed illustration
+    # (fast mode has none by design), and nothing from a lite-mode run
+    illustrated = use_fast_poster or image is not None
+    if photo_hash is not None and illustrated and not (lite or is_lite()):
+        PHOTO_CACHE.put(_photo_namespace(use_fast_poster), photo_hash, {"result": result, "image": image})
+
+
+def _apply_poster(partial):
+    """Copy the job's outputs into the session state (safe to call again on every update)."""
+    if "result" in partial and partial["result"] != st.session_state.wanted_result:
+        st.session_state.wanted_result = partial["result"]
+        st.session_state.wanted_image = None
+        st.session_state.wanted_fast_poster = None
+    if "image" in partial:
+        st.session_state.wanted_image = partial["image"]
+    if "fast_poster" in partial:
+        st.session_state.wanted_fast_poster = partial["fast_poster"]
+
+
 # --- session state ---
 if "wanted_result" not in st.session_state:
     st.session_state.wanted_result = None
 if "wanted_image" not in st.session_state:
     st.session_state.wanted_image = None
+if "wanted_fast_poster" not in st.session_state:
+    st.session_state.wanted_fast_poster = None
 
 # --- page header ---
 st.markdown(
@@ -98,55 +183,54 @@ with input_tab3:
         key="wanted_text",
     )
 
+fast_mode = st.toggle(
+    "⚡ 빠른 모드 (사진을 바로 수배전단으로 변환)",
+    value=True,
+    help="사진을 올린 경우 AI 일러스트 대신 사진을 수배전단 스타일로 즉시 변환해요. AI 일러스트는 나중에 추가할 수 있어요.",
+    key="wanted_fast_mode",
+)
 st.markdown("</div>", unsafe_allow_html=True)
 
 st.markdown("")
 if st.button("🔍 수배전단 생성", use_container_width=True, type="primary"):
+    start_run_deadline("wanted")
     if not uploaded_image and (not text_description or len(text_description.strip()) < 5):
         st.warning("사진을 업로드하거나 외모를 묘사해주세요!")
     else:
-        try:
-            show_loading_messages([
-                "🔍 용의자 정보를 수집하는 중...",
-                "📋 인터폴 데이터베이스 검색 중...",
-                "🖨️ 수배전단을 작성하는 중...",
-            ], delay=1.5)
-
-            # Build user prompt
-            if uploaded_image:
-                with st.spinner("👁️ 사진을 분석하고 있어요..."):
-                    image_bytes = uploaded_image.read()
-                    b64_image = base64.b64encode(image_bytes).decode()
-                    appearance = generate_chat_with_image(
-                        VISION_ANALYSIS_PROMPT,
-                        "이 사진의 인물 외모를 분석해주세요.",
-                        b64_image,
-                    )
-                user_prompt = f"[외모 분석 결과]:\n{appearance}\n\n위 외모 특징을 바탕으로 재미있는 수배전단을 작성해주세요."
-            else:
-                user_prompt = f"[용의자 외모 묘사]:\n{text_description}\n\n위 묘사를 바탕으로 재미있는 수배전단을 작성해주세요."
-
-            with st.spinner("🔍 수배전단을 작성하고 있어요..."):
-                raw = generate_chat(WANTED_SYSTEM_PROMPT, user_prompt, json_mode=True)
-                result = safe_parse_json(raw)
-
-            if result is None:
-                show_error("수배전단 작성에 실패했어요. 다시 시도해주세요!")
-            else:
-                st.session_state.wanted_result = result
-
-                with st.spinner("🎨 수배전단 일러스트를 그리고 있어요..."):
-                    try:
-                        prompt = WANTED_IMAGE_BASE + result.get("portrait_prompt", "wanted poster character")
-                        st.session_state.wanted_image = generate_image(prompt)
-                    except Exception:
-                        st.session_state.wanted_image = None
-
-                track_experience("wanted")
-                st.balloons()
+        photo_hash = None
+        cached = None
+        if uploaded_image:
+            image_bytes = uploaded_image.getvalue()
+            photo_hash = dhash(image_bytes)
+            # Near-duplicate of a recent upload: reuse its analysis and illustration
+            cached = PHOTO_CACHE.get(_photo_namespace(fast_mode), photo_hash)
+
+        if cached is not None:
+            forget_job("wanted")
+            st.session_state.wanted_result = cached["result"]
+            st.session_state.wanted_image = cached["image"]
+            st.session_state.wanted_fast_poster = (
+                render_wanted_poster(image_bytes, cached["result"]) if fast_mode else None
+            )
+            track_experience("wanted")
+            st.balloons()
+        else:
+            # Runs as a background job: other clicks don't interrupt it and a reconnect picks it up again
+            use_fast_poster = bool(uploaded_image) and fast_mode
+            start_job(
+                "wanted", _make_poster,
+                image_bytes if uploaded_image else None, photo_hash, text_description, use_fast_poster,
+                key=inflight_key("wanted", "poster", image_bytes if uploaded_image else text_description, use_fast_poster),
+            )
 
-        except Exception as e:
-            show_error(f"수배전단 생성 중 문제가 발생했어요: {e}")
+if follow_job(
+    "wanted",
+    _apply_poster,
+    ["📋 인터폴 데이터베이스 검색 중...", "🖨️ 수배전단을 작성하는 중..."],
+    "수배전단 생성 중 문제가 발생했어요",
+):
+    track_experience("wanted")
+    st.balloons()
 
 # --- result display ---
 if st.session_state.wanted_result:
@@ -165,6 +249,26 @@ if st.session_state.wanted_result:
             st.markdown("<div class='image-frame glow-pulse'>", unsafe_allow_html=True)
             st.image(st.session_state.wanted_image, caption="용의자 몽타주", use_container_width=True)
             st.markdown("</div>", unsafe_allow_html=True)
+        elif st.session_state.wanted_fast_poster:
+            st.markdown("<div class='image-frame'>", unsafe_allow_html=True)
+            st.image(st.session_state.wanted_fast_poster, caption="수배전단 (빠른 모드)", use_container_width=True)
+            st.markdown("</div>", unsafe_allow_html=True)
+            if is_lite():
+                st.caption("⚡ 연구실이 붐벼서 AI 일러스트 업그레이드는 잠시 쉬어가요")
+            elif st.button("🎨 AI 일러스트로 업그레이드", use_container_width=True):
+                start_run_deadline("wanted")
+                with st.spinner("🎨 수배전단 일러스트를 그리고 있어요..."):
+                    try:
+                        prompt = WANTED_IMAGE_BASE + result.get("portrait_prompt", "wanted poster character")
+                        st.session_state.wanted_image = generate_image(prompt, page="wanted")
+                    except Exception:
+                        show_error("일러스트 생성에 실패했어요. 잠시 후 다시 시도해주세요!")
+                if st.session_state.wanted_image:
+                    st.rerun()
+        elif job_running("wanted"):
+            show_image_pending("🎨", "몽타주를 그리고 있어요...", padding="60px")
+        elif is_lite():
+            show_lite_placeholder("📌", "몽타주 화가가 잠복 근무 중이에요", padding="60px")
         else:
             st.markdown(
                 "<div style='background:linear-gradient(145deg, #3D2B1A, #2B1E14); "
@@ -262,8 +366,12 @@ if st.session_state.wanted_result:
     # Reset
     st.markdown("")
     if st.button("🔄 새로운 수배전단 만들기"):
+        # Stop generations still running for the old result and free their connections
+        cancel_page_jobs()
+        forget_job("wanted")
         st.session_state.wanted_result = None
         st.session_state.wanted_image = None
+        st.session_state.wanted_fast_poster = None
         st.rerun()
 
 show_other_features("wanted")
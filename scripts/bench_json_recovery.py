@@ -0,0 +1,104 @@
+"""
+Micro-benchmark: legacy safe_parse_json vs the jiter-based parse_json_lenient.
+
+The corpus reproduces the failure shapes seen in page responses: code fences,
+prose before/after the object, and vision replies cut off by max_tokens at
+every point in the text.
+
+Usage (from the repo root):
+    python -m scripts.bench_json_recovery
+    python -m scripts.bench_json_recovery --repeat 50
+"""
+
+import argparse
+import json
+import time
+from collections import Counter
+
+from utils.schemas import parse_json_lenient
+
+SAMPLE = {
+    "character_description": "a calm young scholar with sharp eyes, watercolor portrait",
+    "face_parts": {
+        part: {"feature": "넓고 시원한 이마", "meaning": "초년운이 밝고 지혜로운 상", "emoji": "✨"}
+        for part in ("forehead", "eyes", "nose", "mouth", "jaw")
+    },
+    "overall_reading": "타고난 총명함과 따뜻한 인상이 조화를 이루는 관상입니다. " * 6,
+    "hidden_personality": ["완벽주의", "의외의 허당", "정이 많음"],
+    "matching_jobs": [{"job": "연구원", "reason": "집중력이 뛰어나서"}] * 3,
+    "scores": {"wealth": 85, "love": 78, "health": 90, "social": 82},
+}
+
+
+def _legacy_safe_parse_json(text: str) -> dict | None:
+    """The pre-jiter implementation, kept here for comparison."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    try:
+        if "```json" in text:
+            json_str = text.split("```json")[1].split("```")[0]
+            return json.loads(json_str)
+    except (json.JSONDecodeError, IndexError):
+        pass
+    try:
+        if "{" in text:
+            start = text.index("{")
+            end = text.rindex("}") + 1
+            return json.loads(text[start:end])
+    except (json.JSONDecodeError, ValueError):
+        pass
+    return None
+
+
+def build_corpus() -> list[tuple[str, str]]:
+    """(shape, text) pairs."""
+    body = json.dumps(SAMPLE, ensure_ascii=False, indent=2)
+    corpus = [
+        ("clean", body),
+        ("fenced", f"```json\n{body}\n```"),
+        ("prose-before", f"분석 결과입니다:\n{body}"),
+        ("prose-after", f"{body}\n\n재미로 봐주세요!"),
+        ("fenced+prose", f"관상 결과를 알려드릴게요.\n```json\n{body}\n```\n즐거운 하루 되세요."),
+    ]
+    # max_tokens cut-offs at 40 evenly spaced points, with and without an opening fence
+    for i in range(1, 41):
+        cut = body[: len(body) * i // 41]
+        corpus.append(("truncated", cut))
+        corpus.append(("fenced+truncated", f"```json\n{cut}"))
+    return corpus
+
+
+def _bench(parse, corpus, repeat: int) -> tuple[float, Counter]:
+    failures = Counter()
+    for shape, text in corpus:
+        if not parse(text):
+            failures[shape] += 1
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, text in corpus:
+            parse(text)
+    return (time.perf_counter() - start) / (repeat * len(corpus)) * 1e6, failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark JSON recovery on malformed responses")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    corpus = build_corpus()
+    print(f"corpus: {len(corpus)} responses, {Counter(shape for shape, _ in corpus)}")
+    for name, parse in (
+        ("legacy safe_parse_json", _legacy_safe_parse_json),
+        ("parse_json_lenient", lambda text: parse_json_lenient(text)[0]),
+    ):
+        per_call, failures = _bench(parse, corpus, args.repeat)
+        print(f"{name:24s} {per_call:8.1f} us/response  failures={sum(failures.values())} {dict(failures)}")
+
+    repairs = Counter(r for _, text in corpus for r in parse_json_lenient(text)[1])
+    print(f"repairs reported: {dict(repairs)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark: server time of a reveal click as a full page rerun vs a fragment rerun.
+
+Seeds each page with a canned result (no OpenAI calls) and times the script
+run that follows a click (from the runner's script-started to script-stopped
+events, so the test harness itself isn't counted), the way the server runs it:
+
+- full: the whole page script, which is what every reveal cost before the
+  interactive sections became ``st.fragment``s;
+- fragment: only the fragment that holds the clicked button.
+
+Uses ``streamlit.testing`` with one fragment storage and one script cache
+shared across runs (as in a server session), so a run can be restricted to a
+fragment id like a real fragment rerun and the page isn't recompiled each time.
+
+Usage (from the repo root):
+    python -m scripts.bench_reveal_reruns
+    python -m scripts.bench_reveal_reruns --repeat 30
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from streamlit.runtime.fragment import MemoryFragmentStorage
+from streamlit.runtime.scriptrunner import ScriptRunnerEvent
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.runtime.scriptrunner_utils.script_requests import RerunData
+from streamlit.testing.v1 import AppTest, app_test
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner, require_widgets_deltas
+from streamlit.testing.v1.element_tree import parse_tree_from_messages
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_STORAGE = MemoryFragmentStorage()
+_SCRIPT_CACHE = ScriptCache()
+_FRAGMENT_QUEUE: list[str] = []
+_STAMPS: list[float] = []
+
+
+class _SharedFragmentRunner(LocalScriptRunner):
+    """LocalScriptRunner that keeps fragments between runs and can run just a fragment."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._fragment_storage = _STORAGE
+        self._script_cache = _SCRIPT_CACHE
+        self.on_event.connect(self._stamp, weak=False)
+
+    def _stamp(self, sender, event, **kwargs):
+        if event == ScriptRunnerEvent.SCRIPT_STARTED or "STOPPED" in event.name:
+            _STAMPS.append(time.perf_counter())
+
+    def run(self, widget_state=None, query_params=None, timeout=3, page_hash=""):
+        self.request_rerun(RerunData(
+            widget_states=widget_state,
+            page_script_hash=page_hash,
+            fragment_id_queue=list(_FRAGMENT_QUEUE),
+            is_fragment_scoped_rerun=bool(_FRAGMENT_QUEUE),
+        ))
+        if not self._script_thread:
+            self.start()
+        require_widgets_deltas(self, timeout)
+        return parse_tree_from_messages(self.forward_msgs())
+
+
+app_test.LocalScriptRunner = _SharedFragmentRunner
+
+TAROT_CARDS = [
+    {
+        "name": name, "name_kr": name_kr, "direction": "정방향", "position": position,
+        "image_keyword": "stars", "base_meaning": "기본 의미", "interpretation": "해석 " * 40,
+    }
+    for name, name_kr, position in [
+        ("The Star", "별", "과거"), ("The Sun", "태양", "현재"), ("The Moon", "달", "미래"),
+    ]
+]
+
+QUIZ_CASE = {
+    "case_title": "사라진 케이크", "difficulty": "초급", "scenario": "연구실 냉장고에서 케이크가 사라졌다. " * 5,
+    "scene_prompt": "lab fridge",
+    "suspects": [
+        {"name": n, "description": "연구원", "motive": "배고픔", "alibi": "회의 중"} for n in "ABCD"
+    ],
+    "clues": [{"title": f"단서 {i}", "content": "크림 자국 " * 10} for i in range(3)],
+    "culprit": "A", "explanation": "크림 자국이 A의 책상까지 이어져 있었다.",
+}
+
+SCENARIOS = {
+    "tarot reveal_0": (
+        "pages/tarot.py", "reveal_0",
+        {
+            "tarot_result": {"cards": TAROT_CARDS, "overall_advice": "조언", "lucky_item": "별사탕"},
+            "tarot_images": [None, None, None], "revealed_cards": set(),
+            "tarot_advice_streamed": False, "tarot_worry": "진로 고민",
+        },
+    ),
+    "quiz clue_0": (
+        "pages/mystery_quiz.py", "clue_0",
+        {
+            "quiz_case": QUIZ_CASE, "quiz_revealed_clues": set(), "quiz_answered": False,
+            "quiz_selected": None, "quiz_scene_image": None, "quiz_score": 0,
+        },
+    ),
+    # After answering, the full page also draws the verdict and the clues left unopened
+    "quiz answered": (
+        "pages/mystery_quiz.py", "clue_0",
+        {
+            "quiz_case": QUIZ_CASE, "quiz_revealed_clues": {1}, "quiz_answered": True,
+            "quiz_selected": "A", "quiz_scene_image": None, "quiz_score": 90,
+        },
+    ),
+}
+
+
+def _new_app(script: str, state: dict) -> AppTest:
+    at = AppTest.from_file(str(ROOT / script), default_timeout=30)
+    at.secrets["LITE_MODE"] = "off"
+    for key, value in state.items():
+        at.session_state[key] = value
+    return at
+
+
+def time_click(script: str, button_key: str, state: dict, fragment: bool) -> float:
+    """Seconds for the run triggered by clicking ``button_key`` on a freshly seeded page."""
+    _FRAGMENT_QUEUE.clear()
+    _STORAGE.clear()
+    at = _new_app(script, {k: (v.copy() if isinstance(v, (set, list)) else v) for k, v in state.items()})
+    at.run()
+    if fragment:
+        _FRAGMENT_QUEUE.extend(_STORAGE._fragments)
+    at.button(key=button_key).click()
+    _STAMPS.clear()
+    at.run()
+    elapsed = _STAMPS[-1] - _STAMPS[0]
+    _FRAGMENT_QUEUE.clear()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'interaction':<16} {'full (ms)':>10} {'fragment (ms)':>14}")
+    for name, (script, button_key, state) in SCENARIOS.items():
+        row = []
+        for fragment in (False, True):
+            times = [time_click(script, button_key, state, fragment) for _ in range(args.repeat)]
+            row.append(statistics.median(times) * 1000)
+        print(f"{name:<16} {row[0]:>10.1f} {row[1]:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Offline batch job: fill the profiling archetype table (reports + portraits).
+
+Usage (from the repo root, so .streamlit/secrets.toml is picked up):
+    python -m scripts.build_profiling_archetypes            # missing archetypes only
+    python -m scripts.build_profiling_archetypes --force    # regenerate everything
+"""
+
+import argparse
+
+from utils.openai_client import generate_chat, generate_image
+from utils.profiling_archetypes import ARCHETYPE_TABLE, build_archetype_table
+from utils.ui_components import safe_parse_json
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build profiling archetype table")
+    parser.add_argument("--force", action="store_true", help="regenerate archetypes that already exist")
+    args = parser.parse_args()
+
+    table = build_archetype_table(
+        lambda system, user: safe_parse_json(generate_chat(system, user, json_mode=True)),
+        generate_image,
+        force=args.force,
+    )
+    print(f"{len(table)} archetypes -> {ARCHETYPE_TABLE}")
+
+
+if __name__ == "__main__":
+    main()
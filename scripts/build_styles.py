@@ -0,0 +1,103 @@
+"""
+Deploy-time build step: self-host Noto Serif KR as small woff2 subsets.
+
+The pages used to load the font with a render-blocking ``@import`` from Google
+Fonts (all of Hangul, in three weights). This subsets the weights the CSS uses
+(400/700/900) to the characters the app can actually show:
+
+- every character in the string literals of ``app.py``, ``pages/`` and ``utils/``
+  (the UI copy, including the rare syllables it uses);
+- the 2,350 Hangul syllables of KS X 1001, for the generated stories (nearly
+  all modern Korean text), plus printable ASCII and common punctuation.
+
+It writes ``static/fonts/noto-serif-kr-<weight>.woff2`` and a manifest with
+each file's content hash. ``utils.styles`` turns the manifest into
+``@font-face`` rules (``font-display: swap``, ``?v=<hash>``), so first paint
+no longer waits on Google Fonts. A character outside the subset is drawn with
+the next font in the stack.
+
+The output isn't committed: run this as a deploy step, before starting the
+app. It needs ``pip install -r requirements-dev.txt`` (fontTools + brotli) and
+the static Noto Serif KR OTFs (``Serif/SubsetOTF/KR`` in
+github.com/notofonts/noto-cjk).
+
+Usage (from the repo root):
+    python -m scripts.build_styles --src ~/Downloads/noto-serif-kr
+"""
+
+import argparse
+import ast
+import hashlib
+import io
+import json
+from pathlib import Path
+
+from utils.styles import COMMON_CSS, FONT_DIR, FONT_MANIFEST, common_style_tag, minify_css
+
+ROOT = Path(__file__).resolve().parent.parent
+WEIGHTS = {400: "Regular", 700: "Bold", 900: "Black"}
+
+
+def source_text() -> str:
+    """Every string literal (f-string parts included) in the app's Python sources."""
+    paths = [ROOT / "app.py", *sorted((ROOT / "pages").glob("*.py")), *sorted((ROOT / "utils").glob("*.py"))]
+    return "".join(
+        node.value
+        for path in paths
+        for node in ast.walk(ast.parse(path.read_text(encoding="utf-8")))
+        if isinstance(node, ast.Constant) and isinstance(node.value, str)
+    )
+
+
+def ksx1001_hangul() -> str:
+    """The 2,350 precomposed Hangul syllables of KS X 1001 (two bytes in EUC-KR)."""
+    # Python's euc_kr also encodes the other syllables, as 8-byte jamo sequences
+    return "".join(chr(code) for code in range(0xAC00, 0xD7A4) if len(chr(code).encode("euc_kr")) == 2)
+
+
+def glyph_set() -> set[int]:
+    codepoints = {ord(c) for c in source_text() + ksx1001_hangul()}
+    codepoints.update(range(0x20, 0x7F))      # printable ASCII
+    codepoints.update(range(0x2010, 0x2027))  # dashes, curly quotes, bullet, ellipsis
+    codepoints.update(range(0x3000, 0x3020))  # CJK punctuation and brackets
+    return codepoints
+
+
+def subset_font(src: Path, codepoints: set[int]) -> bytes:
+    from fontTools import subset
+
+    options = subset.Options(flavor="woff2")
+    font = subset.load_font(str(src), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+    out = io.BytesIO()
+    subset.save_font(font, out, options)
+    return out.getvalue()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--src", type=Path, required=True, help="directory with NotoSerifKR-{Regular,Bold,Black}.otf")
+    args = parser.parse_args()
+
+    codepoints = glyph_set()
+    FONT_DIR.mkdir(parents=True, exist_ok=True)
+    manifest = {}
+    for weight, style in WEIGHTS.items():
+        src = args.src / f"NotoSerifKR-{style}.otf"
+        data = subset_font(src, codepoints)
+        name = f"noto-serif-kr-{weight}.woff2"
+        (FONT_DIR / name).write_bytes(data)
+        manifest[weight] = {"file": name, "hash": hashlib.sha256(data).hexdigest()[:12]}
+        print(f"{name:<26} {src.stat().st_size / 1024:>8.0f} KB -> {len(data) / 1024:>6.0f} KB")
+    FONT_MANIFEST.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    print(f"{len(codepoints)} code points -> {FONT_MANIFEST.relative_to(ROOT).as_posix()}")
+
+    css_size = len(COMMON_CSS.encode())
+    print(f"COMMON_CSS {css_size / 1024:.1f} KB -> {len(minify_css(COMMON_CSS).encode()) / 1024:.1f} KB minified, "
+          f"{len(common_style_tag().encode()) / 1024:.1f} KB injected with the @font-face rules")
+
+
+if __name__ == "__main__":
+    main()
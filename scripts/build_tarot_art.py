@@ -0,0 +1,28 @@
+"""
+Offline batch job: pre-render the full tarot deck art library.
+
+Usage (from the repo root, so .streamlit/secrets.toml is picked up):
+    python -m scripts.build_tarot_art            # render missing cards only
+    python -m scripts.build_tarot_art --force    # re-render everything
+"""
+
+import argparse
+
+from utils.openai_client import generate_image
+from utils.tarot_art import TAROT_ART_INDEX, build_tarot_art
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pre-render tarot card art")
+    parser.add_argument("--force", action="store_true", help="re-render cards that already exist")
+    args = parser.parse_args()
+
+    index = build_tarot_art(
+        lambda prompt: generate_image(prompt, size="1024x1792"),
+        force=args.force,
+    )
+    print(f"{len(index)} cards indexed -> {TAROT_ART_INDEX}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Cold-start import cost per page.
+
+Runs each page's module-level imports (and ``app.py``'s, which every page
+pays) in a fresh interpreter with ``python -X importtime``. Streamlit itself
+is imported first and reported separately, since it is loaded before any page
+runs. For each page the report shows the total import time and the packages
+that account for most of it, so a heavy dependency creeping back to a page's
+module top shows up here.
+
+Usage (from the repo root):
+    python -m scripts.profile_imports
+    python -m scripts.profile_imports --repeat 5 --top 5
+"""
+
+import argparse
+import ast
+import statistics
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE = "import streamlit"
+
+
+def module_imports(path: Path) -> list[str]:
+    """Source of the module-level import statements of ``path`` (imports inside functions are lazy)."""
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def _importtime(statements: list[str]) -> tuple[float, Counter]:
+    """(total ms, self ms per top-level package) for running ``statements`` after the baseline."""
+    code = "\n".join([BASELINE, "import sys; sys.stderr.write('--- page ---\\n')", *statements])
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    page_lines = proc.stderr.split("--- page ---\n", 1)[1]
+    total = 0.0
+    per_package: Counter = Counter()
+    for line in page_lines.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _cumulative, name = line[len("import time:"):].split("|")
+        total += int(self_us) / 1000
+        per_package[name.strip().split(".")[0]] += int(self_us) / 1000
+    return total, per_package
+
+
+def baseline_ms() -> float:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", BASELINE],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return sum(
+        int(line[len("import time:"):].split("|")[0]) / 1000
+        for line in proc.stderr.splitlines()
+        if line.startswith("import time:") and "self [us]" not in line
+    )
+
+
+def profile(path: Path, shared: list[str], repeat: int) -> tuple[float, Counter]:
+    """Median total over ``repeat`` cold runs, with the package breakdown of the median run."""
+    runs = sorted((_importtime(shared + module_imports(path)) for _ in range(repeat)), key=lambda r: r[0])
+    return runs[len(runs) // 2]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3, help="cold runs per page (median is reported)")
+    parser.add_argument("--top", type=int, default=4, help="heaviest packages to list per page")
+    args = parser.parse_args()
+
+    print(f"streamlit baseline: {statistics.median(baseline_ms() for _ in range(args.repeat)):.0f} ms\n")
+    shared = module_imports(ROOT / "app.py")
+    targets = [ROOT / "app.py"] + sorted((ROOT / "pages").glob("*.py"))
+    print(f"{'page':<24} {'imports (ms)':>12}  heaviest packages")
+    for path in targets:
+        total, per_package = profile(path, [] if path.name == "app.py" else shared, args.repeat)
+        heaviest = [(name, ms) for name, ms in per_package.most_common() if name != "utils"][: args.top]
+        breakdown = ", ".join(f"{name} {ms:.0f}" for name, ms in heaviest)
+        print(f"{path.relative_to(ROOT).as_posix():<24} {total:>12.0f}  {breakdown}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Admission control for OpenAI calls.
+
+Two layers keep a traffic spike from turning into a wall of 429s:
+
+- ``FairLimiter``: a process-wide concurrency cap per call class (chat, vision,
+  image). Callers over the cap wait in a FIFO queue and are admitted strictly
+  in arrival order, so nobody is starved and the API sees a steady load.
+- ``TokenBucket``: a per-session action budget, so one user mashing the
+  button cannot fill the queue ahead of everyone else.
+
+Queued tickets are tagged with the session from ``SESSION_ID`` so the page can
+show that user's queue position and ETA (the waiting room in
+``follow_job``).
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import cache
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils.cancellation import CANCEL_POLL, JobCancelled, cancel_requested
+from utils.deadline import DeadlineExceeded, remaining
+
+# Set on the script thread and carried into worker threads via copy_context()
+SESSION_ID: ContextVar[str | None] = ContextVar("admission_session_id", default=None)
+
+# Concurrent in-flight requests per call class; override with ADMISSION_LIMITS in secrets
+DEFAULT_LIMITS = {"chat": 24, "vision": 8, "image": 6}
+CALL_CLASS = {"chat": "chat", "stream": "chat", "vision": "vision", "image": "image"}
+
+# Per-session button budget: BUCKET_BURST actions at once, then one every BUCKET_REFILL seconds
+BUCKET_BURST = 4
+BUCKET_REFILL = 10.0
+
+
+class FairLimiter:
+    """Counting semaphore with a FIFO waiting line and a running estimate of hold time."""
+
+    def __init__(self, name: str, limit: int, initial_hold: float = 8.0):
+        self.name = name
+        self.limit = limit
+        self._cond = threading.Condition()
+        self._queue: deque[tuple[object, str | None]] = deque()
+        self._active = 0
+        self._avg_hold = initial_hold
+
+    @contextmanager
+    def slot(self):
+        ticket = (object(), SESSION_ID.get())
+        with self._cond:
+            self._queue.append(ticket)
+            while self._queue[0] is not ticket or self._active >= self.limit:
+                left = remaining()
+                if left is not None and left <= 0:
+                    self._queue.remove(ticket)
+                    self._cond.notify_all()
+                    raise DeadlineExceeded(f"still queued for a {self.name} slot at the run deadline")
+                if cancel_requested():
+                    self._queue.remove(ticket)
+                    self._cond.notify_all()
+                    raise JobCancelled(f"left the {self.name} queue: job cancelled")
+                self._cond.wait(timeout=CANCEL_POLL if left is None else min(left, CANCEL_POLL))
+            self._queue.popleft()
+            self._active += 1
+            self._cond.notify_all()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._avg_hold = 0.8 * self._avg_hold + 0.2 * (time.monotonic() - start)
+                self._cond.notify_all()
+
+    def waiting(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def position(self, session_id: str) -> tuple[int, float] | None:
+        """1-based queue position and ETA (seconds) of the session's first waiting ticket."""
+        with self._cond:
+            for i, (_, owner) in enumerate(self._queue):
+                if owner == session_id:
+                    waves = math.ceil((i + 1) / self.limit)
+                    return i + 1, waves * self._avg_hold
+        return None
+
+
+class TokenBucket:
+    """Per-key token buckets: ``take(key)`` returns 0 when admitted, else seconds until its token frees up."""
+
+    def __init__(self, burst: int = BUCKET_BURST, refill_seconds: float = BUCKET_REFILL):
+        self.burst = burst
+        self.refill_seconds = refill_seconds
+        self._lock = threading.Lock()
+        self._buckets: dict[str, tuple[float, float]] = {}  # key -> (tokens, updated)
+        self._pruned = time.monotonic()
+
+    def _refilled(self, tokens: float, updated: float, now: float) -> float:
+        return min(self.burst, tokens + (now - updated) / self.refill_seconds)
+
+    def _prune(self, now: float) -> None:
+        """Drop buckets that have refilled completely; a missing key starts out full anyway."""
+        self._buckets = {
+            key: (tokens, updated) for key, (tokens, updated) in self._buckets.items()
+            if self._refilled(tokens, updated, now) < self.burst
+        }
+        self._pruned = now
+
+    def take(self, key: str) -> float:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._pruned >= self.burst * self.refill_seconds:
+                self._prune(now)
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            # The token is always taken: a delayed action reserves it by running the
+            # balance negative, so the next one waits a full refill longer
+            tokens = self._refilled(tokens, updated, now) - 1
+            self._buckets[key] = (tokens, now)
+            return max(0.0, -tokens) * self.refill_seconds
+
+
+def current_session_id() -> str:
+    """Streamlit session id of the running script ("local" outside a session, e.g. batch scripts)."""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "local"
+
+
+@cache
+def get_limiters() -> dict[str, FairLimiter]:
+    limits = {**DEFAULT_LIMITS, **st.secrets.get("ADMISSION_LIMITS", {})}
+    return {name: FairLimiter(name, int(limit)) for name, limit in limits.items()}
+
+
+def admission_slot(call: str):
+    """Context manager holding one slot of the call's class (``chat``/``stream``/``vision``/``image``)."""
+    return get_limiters()[CALL_CLASS[call]].slot()
+
+
+def queue_status(session_id: str) -> tuple[int, float] | None:
+    """``(position, eta_seconds)`` if any of the session's calls are waiting, longest wait first."""
+    waiting = [p for limiter in get_limiters().values() if (p := limiter.position(session_id))]
+    return max(waiting, key=lambda p: p[1]) if waiting else None
+
+
+def queue_depth() -> int:
+    """Calls currently waiting for a slot, across all call classes."""
+    return sum(limiter.waiting() for limiter in get_limiters().values())
+
+
+SESSION_BUCKETS = TokenBucket()
@@ -0,0 +1,155 @@
+"""
+Cancellation of in-flight generations when the user leaves a page or resets it.
+
+Every script run works inside the ``CancelScope`` of the page it shows (set by
+``app.py`` through ``enter_page``). The scope travels into worker threads with
+``copy_context()`` like the admission session id and the run deadline.
+
+Cancelling a scope (navigating to another page, or a "🔄 다시" button calling
+``cancel_page_jobs``):
+
+- closes every open streaming response registered with ``close_on_cancel``,
+  which aborts the read and releases the connection immediately;
+- cancels registered futures that have not started yet;
+- makes queued calls leave the admission / dispatch queues within
+  ``CANCEL_POLL`` seconds and new calls fail before they are sent.
+
+A plain (non-streaming) request that is already on the wire cannot be aborted
+by the sync SDK; its result is simply dropped.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable
+
+import streamlit as st
+
+# Upper bound on how long a queued call keeps waiting after its scope is cancelled
+CANCEL_POLL = 0.5
+
+
+class JobCancelled(BaseException):
+    """The job's page was left or reset.
+
+    Like ``asyncio.CancelledError`` this is a ``BaseException``, so it passes
+    through the pages' ``except Exception`` fallbacks and isn't counted as an
+    API error in the metrics.
+    """
+
+
+class CancelScope:
+    """Thread-safe cancel flag plus the callbacks (stream closers, future cancels) to run on cancel."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._callbacks: dict[int, Callable[[], object]] = {}
+        self._next_id = 0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass  # the resource is already closed or finished
+
+    def on_cancel(self, callback: Callable[[], object]) -> Callable[[], None]:
+        """Run ``callback`` on cancel (right away if already cancelled); returns an unregister function."""
+        with self._lock:
+            if not self._cancelled:
+                handle = self._next_id
+                self._next_id += 1
+                self._callbacks[handle] = callback
+                return lambda: self._callbacks.pop(handle, None)
+        callback()
+        return lambda: None
+
+    def child(self) -> "CancelScope":
+        """A scope that is cancelled with this one but can also be cancelled on its own."""
+        child = CancelScope()
+        unregister = self.on_cancel(child.cancel)
+        child.on_cancel(unregister)
+        return child
+
+    def check(self) -> None:
+        if self._cancelled:
+            raise JobCancelled("job cancelled: its page was left or reset")
+
+
+_SCOPE: ContextVar[CancelScope | None] = ContextVar("cancel_scope", default=None)
+
+
+def current_scope() -> CancelScope | None:
+    return _SCOPE.get()
+
+
+def set_scope(scope: CancelScope | None) -> None:
+    """Make ``scope`` current for the rest of this context (e.g. a background job's worker)."""
+    _SCOPE.set(scope)
+
+
+def cancel_requested() -> bool:
+    scope = _SCOPE.get()
+    return scope is not None and scope.cancelled
+
+
+def check_cancelled() -> None:
+    """Raise ``JobCancelled`` if the current scope has been cancelled."""
+    scope = _SCOPE.get()
+    if scope is not None:
+        scope.check()
+
+
+@contextmanager
+def close_on_cancel(resource):
+    """Close ``resource`` (e.g. a streaming response) as soon as the current scope is cancelled."""
+    scope = _SCOPE.get()
+    if scope is None:
+        yield
+        return
+    unregister = scope.on_cancel(resource.close)
+    try:
+        yield
+    except Exception as e:
+        # Reading from a response closed under us fails with a transport error
+        if scope.cancelled:
+            raise JobCancelled("stream closed: job cancelled") from e
+        raise
+    finally:
+        unregister()
+
+
+def enter_page(page: str) -> None:
+    """Install this session's scope for ``page``, cancelling the previous page's work if the user moved."""
+    previous = st.session_state.get("_cancel_scope")
+    if previous is not None and previous[0] == page and not previous[1].cancelled:
+        scope = previous[1]
+    else:
+        if previous is not None and previous[0] != page:
+            previous[1].cancel()
+        scope = CancelScope()
+        st.session_state["_cancel_scope"] = (page, scope)
+    _SCOPE.set(scope)
+
+
+def cancel_page_jobs() -> None:
+    """Cancel everything the current page started and continue in a fresh scope (for reset buttons)."""
+    current = st.session_state.get("_cancel_scope")
+    if current is None:
+        return
+    page, scope = current
+    scope.cancel()
+    fresh = CancelScope()
+    st.session_state["_cancel_scope"] = (page, fresh)
+    _SCOPE.set(fresh)
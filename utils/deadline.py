@@ -0,0 +1,79 @@
+"""
+Per-run deadline shared by every OpenAI call of one experiment run.
+
+A page calls ``start_run_deadline(page)`` when its button is clicked. The
+deadline lives in a ContextVar, so it follows the run into the worker threads
+(they are submitted with ``copy_context()``). Each call then gets only the
+remaining budget as its timeout, queue waits give up when it runs out, and
+optional stages (images, streamed stories) are skipped once too little is left
+for them to finish. ``app.py`` clears the deadline at the start of every run.
+
+A background job (``utils.jobs``) keeps its run's deadline as a wall-clock time,
+so a stage the page runs in a later rerun (the story stream once the job's
+result is in) can be bounded by it again with ``resume_run_deadline``.
+"""
+
+import time
+from contextvars import ContextVar
+
+_DEADLINE: ContextVar[float | None] = ContextVar("run_deadline", default=None)
+
+DEFAULT_RUN_BUDGET = 75.0
+# Seconds per run, by track_experience page key (vision + chat + image pages get more)
+RUN_BUDGETS = {
+    "tarot": 60.0,
+    "face": 90.0,
+    "past": 75.0,
+    "news": 120.0,
+    "wanted": 100.0,
+    "parallel": 75.0,
+    "profiling": 75.0,
+    "quiz": 75.0,
+}
+
+# Below this much remaining budget a call of that type is not started at all
+STAGE_MIN_SECONDS = {"chat": 3.0, "vision": 4.0, "stream": 6.0, "image": 12.0}
+
+
+class DeadlineExceeded(TimeoutError):
+    """The run's budget is spent (or too low to start this stage)."""
+
+
+def start_run_deadline(page: str) -> None:
+    _DEADLINE.set(time.monotonic() + RUN_BUDGETS.get(page, DEFAULT_RUN_BUDGET))
+
+
+def clear_run_deadline() -> None:
+    _DEADLINE.set(None)
+
+
+def run_deadline_wall() -> float | None:
+    """The current deadline as a wall-clock time (to keep it with a background job)."""
+    left = remaining()
+    return None if left is None else time.time() + left
+
+
+def resume_run_deadline(wall_deadline: float | None) -> None:
+    """Re-install a deadline saved with ``run_deadline_wall``, unless this run has its own."""
+    if wall_deadline is not None and _DEADLINE.get() is None:
+        _DEADLINE.set(time.monotonic() + wall_deadline - time.time())
+
+
+def remaining() -> float | None:
+    """Seconds left in the current run, or None when no deadline is active."""
+    deadline = _DEADLINE.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def has_budget(stage: str) -> bool:
+    """Whether there is enough time left to start an optional stage (always True without a deadline)."""
+    left = remaining()
+    return left is None or left >= STAGE_MIN_SECONDS[stage]
+
+
+def require_budget(stage: str) -> float | None:
+    """Remaining seconds for a stage that is about to start; raises ``DeadlineExceeded`` if too low."""
+    left = remaining()
+    if left is not None and left < STAGE_MIN_SECONDS[stage]:
+        raise DeadlineExceeded(f"{stage} skipped: {max(left, 0):.1f}s left in this run")
+    return left
@@ -0,0 +1,56 @@
+"""
+Local storage helpers for pre-rendered / cached artwork.
+
+Images are stored under ``assets/`` as size-optimized WebP files so pages
+can show them instantly with ``st.image(path)``.
+"""
+
+import io
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+# requests and Pillow are only needed by the offline build jobs and cache writes,
+# so they are imported on first use rather than with every page
+if TYPE_CHECKING:
+    from PIL import Image
+
+ASSETS_DIR = Path(__file__).resolve().parent.parent / "assets"
+
+
+def download_image(url: str, timeout: float = 30) -> "Image.Image":
+    """Fetch an image URL (e.g. a DALL-E result) into a PIL Image."""
+    import requests
+    from PIL import Image
+
+    resp = requests.get(url, timeout=timeout)
+    resp.raise_for_status()
+    img = Image.open(io.BytesIO(resp.content))
+    img.load()
+    return img
+
+
+def _fit(img: "Image.Image", max_size: tuple[int, int]) -> "Image.Image":
+    from PIL import Image
+
+    img = img.convert("RGB")
+    img.thumbnail(max_size, Image.LANCZOS)
+    return img
+
+
+def save_optimized(
+    img: "Image.Image",
+    path: Path,
+    max_size: tuple[int, int],
+    quality: int = 80,
+) -> Path:
+    """Downscale to fit ``max_size`` and save as WebP. Returns the written path."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _fit(img, max_size).save(path, format="WEBP", quality=quality, method=6)
+    return path
+
+
+def optimized_bytes(img: "Image.Image", max_size: tuple[int, int], quality: int = 80) -> bytes:
+    """Like ``save_optimized``, but returns the WebP bytes (e.g. for ``Job.save_file``)."""
+    buf = io.BytesIO()
+    _fit(img, max_size).save(buf, format="WEBP", quality=quality, method=6)
+    return buf.getvalue()
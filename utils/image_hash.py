@@ -0,0 +1,74 @@
+"""
+Perceptual-hash cache for photo analyses.
+
+Uploaded photos are reduced to a 64-bit difference hash (dHash). A new upload
+within a small Hamming distance of a recent one (same selfie, recompressed or
+slightly cropped) reuses the earlier vision analysis and character image.
+Only the hash and derived results are kept, never the photo itself.
+"""
+
+import io
+import threading
+import time
+
+import numpy as np
+from PIL import Image, ImageOps
+
+HASH_SIZE = 8
+MAX_DISTANCE = 6           # out of 64 bits
+PHOTO_CACHE_TTL = 3600     # DALL-E image URLs expire after about an hour
+PHOTO_CACHE_MAX_ENTRIES = 512
+
+
+def dhash(image_bytes: bytes) -> int:
+    """64-bit difference hash of an image (EXIF orientation applied)."""
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        gray = ImageOps.exif_transpose(img).convert("L").resize(
+            (HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS
+        )
+        pixels = np.asarray(gray, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class PhotoAnalysisCache:
+    """Process-wide, thread-safe hash index: namespace -> [(hash, created, payload)]."""
+
+    def __init__(self, ttl: float = PHOTO_CACHE_TTL, max_entries: int = PHOTO_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._hashes: dict[str, np.ndarray] = {}
+        self._entries: dict[str, list[tuple[float, dict]]] = {}
+
+    def _evict_expired(self, namespace: str) -> None:
+        entries = self._entries.get(namespace, [])
+        now = time.time()
+        keep = [i for i, (created, _) in enumerate(entries) if now - created <= self.ttl]
+        keep = keep[-self.max_entries:]
+        if len(keep) != len(entries):
+            self._entries[namespace] = [entries[i] for i in keep]
+            self._hashes[namespace] = self._hashes[namespace][keep]
+
+    def get(self, namespace: str, image_hash: int, max_distance: int = MAX_DISTANCE) -> dict | None:
+        """Payload of the closest recent entry within ``max_distance`` bits, else None."""
+        with self._lock:
+            self._evict_expired(namespace)
+            hashes = self._hashes.get(namespace)
+            if hashes is None or len(hashes) == 0:
+                return None
+            distances = np.bitwise_count(hashes ^ np.uint64(image_hash))
+            best = int(np.argmin(distances))
+            if distances[best] > max_distance:
+                return None
+            return self._entries[namespace][best][1]
+
+    def put(self, namespace: str, image_hash: int, payload: dict) -> None:
+        with self._lock:
+            hashes = self._hashes.get(namespace, np.empty(0, dtype=np.uint64))
+            self._hashes[namespace] = np.append(hashes, np.uint64(image_hash))
+            self._entries.setdefault(namespace, []).append((time.time(), payload))
+            self._evict_expired(namespace)
+
+
+PHOTO_CACHE = PhotoAnalysisCache()
@@ -0,0 +1,54 @@
+"""
+Photo preprocessing before vision upload.
+
+Phone selfies are 3-8 MB at full resolution, while the vision model only looks
+at a 512px (low detail) or 768px-short-side (high detail) version. Orienting,
+cropping and downscaling locally cuts upload size and base64 memory by an
+order of magnitude without changing what the model sees.
+"""
+
+import base64
+import io
+
+from PIL import Image, ImageOps
+
+# Longest side sent for each detail level (a 4:5 crop at 960 is 768x960,
+# exactly what high detail rescales to anyway)
+DETAIL_MAX_SIDE = {"low": 512, "high": 960}
+JPEG_QUALITY = 85
+FACE_ASPECT = 4 / 5  # width / height of the face crop
+
+
+def crop_face_region(img: Image.Image) -> Image.Image:
+    """
+    Heuristic face crop: a centered 4:5 box, biased toward the top of portrait shots
+    where selfies put the face. Images already close to 4:5 are left alone.
+    """
+    w, h = img.size
+    if w / h > FACE_ASPECT * 1.1:
+        new_w = int(h * FACE_ASPECT)
+        left = (w - new_w) // 2
+        return img.crop((left, 0, left + new_w, h))
+    if w / h < FACE_ASPECT / 1.1:
+        new_h = int(w / FACE_ASPECT)
+        top = int((h - new_h) * 0.3)
+        return img.crop((0, top, w, top + new_h))
+    return img
+
+
+def prepare_for_vision(image_bytes: bytes, detail: str = "low", crop_face: bool = True) -> tuple[str, str, str]:
+    """
+    Orient, crop, downscale and re-encode a photo for ``generate_chat_with_image``.
+
+    Returns ``(base64_jpeg, mime_type, detail)``.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+    if crop_face:
+        img = crop_face_region(img)
+    max_side = DETAIL_MAX_SIDE[detail]
+    img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return base64.b64encode(buf.getvalue()).decode(), "image/jpeg", detail
@@ -0,0 +1,29 @@
+"""
+Keys identifying a generation by its inputs.
+
+Clicking "🔮 카드 뽑기" again while a reading is running would start a second,
+identical pipeline. Background jobs (``utils.jobs``) carry an
+``(page, action, input hash)`` key instead: a repeat trigger with the same
+inputs attaches to the running job, and a job that finished a moment ago is
+handed out again rather than regenerated.
+"""
+
+import hashlib
+import json
+
+JobKey = tuple[str, str, str]
+
+
+def _digest(value) -> bytes:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(value).digest()
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, default=repr).encode("utf-8")
+
+
+def inflight_key(page: str, action: str, *inputs) -> JobKey:
+    """Job key: page, action and a hash of everything the result depends on."""
+    h = hashlib.sha256()
+    for value in inputs:
+        h.update(_digest(value))
+        h.update(b"\0")
+    return page, action, h.hexdigest()[:16]
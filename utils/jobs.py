@@ -0,0 +1,324 @@
+"""
+Background jobs for the long generation pipelines.
+
+A button handler used to run the whole pipeline (JSON stream, then images)
+inline, so any widget interaction during those 30-60 s interrupted it and a
+websocket reconnect lost it. Now the handler only calls ``start_job``: the
+pipeline runs in the shared ``_JOB_POOL`` and reports each finished stage with
+``job.update(...)``. The page follows the job with ``follow_job``
+(``utils.ui_components``), an ``st.fragment(run_every=...)`` that applies new
+partial results to the session state as they arrive.
+
+Jobs are keyed by session and page. The current job id is kept in the session
+state and in the ``?job=`` query parameter, and every update is written to
+``.cache/jobs``, so a reconnected (or reloaded) page re-attaches to its job
+and finished work is never thrown away. The URL alone is not enough: a job is
+re-attached from ``?job=`` only in the session that started it or in a browser
+holding its owner token (the ``OWNER_COOKIE`` set by ``start_job``), so a
+shared link never shows someone else's result.
+
+Clicking the button again with the same inputs (same ``inflight_key``)
+attaches to the running job instead of starting a second one; different
+inputs cancel the old job. A job runs in a child of the page's cancel scope,
+so leaving or resetting the page still cancels it.
+"""
+
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable
+
+import streamlit as st
+
+from utils.admission import SESSION_BUCKETS, current_session_id
+from utils.cancellation import CANCEL_POLL, CancelScope, JobCancelled, current_scope, set_scope
+from utils.deadline import has_budget, resume_run_deadline, run_deadline_wall
+from utils.inflight import JobKey
+from utils.openai_client import get_openai_client
+
+JOB_DIR = Path(__file__).resolve().parent.parent / ".cache" / "jobs"
+JOB_TTL = 24 * 3600          # persisted job state (re-attach after reconnect / reload)
+JOB_MEMORY_TTL = 3600        # finished jobs kept in memory
+# Finished jobs stay attachable for a repeat click this long (covers a click that
+# interrupted the original run); failed and cancelled jobs are never reused
+JOB_REUSE_SECONDS = 30.0
+# Browser-side proof of who started a job, checked before re-attaching from ``?job=``
+OWNER_COOKIE = "lab_job_owner"
+
+_JOB_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix="job")
+
+RUNNING, DONE, FAILED, CANCELLED = "running", "done", "failed", "cancelled"
+
+
+class JobFailed(Exception):
+    """A pipeline step failed in an expected way; the message is shown to the user as is."""
+
+
+@dataclass
+class Job:
+    id: str
+    page: str
+    session_id: str
+    key: JobKey | None = None
+    status: str = RUNNING
+    stage: str = ""                 # progress message of the running stage ("" = page default)
+    partial: dict = field(default_factory=dict)  # stage outputs so far, JSON-serializable
+    message: str | None = None      # JobFailed message
+    error: str | None = None        # unexpected exception text
+    started: float = field(default_factory=time.time)
+    finished: float | None = None
+    deadline: float | None = None   # wall-clock end of the starting run's budget (utils.deadline)
+    owner: str | None = None        # owner token of the starting browser (OWNER_COOKIE)
+    version: int = 0                # bumped on every update so followers know what's new
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._scope: CancelScope | None = None
+        self._unsaved: dict = {}        # outputs kept in memory only (see keep_unsaved)
+
+    @property
+    def running(self) -> bool:
+        return self.status == RUNNING
+
+    def elapsed(self) -> float:
+        return (self.finished or time.time()) - self.started
+
+    def update(self, stage: str | None = None, **partial) -> None:
+        """Record progress from the worker: a new stage message and/or finished outputs."""
+        with self._lock:
+            if stage is not None:
+                self.stage = stage
+            self.partial.update(partial)
+            self.version += 1
+        _persist(self)
+
+    def keep_unsaved(self, **outputs) -> None:
+        """
+        Record outputs that must never be written to disk, e.g. anything rendered
+        from the user's photo. Followers get them like ``update`` outputs; a job
+        re-attached from disk after a restart doesn't have them.
+        """
+        with self._lock:
+            self._unsaved.update(outputs)
+            self.version += 1
+
+    def outputs(self) -> dict:
+        """Stage outputs so far, saved and unsaved."""
+        with self._lock:
+            return {**self.partial, **self._unsaved}
+
+    def save_file(self, suffix: str, data: bytes) -> str:
+        """Store a binary output (e.g. a locally rendered image) next to the job state; returns its path."""
+        JOB_DIR.mkdir(parents=True, exist_ok=True)
+        path = JOB_DIR / f"{self.id}{suffix}"
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        return str(path)
+
+    def _finish(self, status: str, message: str | None = None, error: str | None = None) -> None:
+        with self._lock:
+            self.status, self.message, self.error = status, message, error
+            self.finished = time.time()
+            self.version += 1
+        _persist(self)
+
+    def cancel(self) -> None:
+        if self._scope is not None:
+            self._scope.cancel()
+
+    def reusable(self) -> bool:
+        if self.status == RUNNING:
+            return self._scope is None or not self._scope.cancelled
+        return self.status == DONE and time.time() - self.finished <= JOB_REUSE_SECONDS
+
+
+_jobs_lock = threading.Lock()
+_JOBS: dict[str, Job] = {}
+
+
+def _path(job_id: str) -> Path:
+    return JOB_DIR / f"{job_id}.json"
+
+
+def _persist(job: Job) -> None:
+    JOB_DIR.mkdir(parents=True, exist_ok=True)
+    with job._lock:
+        state = asdict(job)
+    tmp = _path(job.id).with_suffix(f".{threading.get_ident()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, _path(job.id))
+
+
+def _load(job_id: str) -> Job | None:
+    try:
+        with open(_path(job_id), encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - state["started"] > JOB_TTL:
+        return None
+    if state.get("key") is not None:
+        state["key"] = tuple(state["key"])
+    job = Job(**state)
+    if job.running:
+        # Persisted as running but not in this process: the server restarted mid-job
+        job.status, job.message = FAILED, "서버가 재시작되어 작업이 중단됐어요. 다시 시도해주세요!"
+    return job
+
+
+def _prune() -> None:
+    now = time.time()
+    with _jobs_lock:
+        for job_id in [i for i, j in _JOBS.items() if j.finished and now - j.finished > JOB_MEMORY_TTL]:
+            del _JOBS[job_id]
+    if JOB_DIR.exists():
+        for path in JOB_DIR.iterdir():
+            try:
+                if now - path.stat().st_mtime > JOB_TTL:
+                    path.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+
+def get_job(job_id: str) -> Job | None:
+    """A job by id: live from this process, or its last persisted state."""
+    with _jobs_lock:
+        job = _JOBS.get(job_id)
+    return job if job is not None else _load(job_id)
+
+
+def _run(job: Job, delay: float, fn: Callable, args: tuple, kwargs: dict) -> None:
+    set_scope(job._scope)
+    try:
+        if delay > 0:
+            job.update(stage=f"⏳ 요청이 조금 많았어요. {int(delay) + 1}초 후에 시작할게요...")
+            until = time.monotonic() + delay
+            while (left := until - time.monotonic()) > 0:
+                job._scope.check()
+                time.sleep(min(left, CANCEL_POLL))
+            job.update(stage="")
+        fn(job, *args, **kwargs)
+    except JobCancelled:
+        job._finish(CANCELLED)
+    except JobFailed as e:
+        job._scope.cancel()  # drop what the job still has queued (e.g. image futures)
+        job._finish(FAILED, message=str(e))
+    except Exception as e:
+        job._scope.cancel()
+        job._finish(FAILED, error=str(e))
+    else:
+        # A cancelled image future only yields a missing image; the job itself was still cancelled
+        job._finish(CANCELLED if job._scope.cancelled else DONE)
+
+
+def _owner_token() -> str:
+    """This browser's owner token: from its cookie, or a new one that is set as the cookie now."""
+    token = st.session_state.get("_job_owner") or st.context.cookies.get(OWNER_COOKIE)
+    if token is None:
+        token = secrets.token_urlsafe(24)
+    if st.context.cookies.get(OWNER_COOKIE) != token and "_job_owner" not in st.session_state:
+        # Cookies can't be set from Python; the page sets it and sends it with the next session
+        st.html(
+            f"<script>document.cookie = '{OWNER_COOKIE}={token}; path=/; max-age={JOB_TTL}; SameSite=Strict';</script>",
+            unsafe_allow_javascript=True,
+        )
+    st.session_state["_job_owner"] = token
+    return token
+
+
+def _owns(job: Job) -> bool:
+    """Whether this session or browser started ``job``."""
+    if job.session_id == current_session_id():
+        return True
+    cookie = st.context.cookies.get(OWNER_COOKIE)
+    return job.owner is not None and cookie is not None and hmac.compare_digest(job.owner, cookie)
+
+
+def page_job(page: str) -> Job | None:
+    """This session's current job for ``page`` (re-attached from ``?job=`` after a reconnect or reload)."""
+    jobs = st.session_state.setdefault("_jobs", {})
+    job_id = jobs.get(page)
+    from_url = job_id is None
+    if from_url:
+        job_id = st.query_params.get("job")
+    job = get_job(job_id) if job_id else None
+    if job is None or job.page != page or (from_url and not _owns(job)):
+        return None
+    jobs[page] = job.id
+    return job
+
+
+def job_running(page: str) -> bool:
+    job = page_job(page)
+    return job is not None and job.running
+
+
+def start_job(page: str, fn: Callable, *args, key: JobKey | None = None, **kwargs) -> Job:
+    """
+    Run ``fn(job, *args, **kwargs)`` in the background and make it the page's current job.
+
+    Returns the already running (or just finished) job instead when ``key``
+    matches it. Call from the button handler, after ``start_run_deadline``: the
+    context (session id, deadline, cancel scope) is carried into the worker.
+    """
+    current = page_job(page)
+    if current is not None:
+        if key is not None and current.key == key and current.reusable():
+            return current
+        current.cancel()
+
+    _prune()
+    get_openai_client()  # create the cached client on the script thread first
+    session_id = current_session_id()
+    job = Job(
+        id=uuid.uuid4().hex, page=page, session_id=session_id, key=key,
+        deadline=run_deadline_wall(), owner=_owner_token(),
+    )
+    parent = current_scope()
+    job._scope = parent.child() if parent is not None else CancelScope()
+    _persist(job)
+    with _jobs_lock:
+        _JOBS[job.id] = job
+
+    # Over the per-session budget: the job waits its turn in the worker instead of the page
+    delay = SESSION_BUCKETS.take(session_id)
+    _JOB_POOL.submit(copy_context().run, _run, job, delay, fn, args, kwargs)
+
+    st.session_state.setdefault("_jobs", {})[page] = job.id
+    st.query_params["job"] = job.id
+    return job
+
+
+def job_has_budget(page: str, stage: str) -> bool:
+    """
+    Whether a follow-up ``stage`` still fits in the deadline of the run that started the page's job.
+
+    The job's result arrives in a later rerun, which has no deadline of its
+    own, so the job's is installed for the rest of this run (bounding the
+    follow-up call too).
+    """
+    job = page_job(page)
+    if job is not None:
+        resume_run_deadline(job.deadline)
+    return has_budget(stage)
+
+
+def forget_job(page: str) -> None:
+    """Cancel the page's job and detach from it (reset buttons)."""
+    job = page_job(page)
+    if job is None:
+        return
+    job.cancel()
+    st.session_state["_jobs"].pop(page, None)
+    if st.query_params.get("job") == job.id:
+        del st.query_params["job"]
@@ -0,0 +1,89 @@
+"""
+Lite mode: graceful degradation while the lab is overloaded.
+
+When the rolling OpenAI error rate or the admission queue grows past the enter
+thresholds, the app switches to lite mode:
+
+- ``generate_image`` raises ``LiteModeActive`` instead of calling DALL-E, so
+  pages fall back to pre-rendered art (tarot library, wanted fast poster) or a
+  themed placeholder;
+- streamed stories are capped at ``LITE_STREAM_MAX_TOKENS`` and pages ask for
+  a shorter text.
+
+It switches back only once both signals are under the (lower) exit thresholds
+and the mode has held for ``MIN_DWELL_SECONDS``, so it doesn't flap around the
+boundary. Operators can pin it with ``LITE_MODE = "on"`` / ``"off"`` in
+secrets (``"auto"``, the default, follows the metrics).
+"""
+
+import threading
+import time
+
+import streamlit as st
+
+from utils.admission import queue_depth
+from utils.metrics import METRICS
+
+# (error rate, queued calls) to switch on, and both must be at or below the exit pair to switch off
+ENTER_ERROR_RATE = 0.20
+ENTER_QUEUE_DEPTH = 20
+EXIT_ERROR_RATE = 0.05
+EXIT_QUEUE_DEPTH = 5
+MIN_ERROR_SAMPLES = 20   # error rate of a handful of calls is noise
+MIN_DWELL_SECONDS = 60.0
+CHECK_INTERVAL = 1.0     # metrics are re-read at most this often
+
+LITE_STREAM_MAX_TOKENS = 400
+
+
+class LiteModeActive(RuntimeError):
+    """An optional feature was skipped because lite mode is on."""
+
+
+class LiteModeSwitch:
+    """Two-threshold switch with a minimum dwell time; ``update`` returns the new state."""
+
+    def __init__(self, min_dwell: float = MIN_DWELL_SECONDS):
+        self.min_dwell = min_dwell
+        self.active = False
+        self._changed = float("-inf")
+
+    def update(self, error_rate: float, samples: int, queued: int, now: float) -> bool:
+        errors_high = samples >= MIN_ERROR_SAMPLES and error_rate >= ENTER_ERROR_RATE
+        errors_low = samples < MIN_ERROR_SAMPLES or error_rate <= EXIT_ERROR_RATE
+        if now - self._changed >= self.min_dwell:
+            if not self.active and (errors_high or queued >= ENTER_QUEUE_DEPTH):
+                self.active, self._changed = True, now
+            elif self.active and errors_low and queued <= EXIT_QUEUE_DEPTH:
+                self.active, self._changed = False, now
+        return self.active
+
+
+_SWITCH = LiteModeSwitch()
+_lock = threading.Lock()
+_checked = float("-inf")
+
+
+def _override() -> str:
+    return str(st.secrets.get("LITE_MODE", "auto")).lower()
+
+
+def is_lite() -> bool:
+    """Whether optional, expensive features should be skipped right now."""
+    global _checked
+    override = _override()
+    if override in ("on", "off"):
+        return override == "on"
+    now = time.monotonic()
+    with _lock:
+        if now - _checked >= CHECK_INTERVAL:
+            _checked = now
+            stats = METRICS.overall()
+            _SWITCH.update(stats["error_rate"], stats["count"], queue_depth(), now)
+        return _SWITCH.active
+
+
+def require_full_mode(feature: str) -> None:
+    """Raise ``LiteModeActive`` if ``feature`` should be skipped."""
+    if is_lite():
+        raise LiteModeActive(f"{feature} skipped: lite mode is on")
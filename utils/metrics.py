@@ -0,0 +1,82 @@
+"""
+Rolling latency and error-rate metrics for OpenAI calls.
+
+Each route (``"<page>/<call>/<model>"``) keeps the samples from the last
+``WINDOW_SECONDS``. Routing reads p95 latency and error rate from here to
+decide when to fall back to a faster model or a smaller image.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+WINDOW_SECONDS = 300
+WINDOW_MAX_SAMPLES = 500
+
+
+def _percentile(latencies: list[float], q: float) -> float:
+    if not latencies:
+        return 0.0
+    import numpy as np  # first routing decision, not every page load
+
+    return float(np.percentile(latencies, q))
+
+
+class RollingMetrics:
+    """Process-wide, thread-safe sample window per key: deque[(timestamp, latency, ok)]."""
+
+    def __init__(self, window: float = WINDOW_SECONDS, max_samples: int = WINDOW_MAX_SAMPLES):
+        self.window = window
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples: dict[str, deque] = {}
+
+    def _prune(self, key: str) -> deque:
+        samples = self._samples.setdefault(key, deque(maxlen=self.max_samples))
+        cutoff = time.monotonic() - self.window
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        return samples
+
+    def record(self, key: str, latency: float, ok: bool = True) -> None:
+        with self._lock:
+            self._prune(key).append((time.monotonic(), latency, ok))
+
+    def percentile(self, key: str, q: float) -> float:
+        """q-th percentile latency of successful calls in the window (0.0 with no samples)."""
+        with self._lock:
+            latencies = [latency for _, latency, ok in self._prune(key) if ok]
+        return _percentile(latencies, q)
+
+    def snapshot(self, key: str) -> dict:
+        """``{"count", "p95", "error_rate"}`` over the current window (p95 of successful calls)."""
+        with self._lock:
+            samples = list(self._prune(key))
+        latencies = [latency for _, latency, ok in samples if ok]
+        return {
+            "count": len(samples),
+            "p95": _percentile(latencies, 95),
+            "error_rate": (len(samples) - len(latencies)) / len(samples) if samples else 0.0,
+        }
+
+    def overall(self, exclude: str = "#") -> dict:
+        """``{"count", "error_rate"}`` across every key not containing ``exclude`` (hedge copies by default)."""
+        with self._lock:
+            samples = [s for key in list(self._samples) if exclude not in key for s in self._prune(key)]
+        errors = sum(1 for _, _, ok in samples if not ok)
+        return {"count": len(samples), "error_rate": errors / len(samples) if samples else 0.0}
+
+    @contextmanager
+    def timed(self, key: str):
+        """Record the duration of the block under ``key``; an exception counts as an error."""
+        start = time.monotonic()
+        try:
+            yield
+        except Exception:
+            self.record(key, time.monotonic() - start, ok=False)
+            raise
+        self.record(key, time.monotonic() - start, ok=True)
+
+
+METRICS = RollingMetrics()
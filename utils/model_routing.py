@@ -0,0 +1,88 @@
+"""
+Model routing by (page, call type) with a latency-SLO fallback.
+
+``resolve_route(page, call)`` returns the parameters for one OpenAI call
+(model, max_tokens, temperature, image size and quality) plus the metrics key
+to record its latency under. When the primary route's rolling p95 latency or
+error rate breaches its SLO, the fallback route is returned instead. The
+primary receives no traffic while degraded, so it recovers on its own once its
+bad samples age out of the metrics window. In lite mode streamed text is also
+capped at ``LITE_STREAM_MAX_TOKENS``.
+"""
+
+from utils.lite_mode import LITE_STREAM_MAX_TOKENS, is_lite
+from utils.metrics import METRICS
+
+CALL_TYPES = ("chat", "stream", "vision", "image")
+
+# Defaults per call type (None = leave the parameter to the API default)
+DEFAULT_ROUTES = {
+    "chat": {"model": "gpt-4o-mini", "temperature": 0.9, "max_tokens": None},
+    "stream": {"model": "gpt-4o-mini", "temperature": 0.9, "max_tokens": None},
+    "vision": {"model": "gpt-4o-mini", "temperature": None, "max_tokens": 2000},
+    "image": {"model": "dall-e-3", "size": "1024x1024", "quality": "standard"},
+}
+
+# Per-page overrides; page names match track_experience keys
+PAGE_ROUTES = {
+    ("tarot", "image"): {"size": "1024x1792"},  # tall card art
+}
+
+# Cheaper / faster substitutes used while a route is out of SLO
+FALLBACK_MODELS = {"gpt-4o-mini": "gpt-4.1-nano"}
+FALLBACK_IMAGE = {
+    ("dall-e-3", "1024x1792"): {"model": "dall-e-3", "size": "1024x1024", "quality": "standard"},
+    ("dall-e-3", "1024x1024"): {"model": "dall-e-2", "size": "512x512", "quality": None},
+}
+
+# (p95 latency seconds, error rate). Streams measure time to first token.
+SLO = {
+    "chat": (12.0, 0.10),
+    "stream": (4.0, 0.10),
+    "vision": (15.0, 0.10),
+    "image": (25.0, 0.15),
+}
+MIN_SAMPLES = 20  # don't judge a route on a handful of calls
+
+
+def _primary(page: str, call: str) -> dict:
+    return {**DEFAULT_ROUTES[call], **PAGE_ROUTES.get((page, call), {})}
+
+
+def _fallback(call: str, route: dict) -> dict | None:
+    if call == "image":
+        sub = FALLBACK_IMAGE.get((route["model"], route["size"]))
+        return {**route, **sub} if sub else None
+    model = FALLBACK_MODELS.get(route["model"])
+    return {**route, "model": model} if model else None
+
+
+def route_key(page: str, call: str, route: dict) -> str:
+    key = f"{page}/{call}/{route['model']}"
+    return f"{key}@{route['size']}" if call == "image" else key
+
+
+def out_of_slo(key: str, call: str) -> bool:
+    stats = METRICS.snapshot(key)
+    if stats["count"] < MIN_SAMPLES:
+        return False
+    max_p95, max_errors = SLO[call]
+    return stats["p95"] > max_p95 or stats["error_rate"] > max_errors
+
+
+def _lite_caps(call: str, route: dict) -> dict:
+    # Structured JSON calls keep their budget: a truncated object fails its schema
+    if call == "stream" and is_lite():
+        return {**route, "max_tokens": min(route["max_tokens"] or LITE_STREAM_MAX_TOKENS, LITE_STREAM_MAX_TOKENS)}
+    return route
+
+
+def resolve_route(page: str, call: str) -> tuple[str, dict]:
+    """``(metrics_key, params)`` for a call, degraded to the fallback while the primary is out of SLO."""
+    route = _lite_caps(call, _primary(page, call))
+    key = route_key(page, call, route)
+    if out_of_slo(key, call):
+        fallback = _fallback(call, route)
+        if fallback is not None:
+            return route_key(page, call, fallback), fallback
+    return key, route
@@ -1,76 +1,499 @@
+import contextvars
+import importlib.util
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import cache
+from typing import TYPE_CHECKING, Any, Callable
+
+import httpx
+import jiter
 import streamlit as st
-from openai import OpenAI
+from pydantic import BaseModel
+
+from utils.admission import admission_slot
+from utils.cancellation import (
+    CANCEL_POLL, CancelScope, JobCancelled, cancel_requested, check_cancelled, close_on_cancel, current_scope, set_scope,
+)
+from utils.deadline import DeadlineExceeded, remaining, require_budget
+from utils.lite_mode import require_full_mode
+from utils.metrics import METRICS
+from utils.model_routing import resolve_route
+from utils.schemas import json_schema_format
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# Image requests fired mid-generation run here so they overlap the text stream
+_PIPELINE_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="openai-pipeline")
+
+# Connection pool defaults; override with OPENAI_POOL_SIZE / OPENAI_HTTP2 /
+# OPENAI_WARMUP_CONNECTIONS in secrets. The pool covers the pipeline pool plus
+# the job pool in utils.jobs, so no call waits for a free connection.
+DEFAULT_POOL_SIZE = 48
+KEEPALIVE_EXPIRY = 120.0   # seconds an idle connection is kept for reuse
+DEFAULT_WARMUP_CONNECTIONS = 4
+
+# (connect, read, total) seconds per endpoint. ``read`` is the longest gap
+# between bytes; ``total`` caps a whole stream. Non-streaming responses arrive
+# in a single read, so connect + read bounds them.
+ENDPOINT_TIMEOUTS = {
+    "chat": (5.0, 40.0, 45.0),
+    "stream": (5.0, 15.0, 90.0),
+    "vision": (5.0, 45.0, 60.0),
+    "image": (5.0, 80.0, 90.0),
+}
+
+
+def _fixed_timeout(endpoint: str) -> httpx.Timeout:
+    """Endpoint timeouts without the run deadline, for the process-wide client and its warm-up."""
+    connect, read, _ = ENDPOINT_TIMEOUTS[endpoint]
+    return httpx.Timeout(connect=connect, read=read, write=read, pool=connect)
+
+
+def _timeout(endpoint: str) -> httpx.Timeout:
+    """Endpoint timeouts, clamped to what is left of the run deadline (utils.deadline)."""
+    connect, read, _ = ENDPOINT_TIMEOUTS[endpoint]
+    left = require_budget(endpoint)
+    if left is not None:
+        connect, read = min(connect, left), min(read, left)
+    return httpx.Timeout(connect=connect, read=read, write=read, pool=connect)
+
+
+def _iter_stream(response, endpoint: str):
+    """Iterate a streaming response, closing it once the endpoint's total or the run deadline is spent (or on cancel)."""
+    total = ENDPOINT_TIMEOUTS[endpoint][2]
+    left = remaining()
+    if left is not None:
+        total = min(total, left)
+    deadline = time.monotonic() + total
+    with response, close_on_cancel(response):
+        for chunk in response:
+            yield chunk
+            if time.monotonic() > deadline:
+                raise DeadlineExceeded(f"{endpoint} stream exceeded {total:.0f}s")
+
+
+def _build_http_client() -> httpx.Client:
+    pool_size = int(st.secrets.get("OPENAI_POOL_SIZE", DEFAULT_POOL_SIZE))
+    # HTTP/2 multiplexes concurrent calls over one connection; needs the optional h2 package
+    http2 = bool(st.secrets.get("OPENAI_HTTP2", True)) and importlib.util.find_spec("h2") is not None
+    return httpx.Client(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        timeout=_fixed_timeout("chat"),
+    )
+
+
+def _warm_up(client: "OpenAI") -> None:
+    """Open pooled connections (DNS + TLS) before the first user request needs them."""
+    count = int(st.secrets.get("OPENAI_WARMUP_CONNECTIONS", DEFAULT_WARMUP_CONNECTIONS))
+    warm = client.with_options(timeout=_fixed_timeout("chat"), max_retries=0)
+
+    def ping():
+        try:
+            warm.models.list()
+        except Exception:
+            pass
+
+    for _ in range(count):
+        _PIPELINE_POOL.submit(ping)
 
 
 @st.cache_resource
 def get_openai_client():
-    return OpenAI(api_key=st.secrets["API_KEY"])
+    # The SDK takes ~0.7 s to import, so it is loaded with the first client instead of with every page.
+    # The client outlives the run that creates it, so nothing here may depend on that run's deadline
+    from openai import OpenAI
+
+    client = OpenAI(api_key=st.secrets["API_KEY"], http_client=_build_http_client())
+    _warm_up(client)
+    return client
+
+
+# Shared quota: total in-flight requests across all call types (OPENAI_MAX_IN_FLIGHT in secrets).
+# When it is full, interactive text calls go first; image calls wait in a lower lane
+# and gain one priority level per IMAGE_AGING seconds so they are never starved.
+DEFAULT_MAX_IN_FLIGHT = 24
+CALL_PRIORITY = {"chat": 0, "stream": 0, "vision": 0, "image": 1}
+IMAGE_AGING = 15.0
+
+
+class _PriorityDispatcher:
+    """Capacity-limited gate that admits the waiting call with the best aged priority."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._cond = threading.Condition()
+        self._waiting: list[tuple[int, float, int]] = []  # (priority, enqueued, seq)
+        self._active = 0
+        self._seq = itertools.count()
+
+    def _next(self) -> tuple[int, float, int]:
+        now = time.monotonic()
+        return min(self._waiting, key=lambda t: (t[0] - (now - t[1]) / IMAGE_AGING, t[1], t[2]))
+
+    @contextmanager
+    def slot(self, call: str):
+        ticket = (CALL_PRIORITY[call], time.monotonic(), next(self._seq))
+        with self._cond:
+            self._waiting.append(ticket)
+            while self._active >= self.capacity or self._next() is not ticket:
+                left = remaining()
+                if left is not None and left <= 0:
+                    self._waiting.remove(ticket)
+                    self._cond.notify_all()
+                    raise DeadlineExceeded(f"{call} call still queued at the run deadline")
+                if cancel_requested():
+                    self._waiting.remove(ticket)
+                    self._cond.notify_all()
+                    raise JobCancelled(f"{call} call left the queue: job cancelled")
+                # wake periodically so aging and cancellation are re-evaluated even without releases
+                self._cond.wait(timeout=CANCEL_POLL if left is None else min(CANCEL_POLL, left))
+            self._waiting.remove(ticket)
+            self._active += 1
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def has_capacity(self) -> bool:
+        with self._cond:
+            return self._active < self.capacity and not self._waiting
+
+
+@cache
+def _dispatcher() -> _PriorityDispatcher:
+    return _PriorityDispatcher(int(st.secrets.get("OPENAI_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT)))
+
+
+@contextmanager
+def _api_slot(call: str):
+    """Per-class admission (utils.admission), then a place in the shared priority lane."""
+    check_cancelled()
+    with admission_slot(call), _dispatcher().slot(call):
+        check_cancelled()  # cancelled while queued: don't send it
+        yield
+
+
+# Opt-in hedging (HEDGE_CHAT = true in secrets, or hedge=True per call): when a chat call
+# runs past the route's recent HEDGE_PERCENTILE latency, send a duplicate and keep the
+# first answer. Hedges are capped at HEDGE_BUDGET of the route's calls in the metrics
+# window, so the delay and the budget both follow the live latency data.
+HEDGE_PERCENTILE = 90
+HEDGE_BUDGET = 0.05
+HEDGE_MIN_SAMPLES = 20
+
+
+def _in_scope(scope: CancelScope, fn: Callable, *args):
+    set_scope(scope)
+    return fn(*args)
+
+
+def _hedged(attempt: Callable[[str], Any], key: str):
+    """
+    Run ``attempt(metrics_key)`` inline; past the p90, race a backup copy from the pipeline pool.
+
+    Each copy runs in its own child cancel scope, so whichever finishes first closes
+    the other's stream. The backup's latency goes to ``<key>#backup``, keeping the
+    route's percentiles free of hedged samples.
+    """
+    calls = METRICS.snapshot(key)["count"]
+    if calls < HEDGE_MIN_SAMPLES:
+        return attempt(key)
+
+    parent = current_scope()
+    primary_scope = parent.child() if parent is not None else CancelScope()
+    backup_scope = parent.child() if parent is not None else CancelScope()
+    backup: Future | None = None
 
+    def launch():
+        nonlocal backup
+        hedge_key = f"{key}#hedge"
+        if METRICS.snapshot(hedge_key)["count"] >= HEDGE_BUDGET * calls or not _dispatcher().has_capacity():
+            return
+        METRICS.record(hedge_key, delay)
+        backup = _submit(_in_scope, backup_scope, attempt, f"{key}#backup")
+        backup.add_done_callback(lambda f: f.cancelled() or f.exception() is not None or primary_scope.cancel())
 
-def generate_chat(system_prompt: str, user_prompt: str, json_mode: bool = False) -> str:
+    delay = METRICS.percentile(key, HEDGE_PERCENTILE)
+    # Timer threads don't inherit context variables: launch in the caller's (session, deadline, scope)
+    timer = threading.Timer(delay, contextvars.copy_context().run, (launch,))
+    timer.start()
+    set_scope(primary_scope)
+    try:
+        return attempt(key)
+    except BaseException:
+        timer.cancel()
+        if backup is None or (parent is not None and parent.cancelled):
+            raise
+        return backup.result()  # the backup won (it closed this stream) or this copy failed
+    finally:
+        timer.cancel()
+        set_scope(parent)
+        # Close the losing copy (or keep a late backup from being sent) and detach both from the parent
+        primary_scope.cancel()
+        backup_scope.cancel()
+
+
+def _sampling(route: dict) -> dict:
+    """Chat parameters from a route, omitting the ones left to the API default."""
+    params = {"model": route["model"]}
+    for name in ("temperature", "max_tokens"):
+        if route.get(name) is not None:
+            params[name] = route[name]
+    return params
+
+
+def generate_chat(
+    system_prompt: str,
+    user_prompt: str,
+    json_mode: bool = False,
+    page: str = "default",
+    schema: type[BaseModel] | None = None,
+    hedge: bool | None = None,
+) -> str:
+    """``schema``를 주면 JSON 모드 대신 strict JSON schema 구조화 출력을 요청
+
+    ``hedge``가 None이면 secrets의 HEDGE_CHAT 설정을 따름
+    """
     client = get_openai_client()
+    key, route = resolve_route(page, "chat")
     kwargs = {
-        "model": "gpt-4o-mini",
+        **_sampling(route),
         "messages": [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ],
-        "temperature": 0.9,
     }
-    if json_mode:
+    if schema is not None:
+        kwargs["response_format"] = json_schema_format(schema)
+    elif json_mode:
         kwargs["response_format"] = {"type": "json_object"}
 
-    response = client.chat.completions.create(**kwargs)
-    return response.choices[0].message.content
+    if hedge is None:
+        hedge = bool(st.secrets.get("HEDGE_CHAT", False))
+
+    def attempt(metrics_key: str = key) -> str:
+        # Queue time is excluded from the route's latency metrics
+        with _api_slot("chat"), METRICS.timed(metrics_key):
+            if not hedge:
+                response = client.chat.completions.create(**kwargs, timeout=_timeout("chat"))
+                return response.choices[0].message.content
+            # A plain request can't be aborted once sent; a streamed one can be closed
+            # by the other copy of the hedge (utils.cancellation)
+            response = client.chat.completions.create(**kwargs, stream=True, timeout=_timeout("stream"))
+            return "".join(
+                chunk.choices[0].delta.content or ""
+                for chunk in _iter_stream(response, "stream")
+                if chunk.choices
+            )
 
+    return _hedged(attempt, key) if hedge else attempt()
 
-def generate_chat_with_image(system_prompt: str, user_text: str, base64_image: str, json_mode: bool = False) -> str:
+
+def generate_chat_with_image(
+    system_prompt: str,
+    user_text: str,
+    base64_image: str,
+    json_mode: bool = False,
+    mime_type: str = "image/jpeg",
+    detail: str = "auto",
+    page: str = "default",
+) -> str:
     client = get_openai_client()
+    key, route = resolve_route(page, "vision")
     kwargs = {
-        "model": "gpt-4o-mini",
+        **_sampling(route),
         "messages": [
             {"role": "system", "content": system_prompt},
             {
                 "role": "user",
                 "content": [
                     {"type": "text", "text": user_text},
-                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}},
+                    {
+                        "type": "image_url",
+                        "image_url": {"url": f"data:{mime_type};base64,{base64_image}", "detail": detail},
+                    },
                 ],
             },
         ],
-        "max_tokens": 2000,
     }
     if json_mode:
         kwargs["response_format"] = {"type": "json_object"}
 
-    response = client.chat.completions.create(**kwargs)
+    with _api_slot("vision"), METRICS.timed(key):
+        response = client.chat.completions.create(**kwargs, timeout=_timeout("vision"))
     return response.choices[0].message.content
 
 
-def generate_chat_stream(system_prompt: str, user_prompt: str):
-    """스트리밍 응답 제너레이터 - st.write_stream()과 함께 사용"""
+def generate_chat_stream(system_prompt: str, user_prompt: str, page: str = "default"):
+    """스트리밍 응답 제너레이터 - st.write_stream()과 함께 사용 (첫 토큰까지의 지연을 기록)"""
+    client = get_openai_client()
+    key, route = resolve_route(page, "stream")
+    with _api_slot("stream"):
+        start = time.monotonic()
+        try:
+            response = client.chat.completions.create(
+                **_sampling(route),
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                stream=True,
+                timeout=_timeout("stream"),
+            )
+        except Exception:
+            METRICS.record(key, time.monotonic() - start, ok=False)
+            raise
+        first = True
+        for chunk in _iter_stream(response, "stream"):
+            if first:
+                METRICS.record(key, time.monotonic() - start)
+                first = False
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+def generate_image(prompt: str, size: str | None = None, page: str = "default") -> str | None:
+    """DALL-E 이미지 URL. ``size``를 지정하면 라우팅된 크기 대신 그 크기로 고정합니다."""
+    require_full_mode("image")
+    client = get_openai_client()
+    key, route = resolve_route(page, "image")
+    kwargs = {"model": route["model"], "prompt": prompt, "size": size or route["size"], "n": 1}
+    if route["quality"]:
+        kwargs["quality"] = route["quality"]
+    with _api_slot("image"), METRICS.timed(key):
+        response = client.images.generate(**kwargs, timeout=_timeout("image"))
+    return response.data[0].url
+
+
+def embed_texts(texts: list[str], model: str = "text-embedding-3-small") -> list[list[float]]:
+    """Embedding vectors for ``texts`` (one batched request)."""
     client = get_openai_client()
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
+    # Same admission, priority lane and cancellation as the chat calls it sits in front of
+    with _api_slot("chat"), METRICS.timed(f"embedding/{model}"):
+        response = client.embeddings.create(model=model, input=texts, timeout=_timeout("chat"))
+    return [item.embedding for item in response.data]
+
+
+def submit_background(fn: Callable, *args, **kwargs) -> Future:
+    """Run an OpenAI call (typically ``generate_image``) in the shared pipeline pool."""
+    get_openai_client()  # resolve the cached client on the script thread first
+    return _submit(fn, *args, **kwargs)
+
+
+def _submit(fn: Callable, *args, **kwargs) -> Future:
+    # Carry context variables (e.g. the admission session id) into the worker
+    future = _PIPELINE_POOL.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+    scope = current_scope()
+    if scope is not None:
+        # Not started yet when the page is left: drop it from the pool queue
+        unregister = scope.on_cancel(future.cancel)
+        future.add_done_callback(lambda _: unregister())
+    return future
+
+
+def _completed_fields(obj: Any, path: str, prefix: str = ""):
+    """
+    Yield ``(key, value)`` for every completed string at ``path`` in a partial JSON object.
+
+    ``path`` is a dotted field path where ``name[]`` fans out over a list,
+    e.g. ``"portrait_prompt"`` or ``"panels[].image_prompt"``.
+    """
+    head, _, rest = path.partition(".")
+    if not isinstance(obj, dict):
+        return
+    if head.endswith("[]"):
+        name = head[:-2]
+        items = obj.get(name)
+        if isinstance(items, list):
+            for i, item in enumerate(items):
+                yield from _completed_fields(item, rest, f"{prefix}{name}[{i}].")
+    elif rest:
+        yield from _completed_fields(obj.get(head), rest, f"{prefix}{head}.")
+    elif isinstance(obj.get(head), str):
+        yield f"{prefix}{head}", obj[head]
+
+
+def generate_json_pipelined(
+    system_prompt: str,
+    user_prompt: str,
+    triggers: dict[str, Callable[[str], Any]],
+    base64_image: str | None = None,
+    mime_type: str = "image/jpeg",
+    detail: str = "auto",
+    page: str = "default",
+    schema: type[BaseModel] | None = None,
+) -> tuple[str, dict[str, Future]]:
+    """
+    Stream a JSON-mode generation and fire follow-up work as soon as a field completes.
+
+    ``triggers`` maps a field path (see ``_completed_fields``) to a callable that
+    receives the finished string, e.g. ``{"portrait_prompt": lambda p: generate_image(BASE + p)}``.
+    Each callable is submitted to the background pool the moment its field is fully
+    streamed, so image generation overlaps the rest of the text generation.
+
+    With ``schema`` the output is constrained to that result model (strict JSON
+    schema, keys in declaration order); otherwise plain JSON mode is used.
+
+    Returns the raw JSON text and a dict of futures keyed by concrete field path
+    (``"portrait_prompt"``, ``"panels[2].image_prompt"``, ...).
+    """
+    client = get_openai_client()
+    # Routed like generate_chat / generate_chat_with_image; the whole stream is timed
+    call = "chat" if base64_image is None else "vision"
+    key, route = resolve_route(page, call)
+    kwargs = {
+        **_sampling(route),
+        "messages": [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ],
-        temperature=0.9,
-        stream=True,
-    )
-    for chunk in response:
-        if chunk.choices[0].delta.content:
-            yield chunk.choices[0].delta.content
+        "response_format": json_schema_format(schema) if schema is not None else {"type": "json_object"},
+        "stream": True,
+    }
+    if base64_image is not None:
+        kwargs["messages"][1]["content"] = [
+            {"type": "text", "text": user_prompt},
+            {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{base64_image}", "detail": detail}},
+        ]
 
+    endpoint = "stream" if base64_image is None else "vision"
+    with _api_slot(call), METRICS.timed(key):
+        response = client.chat.completions.create(**kwargs, timeout=_timeout(endpoint))
+        parts, futures = _pipeline_stream(response, endpoint, triggers)
+    return "".join(parts), futures
+
+
+def _pipeline_stream(response, endpoint: str, triggers: dict[str, Callable[[str], Any]]):
+    """Consume the stream for ``generate_json_pipelined``, submitting each trigger once its field completes."""
+    parts: list[str] = []
+    futures: dict[str, Future] = {}
+    for chunk in _iter_stream(response, endpoint):
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+        delta = chunk.choices[0].delta.content
+        parts.append(delta)
+        # A string value can only have completed in a chunk containing its closing quote
+        if '"' not in delta:
+            continue
+        try:
+            partial = jiter.from_json("".join(parts).encode(), partial_mode=True)
+        except ValueError:
+            continue
+        for path, fn in triggers.items():
+            for key, value in _completed_fields(partial, path):
+                if key not in futures:
+                    futures[key] = _submit(fn, value)
+    return parts, futures
 
-def generate_image(prompt: str, size: str = "1024x1024") -> str | None:
-    client = get_openai_client()
-    response = client.images.generate(
-        model="dall-e-3",
-        prompt=prompt,
-        size=size,
-        n=1,
-        quality="standard",
-    )
-    return response.data[0].url
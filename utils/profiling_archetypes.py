@@ -0,0 +1,167 @@
+"""
+Precomputed archetype table for the profiling quiz.
+
+The quiz has 6 questions x 4 options = 4,096 answer vectors. Each vector
+maps to local ability scores and to one of 15 archetypes (the unordered pair
+of its two strongest abilities). Archetype reports and portraits are
+generated once offline (``python -m scripts.build_profiling_archetypes``),
+so a submission can be answered instantly from the table.
+"""
+
+import itertools
+import json
+from functools import lru_cache
+
+from utils.image_assets import ASSETS_DIR, download_image, save_optimized
+
+ABILITIES = ["분석력", "직감", "리더십", "적응력", "인내력", "매력"]
+
+PORTRAIT_IMAGE_BASE = (
+    "character portrait illustration, dramatic moody lighting, "
+    "psychological thriller style, detailed digital art, "
+    "cinematic composition, mystery atmosphere, "
+)
+
+# Ability deltas per (question, option), aligned with QUIZ_QUESTIONS in pages/profiling.py
+OPTION_WEIGHTS = [
+    [{"적응력": 15, "인내력": 5}, {"분석력": 15, "인내력": 5}, {"리더십": 10, "매력": 10}, {"직감": 10, "매력": 10}],
+    [{"분석력": 5, "인내력": 10}, {"분석력": 10, "직감": 10}, {"적응력": 15, "직감": 5}, {"리더십": 15, "매력": 5}],
+    [{"직감": 10, "분석력": 5}, {"적응력": 10, "매력": 5}, {"인내력": 10, "직감": 5}, {"분석력": 15}],
+    [{"직감": 15}, {"인내력": 10, "분석력": 5}, {"적응력": 10, "직감": 5}, {"분석력": 10, "리더십": 5}],
+    [{"분석력": 10, "인내력": 5}, {"인내력": 10, "적응력": 5}, {"적응력": 15}, {"리더십": 15, "매력": 5}],
+    [{"매력": 10, "적응력": 5}, {"인내력": 10, "직감": 5}, {"매력": 10, "분석력": 5}, {"인내력": 10, "리더십": 5}],
+]
+NUM_OPTIONS = 4
+BASE_SCORE = 50
+
+ARCHETYPES: list[tuple[str, str]] = list(itertools.combinations(ABILITIES, 2))
+
+PROFILING_DIR = ASSETS_DIR / "profiling"
+ARCHETYPE_TABLE = PROFILING_DIR / "archetypes.json"
+PORTRAIT_SIZE = (768, 768)
+
+ARCHETYPE_SYSTEM_PROMPT = """당신은 FBI 행동분석팀(BAU)의 수석 프로파일러입니다.
+주어진 두 가지 핵심 성향을 가진 사람들의 공통 심리 유형 보고서를 작성합니다.
+
+규칙:
+1. 유형명은 인상적이고 기억에 남는 것으로 (예: "잠든 화산형", "미소 뒤의 전략가")
+2. 위험등급은 S/A/B/C/D (S가 가장 위험). 재미있는 기준으로!
+3. 약점은 귀여운 약점으로 (예: "배고프면 판단력 급감", "고양이 앞에서 무력화")
+4. 전체적으로 FBI 보고서 톤이지만 유머러스하게
+
+응답은 반드시 JSON 형식으로:
+{
+    "type_name": "유형명",
+    "one_liner": "한 줄 프로파일",
+    "danger_level": "위험등급 (S~D)",
+    "danger_reason": "위험등급 이유 (재미있게)",
+    "strengths": ["강점1", "강점2", "강점3"],
+    "weakness": "치명적 약점 (귀여운 것으로)",
+    "partner_type": "최적 파트너 유형",
+    "secret_personality": "겉으로 드러나지 않는 숨겨진 성격 (200-300자)",
+    "recommended_role": "추천 역할 (영화/드라마에서 맡을 법한 역할)",
+    "portrait_prompt": "DALL-E용 이 유형의 캐릭터 일러스트 프롬프트 (영문, 성격과 분위기 반영)"
+}"""
+
+
+def answer_vector_index(option_indices: list[int]) -> int:
+    """Encode an answer vector (one option index per question) as 0..4095."""
+    index = 0
+    for option in option_indices:
+        index = index * NUM_OPTIONS + option
+    return index
+
+
+def compute_abilities(option_indices: list[int]) -> dict[str, int]:
+    """Local ability scores (40-95) for an answer vector."""
+    scores = dict.fromkeys(ABILITIES, BASE_SCORE)
+    for q, option in enumerate(option_indices):
+        for ability, delta in OPTION_WEIGHTS[q][option].items():
+            scores[ability] += delta
+    return {k: max(40, min(95, v)) for k, v in scores.items()}
+
+
+def _archetype_id(abilities: dict[str, int]) -> int:
+    top_two = sorted(ABILITIES, key=lambda a: (-abilities[a], ABILITIES.index(a)))[:2]
+    return ARCHETYPES.index(tuple(sorted(top_two, key=ABILITIES.index)))
+
+
+def _build_vector_table() -> bytes:
+    table = bytearray()
+    for vector in itertools.product(range(NUM_OPTIONS), repeat=len(OPTION_WEIGHTS)):
+        table.append(_archetype_id(compute_abilities(list(vector))))
+    return bytes(table)
+
+
+# answer_vector_index -> archetype id (one byte per vector)
+ARCHETYPE_BY_VECTOR: bytes = _build_vector_table()
+
+
+@lru_cache(maxsize=1)
+def _load_table() -> dict:
+    try:
+        with open(ARCHETYPE_TABLE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def lookup_profile(option_indices: list[int]) -> dict | None:
+    """
+    Instant profiling result for an answer vector, or None if the table is not built.
+
+    The returned dict has the same keys as a live PROFILING_SYSTEM_PROMPT result,
+    plus ``portrait`` (local image path or None).
+    """
+    archetype_id = ARCHETYPE_BY_VECTOR[answer_vector_index(option_indices)]
+    entry = _load_table().get(str(archetype_id))
+    if not entry:
+        return None
+    result = dict(entry)
+    result["abilities"] = compute_abilities(option_indices)
+    portrait = PROFILING_DIR / entry["portrait"] if entry.get("portrait") else None
+    result["portrait"] = str(portrait) if portrait and portrait.exists() else None
+    return result
+
+
+def build_archetype_table(generate_json, generate_image, force: bool = False, log=print) -> dict:
+    """
+    Generate every archetype report and portrait, writing ``archetypes.json``.
+
+    ``generate_json(system_prompt, user_prompt) -> dict | None`` and
+    ``generate_image(prompt) -> url`` are injected so the job can reuse the
+    app's OpenAI client. Existing archetypes are skipped unless ``force`` is set.
+    """
+    PROFILING_DIR.mkdir(parents=True, exist_ok=True)
+    table = {} if force else dict(_load_table())
+
+    for archetype_id, (first, second) in enumerate(ARCHETYPES):
+        key = str(archetype_id)
+        if key in table:
+            continue
+        user_prompt = (
+            f"[핵심 성향]: {first}, {second}\n\n"
+            f"'{first}'과(와) '{second}'이(가) 가장 뛰어난 사람들의 심리 프로파일 보고서를 작성해주세요."
+        )
+        entry = generate_json(ARCHETYPE_SYSTEM_PROMPT, user_prompt)
+        if entry is None:
+            log(f"[{archetype_id + 1}/{len(ARCHETYPES)}] {first}+{second}: 실패")
+            continue
+
+        portrait = PROFILING_DIR / f"archetype_{archetype_id:02d}.webp"
+        try:
+            url = generate_image(PORTRAIT_IMAGE_BASE + entry.get("portrait_prompt", "mystery character"))
+            save_optimized(download_image(url), portrait, PORTRAIT_SIZE)
+            entry["portrait"] = portrait.name
+        except Exception as e:
+            log(f"  portrait 실패 ({e})")
+            entry["portrait"] = None
+
+        table[key] = entry
+        log(f"[{archetype_id + 1}/{len(ARCHETYPES)}] {first}+{second}: {entry.get('type_name', '')}")
+
+        with open(ARCHETYPE_TABLE, "w", encoding="utf-8") as f:
+            json.dump(table, f, ensure_ascii=False, indent=1)
+
+    _load_table.cache_clear()
+    return table
@@ -0,0 +1,123 @@
+"""
+Result memoization keyed on canonicalized inputs.
+
+Pages whose result depends only on form inputs (name, birthdate, quiz answers)
+store the result JSON, the streamed story text and a local copy of the portrait
+under ``.cache/results``. Re-submitting the same inputs replays the whole result
+page instead of regenerating it. Entries expire after ``RESULT_CACHE_TTL``.
+
+The story can finish streaming before the background job has saved the result
+(the portrait download comes last), so either half may be written first: a
+story-only entry is kept pending, tagged with a digest of the result it was
+streamed from, until ``save_result`` fills in that same result.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+from utils.image_assets import download_image, save_optimized
+
+CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "results"
+RESULT_CACHE_TTL = 7 * 24 * 3600
+PORTRAIT_SIZE = (768, 768)
+
+# save_result runs in the job's worker and save_story in the script thread; both read-modify-write
+_write_lock = threading.Lock()
+
+
+def _canonical_name(name: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", name).casefold().split())
+
+
+def canonical_key(page: str, name: str, birthdate: datetime.date, answer_indices: list[int]) -> str:
+    """Stable key for (page, name, birthdate, quiz answers), independent of prompt wording."""
+    canonical = [page, _canonical_name(name), birthdate.isoformat(), list(answer_indices)]
+    return hashlib.sha256(json.dumps(canonical, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str) -> Path:
+    return CACHE_DIR / f"{key}.json"
+
+
+def _digest(result: dict) -> str:
+    return hashlib.sha256(json.dumps(result, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _read_entry(key: str) -> dict | None:
+    try:
+        with open(_entry_path(key), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _write_entry(key: str, entry: dict) -> None:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = _entry_path(key).with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp, _entry_path(key))
+
+
+def delete_result(key: str) -> None:
+    _entry_path(key).unlink(missing_ok=True)
+    (CACHE_DIR / f"{key}.webp").unlink(missing_ok=True)
+
+
+def load_result(key: str, ttl: float = RESULT_CACHE_TTL) -> dict | None:
+    """
+    Return ``{"result", "story", "image"}`` for a fresh entry, else None.
+
+    ``image`` is a local file path (or None) and ``story`` the previously
+    streamed text (or None if the stream never completed).
+    """
+    entry = _read_entry(key)
+    if entry is None:
+        return None
+    if time.time() - entry.get("created", 0) > ttl:
+        delete_result(key)
+        return None
+    if entry.get("result") is None:
+        return None  # only the story so far; the result is still being saved
+    image = entry.get("image")
+    if image and not (CACHE_DIR / image).exists():
+        image = None
+    return {
+        "result": entry["result"],
+        "story": entry.get("story"),
+        "image": str(CACHE_DIR / image) if image else None,
+    }
+
+
+def save_result(key: str, result: dict, image_url: str | None = None) -> None:
+    """Store a fresh result; the generated image is downloaded since DALL-E URLs expire."""
+    image = None
+    if image_url:
+        try:
+            path = save_optimized(download_image(image_url), CACHE_DIR / f"{key}.webp", PORTRAIT_SIZE)
+            image = path.name
+        except Exception:
+            return  # don't memoize the result without its image; the next visit regenerates both
+    with _write_lock:
+        # Keep a story that was streamed from this result before it got here
+        pending = _read_entry(key)
+        story = None
+        if pending is not None and pending.get("result") is None and pending.get("story_for") == _digest(result):
+            story = pending.get("story")
+        _write_entry(key, {"created": time.time(), "result": result, "story": story, "image": image})
+
+
+def save_story(key: str, story: str, result: dict) -> None:
+    """Attach the story streamed from ``result`` to its entry, or keep it pending until ``save_result`` writes it."""
+    with _write_lock:
+        entry = _read_entry(key)
+        if entry is None or entry.get("result") != result:
+            entry = {"created": time.time(), "result": None, "story_for": _digest(result), "image": None}
+        entry["story"] = story
+        _write_entry(key, entry)
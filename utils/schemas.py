@@ -0,0 +1,264 @@
+"""
+Result schemas for the structured-output pages.
+
+Each page's JSON result has a pydantic model. ``json_schema_format(Model)``
+builds the strict ``response_format`` so the API can only return a complete,
+well-typed object, and ``parse_result(Model, raw)`` validates the raw text in a
+single pydantic-core pass and returns it as a plain dict (Korean stat keys
+restored via aliases), which is the shape the pages and caches already use.
+Text that isn't clean JSON (fenced, wrapped in prose, cut off by max_tokens)
+is recovered with ``parse_json_lenient`` and the recovered object validated.
+
+Fields are declared in the same order as the page templates: strict outputs
+emit keys in schema order, so the image-prompt fields still stream in early
+for ``generate_json_pipelined``.
+"""
+
+import logging
+from functools import lru_cache
+from typing import Annotated
+
+import jiter
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+_LOGGER = logging.getLogger(__name__)
+
+Score = Annotated[int, Field(ge=0, le=100)]
+
+
+class _Result(BaseModel):
+    # Strict outputs require additionalProperties: false on every object
+    model_config = ConfigDict(extra="forbid")
+
+
+# --- tarot ---
+class TarotReading(_Result):
+    interpretations: list[str] = Field(min_length=1, max_length=3)
+    overall_advice: str
+    lucky_item: str
+
+
+# --- face reader ---
+class FacePart(_Result):
+    feature: str
+    meaning: str
+    emoji: str
+
+
+class FaceParts(_Result):
+    forehead: FacePart
+    eyes: FacePart
+    nose: FacePart
+    mouth: FacePart
+    jaw: FacePart
+
+
+class MatchingJob(_Result):
+    job: str
+    reason: str
+
+
+class FaceScores(_Result):
+    wealth: Score
+    love: Score
+    health: Score
+    social: Score
+
+
+class FaceReading(_Result):
+    character_description: str
+    face_parts: FaceParts
+    overall_reading: str
+    hidden_personality: list[str] = Field(min_length=3, max_length=3)
+    matching_jobs: list[MatchingJob] = Field(min_length=3, max_length=3)
+    scores: FaceScores
+
+
+# --- past life ---
+class PastLifeStats(_Result):
+    strength: Score
+    intelligence: Score
+    charisma: Score
+    luck: Score
+    creativity: Score
+    resilience: Score
+
+
+class PastLife(_Result):
+    era: str
+    country: str
+    location: str
+    past_name: str
+    occupation: str
+    portrait_prompt: str
+    story: str
+    stats: PastLifeStats
+    connection_to_present: str
+
+
+# --- news webtoon ---
+class WebtoonPanel(_Result):
+    panel_number: int
+    description: str
+    dialogue: str
+    image_prompt: str
+    emotion: str
+
+
+class NewsWebtoon(_Result):
+    news_summary: str
+    title: str
+    panels: list[WebtoonPanel] = Field(min_length=4, max_length=4)
+
+
+# --- wanted poster ---
+class WantedPoster(_Result):
+    suspect_name: str
+    crime: str
+    portrait_prompt: str
+    danger_level: str
+    bounty: str
+    traits: list[str] = Field(min_length=4, max_length=4)
+    description: str
+    warning: str
+
+
+# --- parallel universe ---
+class ParallelStats(_Result):
+    charisma: Score = Field(alias="카리스마")
+    expertise: Score = Field(alias="전문성")
+    stamina: Score = Field(alias="체력")
+    luck: Score = Field(alias="운")
+    sociability: Score = Field(alias="사교성")
+
+
+class ParallelSelf(_Result):
+    parallel_name: str
+    occupation: str
+    country: str
+    annual_income: str
+    portrait_prompt: str
+    personality: str
+    daily_routine: str
+    divergence_rate: Score
+    stats: ParallelStats
+    fun_fact: str
+    message_from_parallel: str
+
+
+# --- profiling ---
+class ProfilingAbilities(_Result):
+    analysis: Score = Field(alias="분석력")
+    intuition: Score = Field(alias="직감")
+    leadership: Score = Field(alias="리더십")
+    adaptability: Score = Field(alias="적응력")
+    patience: Score = Field(alias="인내력")
+    charm: Score = Field(alias="매력")
+
+
+class ProfilingReport(_Result):
+    type_name: str
+    one_liner: str
+    portrait_prompt: str
+    danger_level: str
+    danger_reason: str
+    abilities: ProfilingAbilities
+    strengths: list[str] = Field(min_length=3, max_length=3)
+    weakness: str
+    partner_type: str
+    secret_personality: str
+    recommended_role: str
+
+
+# --- mystery quiz ---
+class Suspect(_Result):
+    name: str
+    description: str
+    motive: str
+    alibi: str
+
+
+class Clue(_Result):
+    title: str
+    content: str
+
+
+class MysteryCase(_Result):
+    case_title: str
+    difficulty: str
+    scenario: str
+    scene_prompt: str
+    suspects: list[Suspect] = Field(min_length=4, max_length=4)
+    clues: list[Clue] = Field(min_length=3, max_length=3)
+    culprit: str
+    explanation: str
+
+
+@lru_cache(maxsize=None)
+def json_schema_format(model: type[BaseModel]) -> dict:
+    """Strict ``response_format`` for a result model (built once per model)."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model.__name__,
+            "strict": True,
+            "schema": model.model_json_schema(by_alias=True),
+        },
+    }
+
+
+def parse_json_lenient(text: str | None) -> tuple[dict | None, list[str]]:
+    """
+    Recover a JSON object from model output and report what had to be fixed.
+
+    Parsing starts at the first ``{``, so leading prose or a code fence is
+    skipped. Clean text takes one strict parse. Otherwise the strict error says
+    what's wrong (text after the object, or the object cut short, even right
+    after a nested ``}``) and jiter's partial mode keeps the completed fields.
+    repairs: "code-fence", "leading-text", "trailing-text", "truncated"
+    """
+    if not text:
+        return None, []
+    start = text.find("{")
+    if start < 0:
+        return None, []
+    repairs = []
+    if start > 0:
+        repairs.append("code-fence" if "```" in text[:start] else "leading-text")
+
+    body = text[start:].rstrip()
+    if body.endswith("```"):
+        body = body[:-3].rstrip()
+        if "code-fence" not in repairs:
+            repairs.append("code-fence")
+    raw = body.encode()
+    try:
+        data = jiter.from_json(raw)
+    except ValueError as e:
+        repairs.append("trailing-text" if str(e).startswith("trailing characters") else "truncated")
+        try:
+            data = jiter.from_json(raw, partial_mode="trailing-strings")
+        except ValueError:
+            return None, repairs
+    if not isinstance(data, dict):
+        return None, repairs
+    return data, repairs
+
+
+def parse_result(model: type[BaseModel], raw: str | None) -> dict | None:
+    """Validate raw JSON text against ``model``, recovering malformed text first; None if it doesn't conform."""
+    if not raw:
+        return None
+    try:
+        return model.model_validate_json(raw).model_dump(by_alias=True)
+    except ValidationError:
+        pass
+    data, repairs = parse_json_lenient(raw)
+    if data is None or not repairs:
+        return None  # well-formed JSON that just doesn't match the schema
+    try:
+        result = model.model_validate(data).model_dump(by_alias=True)
+    except ValidationError:
+        return None
+    _LOGGER.warning("%s: recovered malformed JSON (%s)", model.__name__, ", ".join(repairs))
+    return result
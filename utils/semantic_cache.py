@@ -0,0 +1,120 @@
+"""
+Semantic cache for free-text prompts (tarot worries).
+
+Worries are embedded and stored in a NumPy matrix per partition, e.g.
+(category, spread). A new worry whose cosine similarity to a cached one is at
+least the threshold reuses that entry's payload. Payloads must be
+worry-neutral, since they are shared across users: tarot stores only the drawn
+cards (name, direction, position, base meaning), so similar worries get the
+same spread while the interpretations and advice are always written fresh for
+the asker.
+
+The embedding function is pluggable: ``openai_embedding`` in production and
+``ngram_embedding``, a dependency-free character n-gram hasher, as a local
+stand-in for offline runs and experiments.
+"""
+
+import hashlib
+import threading
+import time
+import unicodedata
+from typing import Callable, Hashable
+
+import numpy as np
+import streamlit as st
+
+EmbedFn = Callable[[list[str]], np.ndarray]
+
+NGRAM_DIM = 1024
+SEMANTIC_CACHE_TTL = 24 * 3600   # readings are "today's" cards
+SEMANTIC_CACHE_MAX_ENTRIES = 2000  # per partition
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def ngram_embedding(texts: list[str], dim: int = NGRAM_DIM) -> np.ndarray:
+    """Hashed character 2/3-gram counts, L2-normalized. Works on Korean without a tokenizer."""
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        text = " ".join(unicodedata.normalize("NFC", text).casefold().split())
+        for n in (2, 3):
+            for i in range(len(text) - n + 1):
+                digest = hashlib.blake2b(text[i:i + n].encode(), digest_size=4).digest()
+                out[row, int.from_bytes(digest, "little") % dim] += 1
+    return _normalize_rows(out)
+
+
+def openai_embedding(texts: list[str]) -> np.ndarray:
+    """OpenAI ``text-embedding-3-small`` vectors (already unit length)."""
+    from utils.openai_client import embed_texts
+
+    return np.asarray(embed_texts(texts), dtype=np.float32)
+
+
+class SemanticCache:
+    """Process-wide, thread-safe vector index: partition -> (unit vectors, [(created, payload)])."""
+
+    def __init__(
+        self,
+        embed: EmbedFn,
+        threshold: float,
+        ttl: float = SEMANTIC_CACHE_TTL,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+    ):
+        self.embed_fn = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._vectors: dict[Hashable, np.ndarray] = {}
+        self._entries: dict[Hashable, list[tuple[float, dict]]] = {}
+
+    def embed(self, text: str) -> np.ndarray:
+        return _normalize_rows(np.asarray(self.embed_fn([text]), dtype=np.float32))[0]
+
+    def _evict_expired(self, partition: Hashable) -> None:
+        entries = self._entries.get(partition, [])
+        now = time.time()
+        keep = [i for i, (created, _) in enumerate(entries) if now - created <= self.ttl]
+        keep = keep[-self.max_entries:]
+        if len(keep) != len(entries):
+            self._entries[partition] = [entries[i] for i in keep]
+            self._vectors[partition] = self._vectors[partition][keep]
+
+    def get(self, partition: Hashable, vector: np.ndarray) -> tuple[dict, float] | None:
+        """``(payload, similarity)`` of the most similar fresh entry above the threshold, else None."""
+        with self._lock:
+            self._evict_expired(partition)
+            vectors = self._vectors.get(partition)
+            if vectors is None or len(vectors) == 0:
+                return None
+            similarities = vectors @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            return self._entries[partition][best][1], float(similarities[best])
+
+    def put(self, partition: Hashable, vector: np.ndarray, payload: dict) -> None:
+        with self._lock:
+            vectors = self._vectors.get(partition, np.empty((0, len(vector)), dtype=np.float32))
+            self._vectors[partition] = np.vstack([vectors, vector[None, :]])
+            self._entries.setdefault(partition, []).append((time.time(), payload))
+            self._evict_expired(partition)
+
+
+# Cosine thresholds are per embedding model: n-gram overlap scores run lower,
+# and both are set high enough that "좋아할까요" / "싫어할까요" don't collide
+EMBEDDERS = {
+    "openai": (openai_embedding, 0.92),
+    "ngram": (ngram_embedding, 0.80),
+}
+
+
+@st.cache_resource
+def get_tarot_cache() -> SemanticCache:
+    """Shared tarot cache; ``SEMANTIC_CACHE_EMBEDDING = "ngram"`` in secrets swaps in the local embedder."""
+    embed, threshold = EMBEDDERS[st.secrets.get("SEMANTIC_CACHE_EMBEDDING", "openai")]
+    return SemanticCache(embed, threshold)
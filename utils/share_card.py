@@ -7,7 +7,11 @@ with gradient background, warm brown/amber Layton theme, and Korean text.
 
 import io
 import textwrap
-from PIL import Image, ImageDraw, ImageFont
+from typing import TYPE_CHECKING
+
+# Pillow is imported when a card is actually rendered, not when a page imports this module
+if TYPE_CHECKING:
+    from PIL import Image, ImageDraw, ImageFont
 
 # --- Color Constants (Professor Layton theme) ---
 BG_TOP = (43, 30, 20)         # #2B1E14
@@ -30,8 +34,10 @@ _FONT_PATHS = [
 ]
 
 
-def _get_font(size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+def get_font(size: int) -> "ImageFont.FreeTypeFont | ImageFont.ImageFont":
     """Load a Korean-capable font with fallback to default."""
+    from PIL import ImageFont
+
     for path in _FONT_PATHS:
         try:
             return ImageFont.truetype(path, size)
@@ -41,7 +47,7 @@ def _get_font(size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
 
 
 def _draw_rounded_rect(
-    draw: ImageDraw.ImageDraw,
+    draw: "ImageDraw.ImageDraw",
     xy: tuple[int, int, int, int],
     radius: int,
     fill: tuple,
@@ -51,7 +57,7 @@ def _draw_rounded_rect(
     draw.rounded_rectangle(xy, radius=radius, fill=fill)
 
 
-def _draw_gradient_bg(img: Image.Image) -> None:
+def _draw_gradient_bg(img: "Image.Image") -> None:
     """Fill image with a vertical gradient from BG_TOP to BG_BOTTOM."""
     width, height = img.size
     for y in range(height):
@@ -63,9 +69,9 @@ def _draw_gradient_bg(img: Image.Image) -> None:
             img.putpixel((x, y), (r, g, b))
 
 
-def _draw_watermark(draw: ImageDraw.ImageDraw, width: int, height: int) -> None:
+def _draw_watermark(draw: "ImageDraw.ImageDraw", width: int, height: int) -> None:
     """Draw watermark text at the bottom center of the card."""
-    font = _get_font(28)
+    font = get_font(28)
     text = WATERMARK_TEXT
     bbox = draw.textbbox((0, 0), text, font=font)
     tw = bbox[2] - bbox[0]
@@ -83,9 +89,9 @@ def _wrap_text(text: str, width: int = 22) -> str:
     return textwrap.fill(text, width=width)
 
 
-def _draw_title(draw: ImageDraw.ImageDraw, title: str, width: int) -> int:
+def _draw_title(draw: "ImageDraw.ImageDraw", title: str, width: int) -> int:
     """Draw a centered title at the top and return the y offset after it."""
-    font = _get_font(52)
+    font = get_font(52)
     bbox = draw.textbbox((0, 0), title, font=font)
     tw = bbox[2] - bbox[0]
     x = (width - tw) // 2
@@ -104,7 +110,7 @@ def _draw_title(draw: ImageDraw.ImageDraw, title: str, width: int) -> int:
 
 
 def _draw_bar(
-    draw: ImageDraw.ImageDraw,
+    draw: "ImageDraw.ImageDraw",
     x: int,
     y: int,
     bar_width: int,
@@ -113,7 +119,7 @@ def _draw_bar(
     label: str = "",
 ) -> int:
     """Draw a horizontal bar chart element. Returns next y position."""
-    font = _get_font(28)
+    font = get_font(28)
     bar_height = 28
 
     # Label
@@ -131,13 +137,22 @@ def _draw_bar(
 
     # Score text
     score_text = f"{score}"
-    score_font = _get_font(24)
+    score_font = get_font(24)
     draw.text((x + bar_width + 12, y + 2), score_text, fill=GOLD, font=score_font)
 
     return y + bar_height + 16
 
 
-def _to_png_bytes(img: Image.Image) -> bytes:
+def _new_card() -> tuple["Image.Image", "ImageDraw.ImageDraw"]:
+    """A blank CARD_SIZE square with the gradient background, and its draw handle."""
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (CARD_SIZE, CARD_SIZE))
+    _draw_gradient_bg(img)
+    return img, ImageDraw.Draw(img)
+
+
+def _to_png_bytes(img: "Image.Image") -> bytes:
     """Convert PIL Image to PNG bytes."""
     buf = io.BytesIO()
     img.save(buf, format="PNG")
@@ -158,16 +173,14 @@ def generate_tarot_card(result: dict) -> bytes:
     - advice: str (overall advice)
     - lucky_item: str
     """
-    img = Image.new("RGB", (CARD_SIZE, CARD_SIZE))
-    _draw_gradient_bg(img)
-    draw = ImageDraw.Draw(img)
+    img, draw = _new_card()
 
     y = _draw_title(draw, "Tarot Reading", CARD_SIZE)
 
     # Cards section
     cards = result.get("cards", [])
-    font_card = _get_font(34)
-    font_small = _get_font(26)
+    font_card = get_font(34)
+    font_small = get_font(26)
 
     y += 10
     for i, card in enumerate(cards[:5]):
@@ -184,7 +197,7 @@ def generate_tarot_card(result: dict) -> bytes:
 
     # Advice section
     y += 20
-    draw.text((80, y), "Advice", fill=LIGHT_PURPLE, font=_get_font(30))
+    draw.text((80, y), "Advice", fill=LIGHT_PURPLE, font=get_font(30))
     y += 42
     advice = _wrap_text(result.get("advice", ""), width=25)
     for line in advice.split("\n")[:6]:
@@ -210,9 +223,7 @@ def generate_face_card(result: dict) -> bytes:
     - hidden_traits: list of str (up to 3)
     - top_jobs: list of str (up to 3)
     """
-    img = Image.new("RGB", (CARD_SIZE, CARD_SIZE))
-    _draw_gradient_bg(img)
-    draw = ImageDraw.Draw(img)
+    img, draw = _new_card()
 
     y = _draw_title(draw, "AI Face Reading", CARD_SIZE)
 
@@ -228,8 +239,8 @@ def generate_face_card(result: dict) -> bytes:
 
     # Hidden traits
     y += 20
-    font_section = _get_font(32)
-    font_item = _get_font(28)
+    font_section = get_font(32)
+    font_item = get_font(28)
 
     draw.text((80, y), "Hidden Traits", fill=LIGHT_PURPLE, font=font_section)
     y += 44
@@ -271,15 +282,13 @@ def generate_pastlife_card(result: dict) -> bytes:
     - stats: dict with 6 stat keys (str -> int 0-100)
     - connection: str (connection to current life)
     """
-    img = Image.new("RGB", (CARD_SIZE, CARD_SIZE))
-    _draw_gradient_bg(img)
-    draw = ImageDraw.Draw(img)
+    img, draw = _new_card()
 
     y = _draw_title(draw, "Past Life Story", CARD_SIZE)
 
-    font_label = _get_font(28)
-    font_value = _get_font(32)
-    font_name = _get_font(48)
+    font_label = get_font(28)
+    font_value = get_font(32)
+    font_name = get_font(48)
 
     # Era / Country / Place
     y += 10
@@ -326,7 +335,7 @@ def generate_pastlife_card(result: dict) -> bytes:
         draw.text((80, y), "Connection to Present", fill=LIGHT_PURPLE, font=font_label)
         y += 36
         wrapped = _wrap_text(connection, width=25)
-        font_conn = _get_font(24)
+        font_conn = get_font(24)
         for line in wrapped.split("\n")[:3]:
             draw.text((100, y), line, fill=LAVENDER, font=font_conn)
             y += 32
@@ -344,16 +353,14 @@ def generate_news_card(result: dict) -> bytes:
     - summary: list of str (3-line news summary)
     - scenes: list of dict with 'description' (4 scenes)
     """
-    img = Image.new("RGB", (CARD_SIZE, CARD_SIZE))
-    _draw_gradient_bg(img)
-    draw = ImageDraw.Draw(img)
+    img, draw = _new_card()
 
     y = _draw_title(draw, "AI News Webtoon", CARD_SIZE)
 
-    font_subtitle = _get_font(36)
-    font_body = _get_font(28)
-    font_scene_label = _get_font(30)
-    font_scene = _get_font(26)
+    font_subtitle = get_font(36)
+    font_body = get_font(28)
+    font_scene_label = get_font(30)
+    font_scene = get_font(26)
 
     # Webtoon title
     y += 20
@@ -415,15 +422,13 @@ def generate_wanted_card(result: dict) -> bytes:
     - traits: list of str
     - description: str
     """
-    img = Image.new("RGB", (CARD_SIZE, CARD_SIZE))
-    _draw_gradient_bg(img)
-    draw = ImageDraw.Draw(img)
+    img, draw = _new_card()
 
     y = _draw_title(draw, "WANTED", CARD_SIZE)
 
-    font_big = _get_font(36)
-    font_body = _get_font(28)
-    font_small = _get_font(24)
+    font_big = get_font(36)
+    font_body = get_font(28)
+    font_small = get_font(24)
 
     # Crime
     y += 20
@@ -486,15 +491,13 @@ def generate_parallel_card(result: dict) -> bytes:
     - divergence_rate: int (0-100)
     - stats: dict (str -> int 0-100)
     """
-    img = Image.new("RGB", (CARD_SIZE, CARD_SIZE))
-    _draw_gradient_bg(img)
-    draw = ImageDraw.Draw(img)
+    img, draw = _new_card()
 
     y = _draw_title(draw, "Parallel Universe", CARD_SIZE)
 
-    font_name = _get_font(44)
-    font_label = _get_font(28)
-    font_value = _get_font(32)
+    font_name = get_font(44)
+    font_label = get_font(28)
+    font_value = get_font(32)
 
     # Name
     y += 10
@@ -548,16 +551,14 @@ def generate_profiling_card(result: dict) -> bytes:
     - weakness: str
     - partner_type: str
     """
-    img = Image.new("RGB", (CARD_SIZE, CARD_SIZE))
-    _draw_gradient_bg(img)
-    draw = ImageDraw.Draw(img)
+    img, draw = _new_card()
 
     y = _draw_title(draw, "Psych Profile", CARD_SIZE)
 
-    font_big = _get_font(40)
-    font_label = _get_font(28)
-    font_value = _get_font(30)
-    font_small = _get_font(24)
+    font_big = get_font(40)
+    font_label = get_font(28)
+    font_value = get_font(30)
+    font_small = get_font(24)
 
     # Type name
     y += 10
@@ -620,16 +621,14 @@ def generate_quiz_card(result: dict) -> bytes:
     - score: int (0-100)
     - explanation_summary: str
     """
-    img = Image.new("RGB", (CARD_SIZE, CARD_SIZE))
-    _draw_gradient_bg(img)
-    draw = ImageDraw.Draw(img)
+    img, draw = _new_card()
 
     y = _draw_title(draw, "Mystery Quiz", CARD_SIZE)
 
-    font_big = _get_font(40)
-    font_label = _get_font(28)
-    font_value = _get_font(32)
-    font_small = _get_font(24)
+    font_big = get_font(40)
+    font_label = get_font(28)
+    font_value = get_font(32)
+    font_small = get_font(24)
 
     # Case title
     y += 20
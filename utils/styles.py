@@ -1,7 +1,26 @@
-COMMON_CSS = """
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Noto+Serif+KR:wght@400;700;900&display=swap');
+"""
+Shared page styles.
+
+``COMMON_CSS`` is the source. Pages inject ``common_style_tag()``: the CSS
+minified once per process, after the ``@font-face`` rules for the self-hosted
+Noto Serif KR subset that ``scripts/build_styles.py`` writes to
+``static/fonts`` (served by ``server.enableStaticServing``). Until that has been
+built, the font comes from Google Fonts as before.
+"""
+
+import functools
+import json
+import re
+from pathlib import Path
 
+FONT_DIR = Path(__file__).resolve().parent.parent / "static" / "fonts"
+FONT_MANIFEST = FONT_DIR / "manifest.json"
+FONT_URL = "app/static/fonts"
+GOOGLE_FONTS_IMPORT = (
+    "@import url('https://fonts.googleapis.com/css2?family=Noto+Serif+KR:wght@400;700;900&display=swap');"
+)
+
+COMMON_CSS = """
     /* ===== 전역 배경 & 폰트 (레이튼 교수 스타일) ===== */
     .stApp {
         background: linear-gradient(160deg, #2B1E14 0%, #3D2B1A 30%, #2B1E14 60%, #1A120B 100%);
@@ -600,6 +619,33 @@ COMMON_CSS = """
         animation: glow-pulse 3s ease-in-out infinite;
     }
 
-
-</style>
 """
+
+
+def minify_css(css: str) -> str:
+    """Drop comments and the whitespace the browser doesn't need (no quoted strings here contain it)."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+
+def font_faces() -> str:
+    """@font-face rules for the self-hosted font, or the Google Fonts import if it hasn't been built."""
+    try:
+        manifest = json.loads(FONT_MANIFEST.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return GOOGLE_FONTS_IMPORT
+    # ?v= makes the static handler send a long max-age; a rebuilt file gets a new hash
+    return "".join(
+        f"@font-face{{font-family:'Noto Serif KR';font-weight:{weight};font-display:swap;"
+        f"src:url('{FONT_URL}/{entry['file']}?v={entry['hash']}') format('woff2')}}"
+        for weight, entry in sorted(manifest.items())
+    )
+
+
+@functools.cache
+def common_style_tag() -> str:
+    """The <style> element every page injects, built on first use."""
+    return f"<style>{font_faces()}{minify_css(COMMON_CSS)}</style>"
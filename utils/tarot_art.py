@@ -0,0 +1,94 @@
+"""
+Pre-rendered tarot art library.
+
+The deck has a fixed 78 cards x 2 directions, so card art is rendered once
+by an offline batch job (``python -m scripts.build_tarot_art``) and looked up
+by (card name, direction) at reading time. Live DALL-E generation is only
+needed for cards missing from the index.
+"""
+
+import json
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from utils.image_assets import ASSETS_DIR, download_image, save_optimized
+from utils.tarot_deck import TAROT_DECK, card_slug, find_card
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+TAROT_IMAGE_BASE = (
+    "mystical tarot card illustration, ornate golden border, "
+    "warm sepia and amber color scheme, vintage parchment glow, "
+    "detailed fantasy art style, vertical card format, "
+)
+
+TAROT_ART_DIR = ASSETS_DIR / "tarot"
+TAROT_ART_INDEX = TAROT_ART_DIR / "index.json"
+TAROT_ART_SIZE = (512, 896)  # 1024x1792 DALL-E output at half resolution
+
+
+def orient(img: "Image.Image", direction: str) -> "Image.Image":
+    """Card art as shown for ``direction``: a reversed card is the upright art turned 180 degrees."""
+    return img.rotate(180) if direction == "역방향" else img
+
+
+@lru_cache(maxsize=1)
+def _load_index() -> dict:
+    try:
+        with open(TAROT_ART_INDEX, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def lookup_tarot_art(name: str, direction: str) -> str | None:
+    """Return the local image path for a card/direction, or None if not pre-rendered."""
+    card = find_card(name)
+    if card is None:
+        return None
+    rel = _load_index().get(card["name"], {}).get(direction)
+    if not rel:
+        return None
+    path = TAROT_ART_DIR / rel
+    return str(path) if path.exists() else None
+
+
+def build_tarot_art(generate, force: bool = False, log=print) -> dict:
+    """
+    Render art for every deck card and write the lookup index.
+
+    ``generate(prompt) -> url`` renders one upright card; the reversed image
+    is derived by rotating it, so each card costs a single generation.
+    Existing images are skipped unless ``force`` is set.
+    """
+    from PIL import Image  # offline build only; keeps Pillow out of the tarot page's imports
+
+    TAROT_ART_DIR.mkdir(parents=True, exist_ok=True)
+    index = {} if force else dict(_load_index())
+
+    for i, card in enumerate(TAROT_DECK, 1):
+        slug = card_slug(card["name"])
+        upright = TAROT_ART_DIR / f"{slug}_upright.webp"
+        reversed_ = TAROT_ART_DIR / f"{slug}_reversed.webp"
+
+        if force or not upright.exists():
+            try:
+                url = generate(TAROT_IMAGE_BASE + card["keyword"])
+                save_optimized(download_image(url), upright, TAROT_ART_SIZE)
+            except Exception as e:
+                log(f"[{i}/{len(TAROT_DECK)}] {card['name']}: 실패 ({e})")
+                continue
+        if force or not reversed_.exists():
+            with Image.open(upright) as img:
+                save_optimized(orient(img, "역방향"), reversed_, TAROT_ART_SIZE)
+
+        index[card["name"]] = {"정방향": upright.name, "역방향": reversed_.name}
+        log(f"[{i}/{len(TAROT_DECK)}] {card['name']}: 완료")
+
+        # Write the index as we go so an interrupted run keeps its progress
+        with open(TAROT_ART_INDEX, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=1)
+
+    _load_index.cache_clear()
+    return index
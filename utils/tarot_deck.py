@@ -0,0 +1,224 @@
+"""
+78-card tarot deck model.
+
+Major arcana are listed explicitly; minor arcana are composed from
+suit x rank so that names, Korean names and art keywords stay consistent.
+Cards are drawn locally with a seeded RNG, and base meanings come from a
+precomputed (card, direction, category) index, so the LLM only has to
+personalize a short interpretation for the cards already on the table.
+"""
+
+import hashlib
+import random
+
+DIRECTIONS = ("정방향", "역방향")
+REVERSED_CHANCE = 0.3
+THREE_CARD_POSITIONS = ("과거", "현재", "미래")
+
+# page selectbox label -> meaning index category
+CATEGORIES = {
+    "💕 연애운": "연애",
+    "💰 금전운": "금전",
+    "📚 학업/커리어운": "학업",
+    "🌟 종합운": "종합",
+}
+
+_CATEGORY_FOCUS = {
+    "연애": "연애와 관계",
+    "금전": "금전과 재물",
+    "학업": "학업과 커리어",
+    "종합": "전반적인 운의 흐름",
+}
+
+_MAJOR_ARCANA = [
+    ("The Fool", "바보", "young wanderer at cliff edge, white rose, small dog"),
+    ("The Magician", "마법사", "robed magician, infinity symbol, altar of four elements"),
+    ("The High Priestess", "여사제", "veiled priestess, crescent moon, twin pillars"),
+    ("The Empress", "여황제", "crowned empress, golden wheat field, flowing river"),
+    ("The Emperor", "황제", "stern emperor, stone throne with ram heads, red mountains"),
+    ("The Hierophant", "교황", "hierophant with triple crown, crossed keys, kneeling acolytes"),
+    ("The Lovers", "연인", "two lovers, radiant angel, garden of eden"),
+    ("The Chariot", "전차", "armored charioteer, black and white sphinxes, starry canopy"),
+    ("Strength", "힘", "gentle woman taming lion, infinity halo, flower garland"),
+    ("The Hermit", "은둔자", "old hermit with lantern, snowy mountain peak, night sky"),
+    ("Wheel of Fortune", "운명의 수레바퀴", "great wheel of fortune, sphinx, clouds and winged creatures"),
+    ("Justice", "정의", "justice figure, balanced scales, upright sword"),
+    ("The Hanged Man", "매달린 사람", "man hanging upside down from living tree, serene halo"),
+    ("Death", "죽음", "skeleton knight on white horse, black banner with white rose, sunrise"),
+    ("Temperance", "절제", "winged angel pouring water between cups, iris flowers"),
+    ("The Devil", "악마", "horned devil on pedestal, chained figures, inverted torch"),
+    ("The Tower", "탑", "lightning striking tall tower, falling crown, flames"),
+    ("The Star", "별", "kneeling maiden pouring water, eight pointed stars, calm pool"),
+    ("The Moon", "달", "full moon face, howling wolf and dog, crayfish in pool"),
+    ("The Sun", "태양", "radiant sun, child on white horse, sunflowers"),
+    ("Judgement", "심판", "angel blowing trumpet, figures rising from coffins"),
+    ("The World", "세계", "dancer in laurel wreath, four living creatures, cosmic sky"),
+]
+
+# (upright keywords, reversed keywords)
+_MAJOR_MEANINGS = {
+    "The Fool": ("새로운 시작, 순수한 모험, 자유로운 도전", "무모함, 준비 부족, 망설임"),
+    "The Magician": ("창조력, 실행력, 주어진 재능의 발휘", "속임수, 재능의 낭비, 계획 없는 시도"),
+    "The High Priestess": ("직관, 내면의 지혜, 숨겨진 진실", "감춰진 감정, 직관 무시, 혼란"),
+    "The Empress": ("풍요, 보살핌, 결실", "의존, 과잉 보호, 정체된 성장"),
+    "The Emperor": ("안정, 질서, 책임감 있는 리더십", "독선, 통제 집착, 경직"),
+    "The Hierophant": ("전통, 조언자, 신뢰할 수 있는 틀", "관습에 대한 반발, 고정관념, 형식주의"),
+    "The Lovers": ("사랑, 조화, 중요한 선택", "불균형한 관계, 갈등, 흔들리는 선택"),
+    "The Chariot": ("의지, 전진, 승리", "방향 상실, 조급함, 통제 불능"),
+    "Strength": ("용기, 인내, 부드러운 힘", "자신감 부족, 감정 폭발, 나약함"),
+    "The Hermit": ("성찰, 고독 속의 깨달음, 내면 탐구", "고립, 외로움, 현실 회피"),
+    "Wheel of Fortune": ("행운, 전환점, 운명의 흐름", "불운의 반복, 저항, 타이밍 어긋남"),
+    "Justice": ("공정함, 균형, 정당한 결과", "불공정, 책임 회피, 편향된 판단"),
+    "The Hanged Man": ("관점의 전환, 기다림, 내려놓음", "헛된 희생, 지연, 정체"),
+    "Death": ("끝과 새로운 시작, 변화, 정리", "변화에 대한 저항, 미련, 질질 끄는 끝"),
+    "Temperance": ("절제, 조화, 균형 잡힌 흐름", "불균형, 과잉, 조급함"),
+    "The Devil": ("유혹, 집착, 강한 욕망", "속박에서의 해방, 집착 끊기, 자각"),
+    "The Tower": ("급격한 변화, 깨달음, 낡은 틀의 붕괴", "피할 수 없는 변화의 지연, 두려움, 위기 모면"),
+    "The Star": ("희망, 치유, 영감", "낙담, 자신감 상실, 흐려진 목표"),
+    "The Moon": ("불안, 환상, 무의식", "혼란의 해소, 진실 드러남, 두려움 극복"),
+    "The Sun": ("성공, 기쁨, 활력", "일시적 침체, 과한 낙관, 지연된 성공"),
+    "Judgement": ("부활, 결단, 새로운 소명", "자기 의심, 미루기, 과거에 대한 후회"),
+    "The World": ("완성, 성취, 하나의 여정의 마무리", "미완성, 마지막 한 걸음 부족, 지연"),
+}
+
+_SUITS = [
+    ("Wands", "완드", "flowering wooden staffs, fiery desert"),
+    ("Cups", "컵", "golden chalices, flowing water"),
+    ("Swords", "소드", "silver swords, windy storm clouds"),
+    ("Pentacles", "펜타클", "golden coins with pentagram, lush garden"),
+]
+
+_SUIT_DOMAINS = {
+    "Wands": "열정과 행동",
+    "Cups": "감정과 관계",
+    "Swords": "생각과 판단",
+    "Pentacles": "돈과 현실",
+}
+
+_RANK_MEANINGS = {
+    "Ace": ("새로운 시작, 잠재력", "지연된 시작, 놓친 기회"),
+    "Two": ("선택, 균형, 협력", "우유부단, 불균형"),
+    "Three": ("성장, 협업, 확장", "불협화음, 정체"),
+    "Four": ("안정, 휴식, 기반 다지기", "정체, 집착"),
+    "Five": ("갈등, 상실, 시련", "회복, 화해"),
+    "Six": ("조화, 나눔, 전진", "과거에 대한 집착, 불균형"),
+    "Seven": ("도전, 인내, 재평가", "방어적 태도, 회피"),
+    "Eight": ("속도, 몰입, 변화", "혼란, 지체"),
+    "Nine": ("성취 직전, 만족", "불안, 과욕"),
+    "Ten": ("완성, 결실", "과부하, 무거운 책임"),
+    "Page": ("호기심, 새로운 소식", "미숙함, 산만함"),
+    "Knight": ("추진력, 행동", "성급함, 방향 상실"),
+    "Queen": ("포용, 성숙한 감성", "감정 기복, 의존"),
+    "King": ("리더십, 통제력", "독단, 경직"),
+}
+
+_RANKS = [
+    ("Ace", "에이스", "single hand emerging from cloud"),
+    ("Two", "2", "figure weighing a choice"),
+    ("Three", "3", "three figures in collaboration"),
+    ("Four", "4", "figure resting in stillness"),
+    ("Five", "5", "struggle and loss"),
+    ("Six", "6", "journey and generosity"),
+    ("Seven", "7", "lone figure defending position"),
+    ("Eight", "8", "swift motion and diligence"),
+    ("Nine", "9", "figure near fulfillment"),
+    ("Ten", "10", "heavy burden or completion"),
+    ("Page", "페이지", "curious young messenger"),
+    ("Knight", "나이트", "knight on charging horse"),
+    ("Queen", "퀸", "queen on ornate throne"),
+    ("King", "킹", "king on ornate throne"),
+]
+
+
+def _build_deck() -> list[dict]:
+    deck = [
+        {"name": name, "name_kr": name_kr, "arcana": "major", "keyword": keyword}
+        for name, name_kr, keyword in _MAJOR_ARCANA
+    ]
+    for suit, suit_kr, suit_motif in _SUITS:
+        for rank, rank_kr, rank_motif in _RANKS:
+            deck.append({
+                "name": f"{rank} of {suit}",
+                "name_kr": f"{suit_kr} {rank_kr}",
+                "arcana": "minor",
+                "suit": suit,
+                "rank": rank,
+                "keyword": f"{rank_motif}, {suit_motif}",
+            })
+    return deck
+
+
+TAROT_DECK: list[dict] = _build_deck()
+
+_BY_NAME = {card["name"].casefold(): card for card in TAROT_DECK}
+
+
+def _base_keywords(card: dict, direction: str) -> str:
+    reversed_ = direction == "역방향"
+    if card["arcana"] == "major":
+        return _MAJOR_MEANINGS[card["name"]][reversed_]
+    rank_kw = _RANK_MEANINGS[card["rank"]][reversed_]
+    return f"{_SUIT_DOMAINS[card['suit']]} 영역의 {rank_kw}"
+
+
+def _build_meaning_index() -> dict[tuple[str, str, str], str]:
+    index = {}
+    for card in TAROT_DECK:
+        for direction in DIRECTIONS:
+            keywords = _base_keywords(card, direction)
+            for category, focus in _CATEGORY_FOCUS.items():
+                if direction == "정방향":
+                    text = f"{focus}에서 {keywords}의 기운이 흐름을 이끌어요."
+                else:
+                    text = f"{focus}에서 {keywords}에 주의가 필요해요."
+                index[(card["name"], direction, category)] = text
+    return index
+
+
+# (card name, direction, category) -> base meaning
+MEANING_INDEX: dict[tuple[str, str, str], str] = _build_meaning_index()
+
+
+def base_meaning(name: str, direction: str, category: str) -> str:
+    """Precomputed base meaning for a card; ``category`` may be a page label or index key."""
+    category = CATEGORIES.get(category, category)
+    return MEANING_INDEX.get((name, direction, category), "")
+
+
+def reading_seed(*parts: str) -> int:
+    """Stable seed from reading inputs, so the same question draws the same cards."""
+    digest = hashlib.sha256("\x1f".join(parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def draw_cards(num_cards: int, category: str, seed: int | None = None) -> list[dict]:
+    """
+    Draw ``num_cards`` distinct cards with directions and base meanings.
+
+    Three-card spreads get 과거/현재/미래 positions; one-card spreads have none.
+    """
+    rng = random.Random(seed)
+    drawn = []
+    for i, card in enumerate(rng.sample(TAROT_DECK, num_cards)):
+        direction = "역방향" if rng.random() < REVERSED_CHANCE else "정방향"
+        drawn.append({
+            "name": card["name"],
+            "name_kr": card["name_kr"],
+            "direction": direction,
+            "position": THREE_CARD_POSITIONS[i] if num_cards == 3 else "",
+            "base_meaning": base_meaning(card["name"], direction, category),
+            "image_keyword": card["keyword"],
+        })
+    return drawn
+
+
+def find_card(name: str) -> dict | None:
+    """Look up a deck card by its English name (case-insensitive)."""
+    if not name:
+        return None
+    return _BY_NAME.get(name.strip().casefold())
+
+
+def card_slug(name: str) -> str:
+    """File-system friendly slug for a card name ("The Fool" -> "the-fool")."""
+    return "-".join(name.casefold().split())
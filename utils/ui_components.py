@@ -1,11 +1,15 @@
-import json
-import time
+import math
+from typing import Callable
+
 import streamlit as st
-from utils.styles import COMMON_CSS
+from utils.admission import queue_status
+from utils.jobs import DONE, FAILED, Job, get_job, page_job
+from utils.schemas import parse_json_lenient
+from utils.styles import common_style_tag
 
 
 def apply_common_styles():
-    st.markdown(COMMON_CSS, unsafe_allow_html=True)
+    st.markdown(common_style_tag(), unsafe_allow_html=True)
 
 
 def show_disclaimer():
@@ -19,30 +23,31 @@ def show_disclaimer():
 
 
 def safe_parse_json(text: str) -> dict | None:
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        pass
-    try:
-        if "```json" in text:
-            json_str = text.split("```json")[1].split("```")[0]
-            return json.loads(json_str)
-    except (json.JSONDecodeError, IndexError):
-        pass
-    try:
-        if "{" in text:
-            start = text.index("{")
-            end = text.rindex("}") + 1
-            return json.loads(text[start:end])
-    except (json.JSONDecodeError, ValueError):
-        pass
-    return None
+    return parse_json_lenient(text)[0]
 
 
 def show_error(message: str = "AI 응답 생성 중 오류가 발생했습니다. 잠시 후 다시 시도해주세요."):
     st.error(f"🚨 {message}")
 
 
+def show_lite_placeholder(icon: str, message: str, padding: str = "50px 20px"):
+    """라이트 모드에서 생략된 그림 자리에 보여주는 플레이스홀더"""
+    st.markdown(
+        f"<div style='background:linear-gradient(145deg, #3D2B1A, #2B1E14); "
+        f"border:2px dashed #8B6914; border-radius:12px; "
+        f"padding:{padding}; text-align:center;'>"
+        f"<span style='font-size:4em;'>{icon}</span><br><br>"
+        f"<span style='color:#C8956C;'>{message}</span><br>"
+        f"<span style='color:#8B6914; font-size:0.85em;'>⚡ 연구실이 붐벼서 간단 모드로 운영 중이에요</span></div>",
+        unsafe_allow_html=True,
+    )
+
+
+def show_lite_notice():
+    """라이트 모드에서 짧게 줄인 이야기 아래에 붙는 안내"""
+    st.caption("⚡ 연구실이 붐비는 시간이라 짧은 버전으로 들려드렸어요. 한가할 때 다시 오면 더 길게 들려드릴게요!")
+
+
 def show_other_features(current: str):
     """다른 기능 추천 섹션"""
     features = {
@@ -159,16 +164,91 @@ def show_stamp_sidebar():
             st.caption(f"완료: {count}/4")
 
 
-def show_loading_messages(messages: list[str], delay: float = 2):
-    """로딩 중 메시지를 순차적으로 표시"""
-    placeholder = st.empty()
-    for msg in messages:
-        placeholder.markdown(
-            f"<div style='text-align:center; color:#C8956C; font-size:1.2rem;'>{msg}</div>",
-            unsafe_allow_html=True,
-        )
-        time.sleep(delay)
-    placeholder.empty()
+def memo_opt_in() -> bool:
+    """같은 입력 결과 재사용 여부 체크박스 (세션 단위로 기억)"""
+    enabled = st.checkbox(
+        "💾 같은 정보로 다시 오면 이전 결과 보여주기",
+        value=st.session_state.get("result_memo_enabled", True),
+        help="끄면 결과를 저장하지 않고 매번 새로 생성해요",
+    )
+    st.session_state["result_memo_enabled"] = enabled
+    return enabled
+
+
+def _loading_html(message: str) -> str:
+    return f"<div style='text-align:center; color:#C8956C; font-size:1.2rem;'>{message}</div>"
+
+
+JOB_POLL_SECONDS = 1.0
+
+
+def show_image_pending(icon: str, message: str, padding: str = "50px 20px"):
+    """백그라운드 작업이 아직 그림을 그리는 중일 때 그림 자리에 보여주는 플레이스홀더"""
+    st.markdown(
+        f"<div class='glow-pulse' style='background:linear-gradient(145deg, #3D2B1A, #2B1E14); "
+        f"border:2px solid #8B6914; border-radius:12px; "
+        f"padding:{padding}; text-align:center;'>"
+        f"<span style='font-size:4em;'>{icon}</span><br><br>"
+        f"<span style='color:#C8956C;'>{message}</span></div>",
+        unsafe_allow_html=True,
+    )
+
+
+def _sync_job(job: Job, apply: Callable[[dict], None], error_prefix: str) -> bool:
+    """작업의 새 단계 결과를 세션 상태에 반영 (이미 반영한 버전이면 False)"""
+    seen = st.session_state.setdefault("_job_seen", {})
+    if seen.get(job.id) == job.version:
+        return False
+    seen[job.id] = job.version
+    outputs = job.outputs()
+    if outputs:
+        apply(outputs)
+    if job.status == DONE:
+        st.session_state.setdefault("_job_done", set()).add(job.page)
+    elif job.status == FAILED:
+        st.session_state.setdefault("_job_errors", {})[job.page] = job.message or f"{error_prefix}: {job.error}"
+    return True
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def _job_progress(job_id: str, apply: Callable[[dict], None], messages: list[str], error_prefix: str):
+    job = get_job(job_id)
+    if job is None:
+        return
+    if _sync_job(job, apply, error_prefix):
+        st.rerun()  # 새 결과가 있으면 페이지 전체를 다시 그림
+    queued = queue_status(job.session_id)
+    if queued:
+        position, eta = queued
+        message = f"🚶 연구실 앞 대기열 {position}번째 · 약 {math.ceil(eta)}초 남았어요"
+    else:
+        message = job.stage or messages[int(job.elapsed() / 1.5) % len(messages)]
+    st.markdown(_loading_html(message), unsafe_allow_html=True)
+    st.caption(f"⏱️ {int(job.elapsed())}초째 진행 중 · 다른 걸 눌러봐도 실험은 계속돼요")
+
+
+def follow_job(page: str, apply: Callable[[dict], None], messages: list[str], error_prefix: str) -> bool:
+    """
+    페이지의 백그라운드 작업(utils.jobs)을 따라가며 결과를 세션 상태에 반영
+
+    ``apply(partial)``은 단계 결과가 새로 나올 때마다 호출됩니다 (여러 번 불려도 되게 작성).
+    작업이 도는 동안은 st.fragment가 1초마다 진행 상황(단계 메시지, 대기 순번)을 갱신하고,
+    결과 표시 코드보다 먼저 호출해야 합니다. 이번 실행에서 작업이 막 끝났으면 True (축하 효과용).
+    """
+    job = page_job(page)
+    if job is None:
+        return False
+    _sync_job(job, apply, error_prefix)
+    error = st.session_state.get("_job_errors", {}).pop(page, None)
+    if error:
+        show_error(error)
+    if job.running:
+        _job_progress(job.id, apply, messages, error_prefix)
+    done = st.session_state.get("_job_done", set())
+    if page in done:
+        done.discard(page)
+        return True
+    return False
 
 
 def show_result_history():
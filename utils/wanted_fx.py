@@ -0,0 +1,125 @@
+"""
+Pillow/NumPy "fast mode" wanted poster.
+
+Stylizes the uploaded photo locally (sepia tone, halftone shading, ink
+outline, paper texture) and frames it with the WANTED header and bounty text.
+Renders in well under a second, so the poster can be shown immediately and the
+DALL-E illustration becomes an optional upgrade.
+"""
+
+import io
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageOps
+
+from utils.image_prep import crop_face_region
+from utils.share_card import get_font
+
+POSTER_W, POSTER_H = 800, 1100
+PHOTO_W, PHOTO_H = 560, 700
+PHOTO_TOP = 190
+
+PAPER = np.array([236, 219, 178], dtype=np.float32)
+INK = (58, 36, 18)
+HALFTONE_CELL = 6
+
+
+def _paper_texture(width: int, height: int, seed: int = 7) -> np.ndarray:
+    """Aged paper: base color with large soft blotches and fine grain. Returns HxWx3 float."""
+    rng = np.random.default_rng(seed)
+    blotches = Image.fromarray(
+        (rng.random((height // 50, width // 50)) * 255).astype(np.uint8)
+    ).resize((width, height), Image.BICUBIC)
+    blotch = (np.asarray(blotches, dtype=np.float32) / 255 - 0.5) * 28
+    grain = rng.normal(0, 6, (height, width)).astype(np.float32)
+
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    edge = np.minimum.reduce([xx, yy, width - 1 - xx, height - 1 - yy])
+    vignette = np.clip(1 - edge / 120, 0, 1) * 45  # darker, burnt edges
+
+    shade = (blotch + grain - vignette)[..., None]
+    return np.clip(PAPER + shade, 0, 255)
+
+
+def _halftone(gray: np.ndarray) -> np.ndarray:
+    """Dot-screen mask (1 = ink) with dot size proportional to local darkness."""
+    h, w = gray.shape
+    c = HALFTONE_CELL
+    hc, wc = h // c, w // c
+    cells = gray[: hc * c, : wc * c].reshape(hc, c, wc, c).mean(axis=(1, 3))
+    radius = (1 - cells / 255) * (c * 0.7)
+
+    offs = np.arange(c) - (c - 1) / 2
+    dist = np.sqrt(offs[:, None] ** 2 + offs[None, :] ** 2)          # c x c
+    dots = dist[None, :, None, :] < radius[:, None, :, None]         # hc x c x wc x c
+    mask = np.zeros_like(gray, dtype=bool)
+    mask[: hc * c, : wc * c] = dots.reshape(hc * c, wc * c)
+    return mask
+
+
+def _stylize_photo(photo: Image.Image) -> Image.Image:
+    """Sepia + halftone + ink outline rendering of the suspect photo."""
+    photo = ImageOps.fit(crop_face_region(photo), (PHOTO_W, PHOTO_H), Image.LANCZOS)
+    gray_img = ImageOps.autocontrast(photo.convert("L"), cutoff=2)
+    gray = np.asarray(gray_img, dtype=np.float32)
+
+    # Sepia tone: map luminance onto a dark-brown -> paper ramp
+    t = (gray / 255)[..., None]
+    sepia = np.array(INK, dtype=np.float32) * (1 - t) + PAPER * t
+
+    # Halftone shading in the mid/dark tones
+    dots = _halftone(gray)
+    sepia[dots & (gray < 170)] *= 0.78
+
+    # Ink outline from edges of a slightly blurred copy
+    edges = np.asarray(
+        gray_img.filter(ImageFilter.GaussianBlur(1.2)).filter(ImageFilter.FIND_EDGES),
+        dtype=np.float32,
+    )
+    ink = np.clip((edges - 18) / 40, 0, 1)[..., None]
+    sepia = sepia * (1 - ink) + np.array(INK, dtype=np.float32) * ink
+
+    return Image.fromarray(np.clip(sepia, 0, 255).astype(np.uint8))
+
+
+def _draw_centered(draw: ImageDraw.ImageDraw, y: int, text: str, size: int, fill=INK) -> int:
+    font = get_font(size)
+    bbox = draw.textbbox((0, 0), text, font=font)
+    draw.text(((POSTER_W - (bbox[2] - bbox[0])) // 2, y), text, fill=fill, font=font)
+    return y + (bbox[3] - bbox[1]) + 18
+
+
+def _fit(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[: limit - 3] + "..."
+
+
+def render_wanted_poster(photo_bytes: bytes, result: dict) -> bytes:
+    """
+    Render a complete WANTED poster from the uploaded photo and poster text.
+
+    Uses ``suspect_name``, ``crime`` and ``bounty`` from the result. Returns JPEG bytes.
+    """
+    with Image.open(io.BytesIO(photo_bytes)) as img:
+        photo = ImageOps.exif_transpose(img).convert("RGB")
+
+    poster = Image.fromarray(_paper_texture(POSTER_W, POSTER_H).astype(np.uint8))
+    draw = ImageDraw.Draw(poster)
+
+    # Double frame
+    draw.rectangle((24, 24, POSTER_W - 25, POSTER_H - 25), outline=INK, width=6)
+    draw.rectangle((40, 40, POSTER_W - 41, POSTER_H - 41), outline=INK, width=2)
+
+    _draw_centered(draw, 62, "WANTED", 110)
+
+    left = (POSTER_W - PHOTO_W) // 2
+    poster.paste(_stylize_photo(photo), (left, PHOTO_TOP))
+    draw.rectangle((left - 4, PHOTO_TOP - 4, left + PHOTO_W + 3, PHOTO_TOP + PHOTO_H + 3), outline=INK, width=4)
+
+    y = PHOTO_TOP + PHOTO_H + 22
+    y = _draw_centered(draw, y, _fit(result.get("suspect_name", ""), 16), 44)
+    y = _draw_centered(draw, y, _fit(f"죄목: {result.get('crime', '')}", 24), 28)
+    _draw_centered(draw, y + 4, _fit(f"REWARD  {result.get('bounty', '')}", 22), 36, fill=(120, 24, 16))
+
+    buf = io.BytesIO()
+    poster.save(buf, format="JPEG", quality=88)
+    return buf.getvalue()